@@ -19,14 +19,20 @@ router = APIRouter()
 
 
 @router.get("/download", summary="查询下载历史记录", response_model=List[schemas.DownloadHistory])
-def download_history(page: Optional[int] = 1,
+def download_history(title: Optional[str] = None,
+                     page: Optional[int] = 1,
                      count: Optional[int] = 30,
+                     last_id: Optional[int] = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询下载历史记录
+    查询下载历史记录，传入上一页最后一条记录的ID时按ID翻页
     """
-    return DownloadHistory.list_by_page(db, page, count)
+    if title:
+        words = jieba.cut(title, HMM=False)
+        title = "%".join(words)
+        return DownloadHistory.list_by_title(db, title=title, page=page, count=count, last_id=last_id)
+    return DownloadHistory.list_by_page(db, page, count, last_id=last_id)
 
 
 @router.delete("/download", summary="删除下载历史记录", response_model=schemas.Response)
@@ -45,10 +51,11 @@ def transfer_history(title: Optional[str] = None,
                      page: Optional[int] = 1,
                      count: Optional[int] = 30,
                      status: Optional[bool] = None,
+                     last_id: Optional[int] = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询整理记录
+    查询整理记录，传入上一页最后一条记录的ID时按ID翻页
     """
     if title == "失败":
         title = None
@@ -62,9 +69,9 @@ def transfer_history(title: Optional[str] = None,
         title = "%".join(words)
         total = TransferHistory.count_by_title(db, title=title, status=status)
         result = TransferHistory.list_by_title(db, title=title, page=page,
-                                               count=count, status=status)
+                                               count=count, status=status, last_id=last_id)
     else:
-        result = TransferHistory.list_by_page(db, page=page, count=count, status=status)
+        result = TransferHistory.list_by_page(db, page=page, count=count, status=status, last_id=last_id)
         total = TransferHistory.count(db, status=status)
 
     return schemas.Response(success=True,
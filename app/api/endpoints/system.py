@@ -3,12 +3,10 @@ import io
 import json
 import re
 import tempfile
-from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Union, Annotated
 
-import aiofiles
 import pillow_avif  # noqa 用于自动注册AVIF支持
 from PIL import Image
 from app.helper.sites import SitesHelper
@@ -18,9 +16,10 @@ from fastapi.responses import StreamingResponse
 from app import schemas
 from app.chain.search import SearchChain
 from app.chain.system import SystemChain
+from app.core.cache import cache_backend, cache_metrics
 from app.core.config import global_vars, settings
 from app.core.event import eventmanager
-from app.core.metainfo import MetaInfo
+from app.core.metainfo import MetaInfo, MetaInfoCache
 from app.core.module import ModuleManager
 from app.core.security import verify_apitoken, verify_resource_token, verify_token
 from app.db.models import User
@@ -173,6 +172,34 @@ def cache_img(
     return fetch_image(url=url, proxy=proxy, use_disk_cache=settings.GLOBAL_IMAGE_CACHE, if_none_match=if_none_match)
 
 
+@router.get("/cache/metainfo", summary="标题识别缓存统计", response_model=schemas.Response)
+def metainfo_cache_stats(_: schemas.TokenPayload = Depends(verify_token)):
+    """
+    查询标题识别缓存的容量、命中和未命中次数
+    """
+    return schemas.Response(success=True, data=MetaInfoCache().stats())
+
+
+@router.get("/cache/stats", summary="缓存区统计", response_model=schemas.Response)
+def cache_stats(_: schemas.TokenPayload = Depends(verify_token)):
+    """
+    查询各缓存区的命中、未命中、写入、淘汰次数，当前条目数和后端读写耗时，以及内存缓存预算的使用情况
+    """
+    return schemas.Response(success=True, data={
+        "regions": cache_metrics.stats(cache_backend.get_region_sizes()),
+        "memory": cache_backend.get_memory_usage()
+    })
+
+
+@router.get("/cache/metrics", summary="缓存区统计（Prometheus）")
+def cache_prometheus_metrics(_: str = Depends(verify_apitoken)):
+    """
+    以 Prometheus 文本格式输出缓存区统计，API_TOKEN认证（?token=xxx）
+    """
+    return Response(content=cache_metrics.prometheus(cache_backend.get_region_sizes()),
+                    media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @router.get("/global", summary="查询非敏感系统设置", response_model=schemas.Response)
 def get_global_setting(token: str):
     """
@@ -367,40 +394,38 @@ async def get_logging(request: Request, length: Optional[int] = 50, logfile: Opt
         raise HTTPException(status_code=404, detail="Not Found")
 
     async def log_generator():
+        # 先订阅再读取历史日志，避免遗漏
+        buffer = logger.get_buffer(logfile)
+        lines, queue, file_size = buffer.subscribe()
         try:
-            # 使用固定大小的双向队列来限制内存使用
-            lines_queue = deque(maxlen=max(length, 50))
-            # 使用 aiofiles 异步读取文件
-            async with aiofiles.open(log_path, mode="r", encoding="utf-8") as f:
-                # 逐行读取文件，将每一行存入队列
-                file_content = await f.read()
-                for line in file_content.splitlines():
-                    lines_queue.append(line)
-                for line in lines_queue:
-                    yield f"data: {line}\n\n"
-                # 移动文件指针到文件末尾，继续监听新增内容
-                await f.seek(0, 2)
-                while not global_vars.is_system_stopped:
-                    if await request.is_disconnected():
-                        break
-                    line = await f.readline()
-                    if not line:
-                        await asyncio.sleep(0.5)
-                        continue
-                    yield f"data: {line}\n\n"
+            count = max(length, 50)
+            if len(lines) < count:
+                # 内存缓冲不足时从文件末尾向前读取，只读取到订阅时的位置，之后的日志由队列推送
+                lines = await asyncio.to_thread(logger.tail, log_path, count, file_size)
+            for line in lines[-count:]:
+                yield f"data: {line}\n\n"
+            # 等待新日志推送
+            while not global_vars.is_system_stopped:
+                if await request.is_disconnected():
+                    break
+                try:
+                    line = await asyncio.wait_for(queue.get(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                yield f"data: {line}\n\n"
         except asyncio.CancelledError:
             return
+        finally:
+            buffer.unsubscribe(queue)
+
+    def log_reverse_generator():
+        for line in logger.iter_lines_reverse(log_path):
+            yield f"{line}\n"
 
     # 根据length参数返回不同的响应
     if length == -1:
-        # 返回全部日志作为文本响应
-        if not log_path.exists():
-            return Response(content="日志文件不存在！", media_type="text/plain")
-        with open(log_path, "r", encoding='utf-8') as file:
-            text = file.read()
-        # 倒序输出
-        text = "\n".join(text.split("\n")[::-1])
-        return Response(content=text, media_type="text/plain")
+        # 倒序返回全部日志作为文本响应
+        return StreamingResponse(log_reverse_generator(), media_type="text/plain")
     else:
         # 返回SSE流响应
         return StreamingResponse(log_generator(), media_type="text/event-stream")
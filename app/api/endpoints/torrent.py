@@ -75,25 +75,22 @@ def delete_cache(domain: str, torrent_hash: str, _: User = Depends(get_current_a
     torrents_chain = TorrentsChain()
 
     try:
-        # 获取当前缓存
-        cache_data = torrents_chain.get_torrents()
+        # 获取当前站点缓存
+        cache_data = torrents_chain.get_torrents(domains=[domain])
 
         if domain not in cache_data:
             return schemas.Response(success=False, message=f"站点 {domain} 缓存不存在")
 
         # 查找并删除指定种子
-        original_count = len(cache_data[domain])
-        cache_data[domain] = [
-            context for context in cache_data[domain]
-            if HashUtils.md5(f"{context.torrent_info.title}{context.torrent_info.description}") != torrent_hash
-        ]
+        target_context = None
+        for context in cache_data[domain]:
+            if HashUtils.md5(f"{context.torrent_info.title}{context.torrent_info.description}") == torrent_hash:
+                target_context = context
+                break
 
-        if len(cache_data[domain]) == original_count:
+        if not target_context or not torrents_chain.remove_torrent(domain=domain, context=target_context):
             return schemas.Response(success=False, message="未找到指定的种子")
 
-        # 保存更新后的缓存
-        torrents_chain.save_cache(cache_data, torrents_chain.cache_file)
-
         return schemas.Response(success=True, message="种子删除成功")
     except Exception as e:
         return schemas.Response(success=False, message=f"删除失败：{str(e)}")
@@ -151,8 +148,8 @@ def reidentify_cache(domain: str, torrent_hash: str,
     media_chain = MediaChain()
 
     try:
-        # 获取当前缓存
-        cache_data = torrents_chain.get_torrents()
+        # 获取当前站点缓存
+        cache_data = torrents_chain.get_torrents(domains=[domain])
 
         if domain not in cache_data:
             return schemas.Response(success=False, message=f"站点 {domain} 缓存不存在")
@@ -188,7 +185,7 @@ def reidentify_cache(domain: str, torrent_hash: str,
         target_context.media_info = mediainfo
 
         # 保存更新后的缓存
-        torrents_chain.save_cache(cache_data, TorrentsChain().cache_file)
+        torrents_chain.update_torrent(domain=domain, context=target_context)
 
         return schemas.Response(success=True, message="重新识别完成", data={
             "media_name": mediainfo.title if mediainfo else "",
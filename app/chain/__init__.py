@@ -17,6 +17,7 @@ from app.core.module import ModuleManager
 from app.core.plugin import PluginManager
 from app.db.message_oper import MessageOper
 from app.db.user_oper import UserOper
+from app.helper.libraryindex import LibraryIndexHelper
 from app.helper.message import MessageHelper, MessageQueueManager, MessageTemplateHelper
 from app.helper.service import ServiceConfigHelper
 from app.log import logger
@@ -522,7 +523,14 @@ class ChainBase(metaclass=ABCMeta):
         :param server:  媒体服务器
         :return: 如不存在返回None，存在时返回信息，包括每季已存在所有集{type: movie/tv, seasons: {season: [episodes]}}
         """
-        return self.run_module("media_exists", mediainfo=mediainfo, itemid=itemid, server=server)
+        # 优先从媒体库索引中查找，未找到时再实时查询
+        exists = LibraryIndexHelper().exists(mediainfo=mediainfo, itemid=itemid, server=server)
+        if exists:
+            return exists
+        exists = self.run_module("media_exists", mediainfo=mediainfo, itemid=itemid, server=server)
+        if exists:
+            LibraryIndexHelper().put(mediainfo=mediainfo, exists=exists)
+        return exists
 
     def media_files(self, mediainfo: MediaInfo) -> Optional[List[FileItem]]:
         """
@@ -1,6 +1,8 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from threading import Lock
-from typing import Optional, List, Tuple, Union
+from typing import Optional, List, Tuple, Union, Dict
 
 from app import schemas
 from app.chain import ChainBase
@@ -102,6 +104,68 @@ class MediaChain(ChainBase):
         # 返回上下文
         return mediainfo
 
+    def recognize_by_metas(self, metas: List[MetaBase], episode_group: Optional[str] = None,
+                           simple: bool = False, max_workers: int = 5) -> List[Optional[MediaInfo]]:
+        """
+        批量根据主副标题识别媒体信息，名称、年份、类型、季相同的元数据只识别一次
+        :param metas: 元数据列表
+        :param episode_group: 剧集组
+        :param simple: 只识别媒体信息，不使用辅助识别也不更新媒体图片
+        :param max_workers: 最大并发识别数
+        :return: 与元数据列表一一对应的媒体信息，未识别到的为None
+        """
+        if not metas:
+            return []
+        # 按识别条件分组
+        groups: Dict[tuple, List[int]] = {}
+        for index, meta in enumerate(metas):
+            groups.setdefault(self.__recognize_key(meta), []).append(index)
+        logger.info(f'批量识别 {len(metas)} 个元数据，合并为 {len(groups)} 次识别 ...')
+
+        def __recognize(_indexes: List[int]) -> Optional[MediaInfo]:
+            return self.recognize_media(meta=metas[_indexes[0]], episode_group=episode_group)
+
+        # 每组只识别一次
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(groups)), 1)) as executor:
+            group_results = list(executor.map(__recognize, groups.values()))
+
+        results: List[Optional[MediaInfo]] = [None] * len(metas)
+        for indexes, mediainfo in zip(groups.values(), group_results):
+            if mediainfo:
+                if not simple:
+                    logger.info(f'{metas[indexes[0]].name} 识别到媒体信息：'
+                                f'{mediainfo.type.value} {mediainfo.title_year}')
+                    # 更新媒体图片
+                    self.obtain_images(mediainfo=mediainfo)
+                # 分发识别结果，每个元数据使用独立的副本
+                for seq, index in enumerate(indexes):
+                    results[index] = mediainfo if seq == 0 else copy.deepcopy(mediainfo)
+                continue
+            if simple:
+                continue
+            for index in indexes:
+                title = metas[index].title
+                # 尝试使用辅助识别，如果有注册响应事件的话
+                if eventmanager.check(ChainEventType.NameRecognize):
+                    logger.info(f'请求辅助识别，标题：{title} ...')
+                    mediainfo = self.recognize_help(title=title, org_meta=metas[index])
+                    if mediainfo:
+                        logger.info(f'{title} 识别到媒体信息：{mediainfo.type.value} {mediainfo.title_year}')
+                        self.obtain_images(mediainfo=mediainfo)
+                        results[index] = mediainfo
+                        continue
+                logger.warn(f'{title} 未识别到媒体信息')
+        return results
+
+    @staticmethod
+    def __recognize_key(meta: MetaBase) -> tuple:
+        """
+        批量识别的分组条件，包含识别媒体信息时用到的所有元数据字段
+        """
+        return (meta.type, meta.tmdbid, meta.doubanid,
+                (meta.cn_name or "").strip().lower(), (meta.en_name or "").strip().lower(),
+                meta.year, meta.begin_season)
+
     def recognize_help(self, title: str, org_meta: MetaBase) -> Optional[MediaInfo]:
         """
         请求辅助识别，返回媒体信息
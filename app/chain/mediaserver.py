@@ -1,14 +1,26 @@
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import List, Union, Optional, Generator, Any
 
 from app.chain import ChainBase
-from app.core.config import global_vars
+from app.core.config import global_vars, settings
 from app.db.mediaserver_oper import MediaServerOper
+from app.db.systemconfig_oper import SystemConfigOper
+from app.helper.libraryindex import LibraryIndexHelper
 from app.helper.service import ServiceConfigHelper
 from app.log import logger
 from app.schemas import MediaServerLibrary, MediaServerItem, MediaServerSeasonInfo, MediaServerPlayItem
+from app.schemas.types import SystemConfigKey
 
 lock = threading.Lock()
+# 同步媒体库时每批写入的条目数
+sync_chunk_size = 200
+# 同步媒体库时并发查询剧集信息的线程数
+sync_max_workers = 8
+# 增量同步时向前多取的时间（秒）
+sync_overlap = 3600
 
 
 class MediaServerChain(ChainBase):
@@ -113,9 +125,18 @@ class MediaServerChain(ChainBase):
         """
         return self.run_module("mediaserver_play_url", server=server, item_id=item_id)
 
-    def sync(self):
+    def changed_items(self, server: str, library_id: Union[str, int],
+                      since: datetime) -> Optional[List[MediaServerItem]]:
         """
-        同步媒体库所有数据到本地数据库
+        获取媒体库中指定时间后有变化的项目，媒体服务器不支持或查询失败时返回 None
+        """
+        return self.run_module("mediaserver_changed_items", server=server, library_id=library_id, since=since)
+
+    def sync(self, incremental: Optional[bool] = False):
+        """
+        同步媒体库所有数据到本地数据库，分批写入，同步完成后再删除本次未出现的条目，同步期间数据始终可查询
+        :param incremental: 增量同步，只获取上次同步后有变化的项目，距上次全量同步超过全量同步间隔、
+                            媒体库未同步过或媒体服务器不支持时全量同步
         """
         # 设置的媒体服务器
         mediaservers = ServiceConfigHelper.get_mediaserver_configs()
@@ -124,9 +145,11 @@ class MediaServerChain(ChainBase):
         with lock:
             # 汇总统计
             total_count = 0
-            # 清空登记薄
             dboper = MediaServerOper()
-            dboper.empty()
+            # 同步状态，服务器 -> {"full": 上次全量同步时间, "libraries": {媒体库ID: 上次同步时间}}
+            sync_state: dict = SystemConfigOper().get(SystemConfigKey.MediaServerSyncState) or {}
+            # 本次同步的媒体服务器
+            synced_servers = []
             # 遍历媒体服务器
             for mediaserver in mediaservers:
                 if not mediaserver:
@@ -136,42 +159,117 @@ class MediaServerChain(ChainBase):
                     logger.info(f"媒体服务器 {mediaserver.name} 未启用，跳过")
                     continue
                 server_name = mediaserver.name
+                synced_servers.append(server_name)
                 sync_libraries = mediaserver.sync_libraries or []
                 logger.info(f"开始同步媒体服务器 {server_name} 的数据 ...")
                 libraries = self.librarys(server_name)
                 if not libraries:
                     logger.info(f"没有获取到媒体服务器 {server_name} 的媒体库，跳过")
                     continue
+                # 本次同步开始时间，同步完成后删除早于该时间更新的条目
+                sync_start = time.time()
+                sync_time = datetime.fromtimestamp(sync_start).strftime("%Y-%m-%d %H:%M:%S")
+                server_state = sync_state.get(server_name) or {}
+                library_state = server_state.get("libraries") or {}
+                # 是否需要全量同步
+                full_sync = not incremental or not server_state.get("full") \
+                    or sync_start - server_state["full"] >= settings.MEDIASERVER_SYNC_FULL_INTERVAL * 3600
+                # 所有媒体库均已全量同步
+                all_full = True
+                synced_libraries = {}
                 for library in libraries:
                     if sync_libraries \
                             and "all" not in sync_libraries \
                             and str(library.id) not in sync_libraries:
                         logger.info(f"{library.name} 未在 {server_name} 同步媒体库列表中，跳过")
                         continue
-                    logger.info(f"正在同步 {server_name} 媒体库 {library.name} ...")
+                    changed_items = None
+                    last_sync = library_state.get(str(library.id))
+                    if not full_sync and last_sync:
+                        # 向前多取一段时间，避免媒体服务器与本机时间不一致时遗漏
+                        changed_items = self.changed_items(
+                            server=server_name, library_id=library.id,
+                            since=datetime.fromtimestamp(last_sync - sync_overlap, tz=timezone.utc))
+                    if changed_items is not None:
+                        logger.info(f"正在增量同步 {server_name} 媒体库 {library.name} ...")
+                        items = iter(changed_items)
+                    else:
+                        logger.info(f"正在同步 {server_name} 媒体库 {library.name} ...")
+                        items = self.items(server=server_name, library_id=library.id)
                     library_count = 0
-                    for item in self.items(server=server_name, library_id=library.id):
+                    for chunk in self.__chunk_items(items):
                         if global_vars.is_system_stopped:
                             return
-                        if not item or not item.item_id:
-                            continue
-                        logger.debug(f"正在同步 {item.title} ...")
+                        sync_items = self.__build_sync_items(server_name, chunk, sync_time)
+                        dboper.upsert(server_name, sync_items)
+                        LibraryIndexHelper().update(sync_items)
                         # 计数
-                        library_count += 1
-                        seasoninfo = {}
-                        # 类型
-                        item_type = "电视剧" if item.item_type in ["Series", "show"] else "电影"
-                        if item_type == "电视剧":
-                            # 查询剧集信息
-                            espisodes_info = self.episodes(server_name, item.item_id) or []
-                            for episode in espisodes_info:
-                                seasoninfo[episode.season] = episode.episodes
-                        # 插入数据
-                        item_dict = item.dict()
-                        item_dict["seasoninfo"] = seasoninfo
-                        item_dict["item_type"] = item_type
-                        dboper.add(**item_dict)
+                        library_count += len(chunk)
+                    if global_vars.is_system_stopped:
+                        return
+                    if changed_items is not None:
+                        all_full = False
+                    synced_libraries[str(library.id)] = sync_start
                     logger.info(f"{server_name} 媒体库 {library.name} 同步完成，共同步数量：{library_count}")
                     # 总数累加
                     total_count += library_count
+                if all_full:
+                    # 删除本次同步中未出现的条目
+                    dboper.delete_stale(server_name, sync_time)
+                    LibraryIndexHelper().remove_stale(server_name, sync_time)
+                    server_state["full"] = sync_start
+                server_state["libraries"] = synced_libraries
+                sync_state[server_name] = server_state
                 logger.info(f"媒体服务器 {server_name} 数据同步完成，总同步数量：{total_count}")
+            # 删除已停用或已删除的媒体服务器数据
+            dboper.delete_other_servers(synced_servers)
+            LibraryIndexHelper().retain_servers(synced_servers)
+            SystemConfigOper().set(SystemConfigKey.MediaServerSyncState,
+                                   {server: state for server, state in sync_state.items() if server in synced_servers})
+
+    @staticmethod
+    def __chunk_items(items: Generator) -> Generator[List[MediaServerItem], None, None]:
+        """
+        将媒体服务器条目按批次分组
+        """
+        chunk = []
+        for item in items:
+            if not item or not item.item_id:
+                continue
+            chunk.append(item)
+            if len(chunk) >= sync_chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def __build_sync_items(self, server: str, items: List[MediaServerItem], sync_time: str) -> List[dict]:
+        """
+        并发查询一批条目中电视剧的剧集信息，生成写入数据库的数据
+        """
+
+        def __get_seasoninfo(_item: MediaServerItem) -> dict:
+            logger.debug(f"正在同步 {_item.title} ...")
+            seasoninfo = {}
+            # 查询剧集信息
+            espisodes_info = self.episodes(server, _item.item_id) or []
+            for episode in espisodes_info:
+                seasoninfo[episode.season] = episode.episodes
+            return seasoninfo
+
+        tv_items = [item for item in items if item.item_type in ["Series", "show"]]
+        seasoninfos = {}
+        if tv_items:
+            with ThreadPoolExecutor(max_workers=min(sync_max_workers, len(tv_items))) as executor:
+                seasoninfos = dict(zip([item.item_id for item in tv_items],
+                                       executor.map(__get_seasoninfo, tv_items)))
+        sync_items = []
+        for item in items:
+            item_dict = item.dict()
+            item_dict["seasoninfo"] = seasoninfos.get(item.item_id, {})
+            # 类型
+            item_dict["item_type"] = "电视剧" if item.item_id in seasoninfos else "电影"
+            item_dict["server"] = server
+            item_dict["lst_mod_date"] = sync_time
+            sync_items.append(item_dict)
+        return sync_items
@@ -10,7 +10,7 @@ from app.chain import ChainBase
 from app.chain.bangumi import BangumiChain
 from app.chain.douban import DoubanChain
 from app.chain.tmdb import TmdbChain
-from app.core.cache import cache_backend, cached
+from app.core.cache import cache_refresh, cached
 from app.core.config import settings, global_vars
 from app.log import logger
 from app.schemas import MediaType
@@ -34,11 +34,9 @@ class RecommendChain(ChainBase, metaclass=Singleton):
 
     def refresh_recommend(self):
         """
-        刷新推荐
+        刷新推荐，重新获取数据覆盖缓存，刷新期间仍使用旧的缓存数据
         """
         logger.debug("Starting to refresh Recommend data.")
-        cache_backend.clear(region=recommend_cache_region)
-        logger.debug("Recommend Cache has been cleared.")
 
         # 推荐来源方法
         recommend_methods = [
@@ -69,7 +67,8 @@ class RecommendChain(ChainBase, metaclass=Singleton):
                 if method in methods_finished:
                     continue
                 logger.debug(f"Fetch {method.__name__} data for page {page}.")
-                data = method(page=page)
+                with cache_refresh(recommend_cache_region):
+                    data = method(page=page)
                 if not data:
                     logger.debug("All recommendation methods have finished fetching data. Ending pagination early.")
                     methods_finished.add(method)
@@ -157,7 +156,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
             logger.debug(f"Failed to write cache file {cache_path} for URL {url}: {e}")
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def tmdb_movies(self, sort_by: Optional[str] = "popularity.desc",
                     with_genres: Optional[str] = "",
                     with_original_language: Optional[str] = "",
@@ -183,7 +182,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [movie.to_dict() for movie in movies] if movies else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def tmdb_tvs(self, sort_by: Optional[str] = "popularity.desc",
                  with_genres: Optional[str] = "",
                  with_original_language: Optional[str] = "zh|en|ja|ko",
@@ -209,7 +208,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [tv.to_dict() for tv in tvs] if tvs else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def tmdb_trending(self, page: Optional[int] = 1) -> List[dict]:
         """
         TMDB流行趋势
@@ -218,7 +217,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [info.to_dict() for info in infos] if infos else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def bangumi_calendar(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         Bangumi每日放送
@@ -227,7 +226,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in medias[(page - 1) * count: page * count]] if medias else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_movie_showing(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣正在热映
@@ -236,7 +235,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in movies] if movies else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_movies(self, sort: Optional[str] = "R", tags: Optional[str] = "",
                       page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
@@ -247,7 +246,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in movies] if movies else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_tvs(self, sort: Optional[str] = "R", tags: Optional[str] = "",
                    page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
@@ -258,7 +257,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in tvs] if tvs else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_movie_top250(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣电影TOP250
@@ -267,7 +266,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in movies] if movies else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_tv_weekly_chinese(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣国产剧集榜
@@ -276,7 +275,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in tvs] if tvs else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_tv_weekly_global(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣全球剧集榜
@@ -285,7 +284,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in tvs] if tvs else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_tv_animation(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣热门动漫
@@ -294,7 +293,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in tvs] if tvs else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_movie_hot(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣热门电影
@@ -303,7 +302,7 @@ class RecommendChain(ChainBase, metaclass=Singleton):
         return [media.to_dict() for media in movies] if movies else []
 
     @log_execution_time(logger=logger)
-    @cached(ttl=recommend_ttl, region=recommend_cache_region)
+    @cached(ttl=recommend_ttl, region=recommend_cache_region, stale_ttl=recommend_ttl)
     def douban_tv_hot(self, page: Optional[int] = 1, count: Optional[int] = 30) -> List[dict]:
         """
         豆瓣热门电视剧
@@ -186,7 +186,7 @@ class SearchChain(ChainBase):
         # 匹配订阅附加参数
         if filter_params:
             logger.info(f'开始附加参数过滤，附加参数：{filter_params} ...')
-            torrents = [torrent for torrent in torrents if TorrentHelper().filter_torrent(torrent, filter_params)]
+            torrents = TorrentHelper().filter_torrents(torrents, filter_params)
         # 开始过滤规则过滤
         if rule_groups is None:
             # 取搜索过滤规则
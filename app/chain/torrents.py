@@ -1,17 +1,21 @@
 import re
 import traceback
-from typing import Dict, List, Union, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Union, Optional, Tuple
 
 from app.chain import ChainBase
 from app.chain.media import MediaChain
 from app.core.config import settings, global_vars
 from app.core.context import TorrentInfo, Context, MediaInfo
+from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.db.site_oper import SiteOper
 from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.rss import RssHelper
 from app.helper.sites import SitesHelper
 from app.helper.torrent import TorrentHelper
+from app.helper.torrentcache import TorrentCacheHelper
 from app.log import logger
 from app.schemas import Notification
 from app.schemas.types import SystemConfigKey, MessageChannel, NotificationType, MediaType
@@ -23,18 +27,10 @@ class TorrentsChain(ChainBase):
     站点首页或RSS种子处理链，服务于订阅、刷流等
     """
 
+    # 旧版整文件缓存，仅用于导入和清理
     _spider_file = "__torrents_cache__"
     _rss_file = "__rss_cache__"
 
-    @property
-    def cache_file(self) -> str:
-        """
-        返回缓存文件列表
-        """
-        if settings.SUBSCRIBE_MODE == 'spider':
-            return self._spider_file
-        return self._rss_file
-
     def remote_refresh(self, channel: MessageChannel, userid: Union[str, int] = None):
         """
         远程刷新订阅，发送消息
@@ -45,20 +41,39 @@ class TorrentsChain(ChainBase):
         self.post_message(Notification(channel=channel,
                                        title=f"种子刷新完成！", userid=userid))
 
-    def get_torrents(self, stype: Optional[str] = None) -> Dict[str, List[Context]]:
+    def get_torrents(self, stype: Optional[str] = None,
+                     domains: Optional[List[str]] = None) -> Dict[str, List[Context]]:
         """
         获取当前缓存的种子
         :param stype: 强制指定缓存类型，spider:爬虫缓存，rss:rss缓存
+        :param domains: 只加载指定站点域名的缓存，为空则加载所有站点
         """
 
         if not stype:
             stype = settings.SUBSCRIBE_MODE
 
         # 读取缓存
-        if stype == 'spider':
-            return self.load_cache(self._spider_file) or {}
-        else:
-            return self.load_cache(self._rss_file) or {}
+        self.__import_legacy_cache(stype)
+        return TorrentCacheHelper().get_all(stype, domains=domains)
+
+    def remove_torrent(self, domain: str, context: Context, stype: Optional[str] = None) -> bool:
+        """
+        从缓存中删除指定种子
+        :param domain: 站点域名
+        :param context: 种子上下文
+        :param stype: 强制指定缓存类型，spider:爬虫缓存，rss:rss缓存
+        """
+        return TorrentCacheHelper().delete(stype or settings.SUBSCRIBE_MODE, domain,
+                                           TorrentCacheHelper.signature(context))
+
+    def update_torrent(self, domain: str, context: Context, stype: Optional[str] = None):
+        """
+        更新缓存中指定种子的数据
+        :param domain: 站点域名
+        :param context: 种子上下文
+        :param stype: 强制指定缓存类型，spider:爬虫缓存，rss:rss缓存
+        """
+        TorrentCacheHelper().update(stype or settings.SUBSCRIBE_MODE, domain, context)
 
     def clear_torrents(self):
         """
@@ -67,8 +82,22 @@ class TorrentsChain(ChainBase):
         logger.info(f'开始清理种子缓存数据 ...')
         self.remove_cache(self._spider_file)
         self.remove_cache(self._rss_file)
+        TorrentCacheHelper().clear()
         logger.info(f'种子缓存数据清理完成')
 
+    def __import_legacy_cache(self, stype: str):
+        """
+        将旧版整文件缓存导入到种子缓存存储中，导入后删除旧文件
+        """
+        filename = self._spider_file if stype == "spider" else self._rss_file
+        if not (settings.TEMP_PATH / filename).exists():
+            return
+        cache = self.load_cache(filename)
+        if cache:
+            logger.info(f'正在导入旧版种子缓存 {filename} ...')
+            TorrentCacheHelper().import_legacy(stype, cache)
+        self.remove_cache(filename)
+
     def browse(self, domain: str, keyword: Optional[str] = None, cat: Optional[str] = None,
                page: Optional[int] = 0) -> List[TorrentInfo]:
         """
@@ -148,94 +177,137 @@ class TorrentsChain(ChainBase):
         if not sites:
             sites = SystemConfigOper().get(SystemConfigKey.RssSites) or []
 
-        # 读取缓存
-        torrents_cache = self.get_torrents()
+        # 导入旧版缓存
+        self.__import_legacy_cache(stype)
 
         # 缓存过滤掉无效种子
-        for _domain, _torrents in torrents_cache.items():
-            torrents_cache[_domain] = [_torrent for _torrent in _torrents
-                                       if not TorrentHelper().is_invalid(_torrent.torrent_info.enclosure)]
+        TorrentCacheHelper().delete_invalid(stype, TorrentHelper().is_invalid)
 
+        # 需要刷新的站点
+        indexers = []
         # 需要刷新的站点domain
         domains = []
-        # 遍历站点缓存资源
         for indexer in SitesHelper().get_indexers():
-            if global_vars.is_system_stopped:
-                break
             # 未开启的站点不刷新
             if sites and indexer.get("id") not in sites:
                 continue
             domain = StringUtils.get_url_domain(indexer.get("domain"))
+            # 同一域名只刷新一次，避免对同一站点并发请求
+            if domain in domains:
+                continue
             domains.append(domain)
+            indexers.append((domain, indexer))
+
+        if indexers:
+            # 开始计时
+            start_time = datetime.now()
+            # 并发数
+            max_workers = max(min(settings.SUBSCRIBE_REFRESH_THREADS or 1, len(indexers)), 1)
+            logger.info(f'开始刷新 {len(indexers)} 个站点，并发数：{max_workers} ...')
+            # 多线程获取站点种子，主线程按完成顺序依次识别
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                all_task = [executor.submit(self.__fetch_torrents, domain=domain, indexer=indexer, stype=stype)
+                            for domain, indexer in indexers]
+                for future in as_completed(all_task):
+                    if global_vars.is_system_stopped:
+                        break
+                    domain, indexer, torrents = future.result()
+                    self.__process_torrents(domain=domain, indexer=indexer, torrents=torrents, stype=stype)
+                if global_vars.is_system_stopped:
+                    for task in all_task:
+                        task.cancel()
+            logger.info(f'站点刷新完成，总耗时 {(datetime.now() - start_time).seconds} 秒')
+
+        # 去除不在站点范围内的缓存种子
+        if sites:
+            return self.get_torrents(stype=stype, domains=domains)
+        return self.get_torrents(stype=stype)
+
+    def __fetch_torrents(self, domain: str, indexer: dict, stype: str) -> Tuple[str, dict, List[TorrentInfo]]:
+        """
+        获取单个站点的最新种子，在线程池中执行
+        :param domain: 站点域名
+        :param indexer: 站点索引信息
+        :param stype: 刷新类型，spider:爬虫，rss:RSS
+        :return: 站点域名、站点索引信息、种子列表
+        """
+        if global_vars.is_system_stopped:
+            return domain, indexer, []
+        start_time = datetime.now()
+        try:
             if stype == "spider":
                 # 刷新首页种子
                 torrents: List[TorrentInfo] = self.browse(domain=domain)
             else:
                 # 刷新RSS种子
                 torrents: List[TorrentInfo] = self.rss(domain=domain)
-            # 按pubdate降序排列
-            torrents.sort(key=lambda x: x.pubdate or '', reverse=True)
-            # 取前N条
-            torrents = torrents[:settings.CONF.refresh]
-            if torrents:
-                # 过滤出没有处理过的种子 - 优化：使用集合查找，避免重复创建字符串列表
-                cached_signatures = {f'{t.torrent_info.title}{t.torrent_info.description}'
-                                     for t in torrents_cache.get(domain) or []}
-                torrents = [torrent for torrent in torrents
-                            if f'{torrent.title}{torrent.description}' not in cached_signatures]
-                if torrents:
-                    logger.info(f'{indexer.get("name")} 有 {len(torrents)} 个新种子')
-                else:
-                    logger.info(f'{indexer.get("name")} 没有新种子')
-                    continue
-                try:
-                    for torrent in torrents:
-                        if global_vars.is_system_stopped:
-                            break
-                        logger.info(f'处理资源：{torrent.title} ...')
-                        # 识别
-                        meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
-                        if torrent.title != meta.org_string:
-                            logger.info(f'种子名称应用识别词后发生改变：{torrent.title} => {meta.org_string}')
-                        # 使用站点种子分类，校正类型识别
-                        if meta.type != MediaType.TV \
-                                and torrent.category == MediaType.TV.value:
-                            meta.type = MediaType.TV
-                        # 识别媒体信息
-                        mediainfo: MediaInfo = MediaChain().recognize_by_meta(meta)
-                        if not mediainfo:
-                            logger.warn(f'{torrent.title} 未识别到媒体信息')
-                            # 存储空的媒体信息
-                            mediainfo = MediaInfo()
-                        # 清理多余数据，减少内存占用
-                        mediainfo.clear()
-                        # 上下文
-                        context = Context(meta_info=meta, media_info=mediainfo, torrent_info=torrent)
-                        # 添加到缓存
-                        if not torrents_cache.get(domain):
-                            torrents_cache[domain] = [context]
-                        else:
-                            torrents_cache[domain].append(context)
-                        # 如果超过了限制条数则移除掉前面的
-                        if len(torrents_cache[domain]) > settings.CONF.torrents:
-                            torrents_cache[domain] = torrents_cache[domain][-settings.CONF.torrents:]
-                finally:
-                    torrents.clear()
-                    del torrents
-            else:
-                logger.info(f'{indexer.get("name")} 没有获取到种子')
+        except Exception as err:
+            logger.error(f'{indexer.get("name")} 获取种子出错：{str(err)} - {traceback.format_exc()}')
+            torrents = []
+        logger.info(f'{indexer.get("name")} 获取到 {len(torrents or [])} 个种子，'
+                    f'耗时 {(datetime.now() - start_time).total_seconds():.2f} 秒')
+        return domain, indexer, torrents or []
 
-        # 保存缓存到本地
-        if stype == "spider":
-            self.save_cache(torrents_cache, self._spider_file)
+    @staticmethod
+    def __process_torrents(domain: str, indexer: dict, torrents: List[TorrentInfo], stype: str):
+        """
+        识别站点的新种子并追加到缓存中
+        :param domain: 站点域名
+        :param indexer: 站点索引信息
+        :param torrents: 站点种子列表
+        :param stype: 缓存类型，spider:爬虫缓存，rss:rss缓存
+        """
+        if not torrents:
+            logger.info(f'{indexer.get("name")} 没有获取到种子')
+            return
+        # 按pubdate降序排列
+        torrents.sort(key=lambda x: x.pubdate or '', reverse=True)
+        # 取前N条
+        torrents = torrents[:settings.CONF.refresh]
+        # 过滤出没有处理过的种子 - 优化：使用集合查找，避免重复创建字符串列表
+        cached_signatures = TorrentCacheHelper().signatures(stype, domain)
+        torrents = [torrent for torrent in torrents
+                    if f'{torrent.title}{torrent.description}' not in cached_signatures]
+        if torrents:
+            logger.info(f'{indexer.get("name")} 有 {len(torrents)} 个新种子')
         else:
-            self.save_cache(torrents_cache, self._rss_file)
-
-        # 去除不在站点范围内的缓存种子
-        if sites and torrents_cache:
-            torrents_cache = {k: v for k, v in torrents_cache.items() if k in domains}
-
-        return torrents_cache
+            logger.info(f'{indexer.get("name")} 没有新种子')
+            return
+        start_time = datetime.now()
+        # 新识别的种子
+        contexts: List[Context] = []
+        try:
+            metas: List[MetaBase] = []
+            for torrent in torrents:
+                if global_vars.is_system_stopped:
+                    break
+                logger.info(f'处理资源：{torrent.title} ...')
+                # 识别
+                meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
+                if torrent.title != meta.org_string:
+                    logger.info(f'种子名称应用识别词后发生改变：{torrent.title} => {meta.org_string}')
+                # 使用站点种子分类，校正类型识别
+                if meta.type != MediaType.TV \
+                        and torrent.category == MediaType.TV.value:
+                    meta.type = MediaType.TV
+                metas.append(meta)
+            # 批量识别媒体信息，相同名称的种子只识别一次
+            mediainfos = MediaChain().recognize_by_metas(metas)
+            for torrent, meta, mediainfo in zip(torrents, metas, mediainfos):
+                if not mediainfo:
+                    # 存储空的媒体信息
+                    mediainfo = MediaInfo()
+                # 清理多余数据，减少内存占用
+                mediainfo.clear()
+                # 上下文
+                contexts.append(Context(meta_info=meta, media_info=mediainfo, torrent_info=torrent))
+            # 追加到缓存，如果超过了限制条数则移除掉前面的
+            TorrentCacheHelper().append(stype, domain, contexts, limit=settings.CONF.torrents)
+        finally:
+            logger.info(f'{indexer.get("name")} 新种子识别完成，'
+                        f'耗时 {(datetime.now() - start_time).total_seconds():.2f} 秒')
+            torrents.clear()
+            del torrents
 
     def __renew_rss_url(self, domain: str, site: dict):
         """
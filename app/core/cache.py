@@ -1,22 +1,51 @@
+import asyncio
+import bisect
+import hashlib
 import inspect
+import itertools
 import json
 import pickle
+import sys
 import threading
+import time
+import uuid
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from urllib.parse import quote
 
 import redis
+import redis.asyncio
 from cachetools import TTLCache
-from cachetools.keys import hashkey
 
 from app.core.config import settings
+from app.helper.thread import ThreadHelper
 from app.log import logger
+from app.utils.string import StringUtils
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
 
 # 默认缓存区
 DEFAULT_CACHE_REGION = "DEFAULT"
+# 进程内缓存的锁标识
+LOCAL_LOCK_TOKEN = "local"
 
+# 创建缓存区实例的锁
 lock = threading.Lock()
 
 
@@ -86,6 +115,78 @@ class CacheBackend(ABC):
         """
         pass
 
+    def acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                     timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        获取跨进程的缓存计算锁，进程内缓存无需跨进程加锁
+
+        :param key: 缓存的键
+        :param region: 缓存的区
+        :param timeout: 锁的超时时间，单位秒
+        :return: 获取成功返回锁标识，锁已被其它进程持有时返回 None
+        """
+        return LOCAL_LOCK_TOKEN
+
+    def release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        释放跨进程的缓存计算锁
+
+        :param key: 缓存的键
+        :param token: 获取锁时返回的锁标识
+        :param region: 缓存的区
+        """
+        pass
+
+    async def async_set(self, key: str, value: Any, ttl: int,
+                        region: Optional[str] = DEFAULT_CACHE_REGION, **kwargs) -> None:
+        """
+        异步设置缓存，默认直接调用同步方法，需要网络读写的后端应重写
+        """
+        self.set(key, value, ttl=ttl, region=region, **kwargs)
+
+    async def async_exists(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> bool:
+        """
+        异步判断缓存键是否存在
+        """
+        return self.exists(key, region=region)
+
+    async def async_get(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> Any:
+        """
+        异步获取缓存的值
+        """
+        return self.get(key, region=region)
+
+    async def async_delete(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步删除缓存
+        """
+        self.delete(key, region=region)
+
+    async def async_acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                                 timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        异步获取跨进程的缓存计算锁
+        """
+        return self.acquire_lock(key, region=region, timeout=timeout)
+
+    async def async_release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步释放跨进程的缓存计算锁
+        """
+        self.release_lock(key, token, region=region)
+
+    def get_region_sizes(self) -> Dict[str, int]:
+        """
+        获取各缓存区当前的条目数，不支持统计的后端返回空字典
+        """
+        return {}
+
+    def get_memory_usage(self) -> Optional[Dict[str, int]]:
+        """
+        获取内存预算的使用情况，未设置内存预算的后端返回 None
+        """
+        return None
+
     @staticmethod
     def get_region(region: Optional[str] = DEFAULT_CACHE_REGION):
         """
@@ -102,20 +203,300 @@ class CacheBackend(ABC):
         :param kwargs: 关键字参数
         :return: 缓存键
         """
-        signature = inspect.signature(func)
-        # 绑定传入的参数并应用默认值
-        bound = signature.bind(*args, **kwargs)
-        bound.apply_defaults()
-        # 忽略第一个参数，如果它是实例(self)或类(cls)
-        parameters = list(signature.parameters.keys())
-        if parameters and parameters[0] in ("self", "cls"):
-            bound.arguments.pop(parameters[0], None)
-        # 按照函数签名顺序提取参数值列表
-        keys = [
-            bound.arguments[param] for param in signature.parameters if param in bound.arguments
-        ]
-        # 使用有序参数生成缓存键
-        return f"{func.__name__}_{hashkey(*keys)}"
+        key_builder = _key_builders.get(func)
+        if key_builder is None:
+            key_builder = _key_builders[func] = make_cache_key_builder(func)
+        return key_builder(args, kwargs)
+
+
+# 函数对应的缓存键生成方法
+_key_builders: Dict[Callable, Callable[[tuple, dict], str]] = {}
+# 直接使用 repr 生成缓存键的简单类型
+_simple_key_types = (str, int, float, bool, bytes, type(None))
+
+
+def _freeze_key_value(value: Any) -> Any:
+    """
+    将参数值转换为稳定的可比较形式，字典和集合按元素排序，与插入顺序无关
+    """
+    if isinstance(value, _simple_key_types):
+        return value
+    if isinstance(value, dict):
+        items = [(_freeze_key_value(k), _freeze_key_value(v)) for k, v in value.items()]
+        try:
+            items.sort()
+        except TypeError:
+            items.sort(key=repr)
+        return "dict", tuple(items)
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_freeze_key_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return "set", tuple(sorted((_freeze_key_value(v) for v in value), key=repr))
+    return value
+
+
+def _digest_key(func_name: str, values: tuple) -> str:
+    """
+    生成定长的缓存键
+    """
+    if not all(isinstance(value, _simple_key_types) for value in values):
+        values = tuple(_freeze_key_value(value) for value in values)
+    return f"{func_name}_{hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()}"
+
+
+def make_cache_key_builder(func) -> Callable[[tuple, dict], str]:
+    """
+    在装饰时预先解析函数签名，生成缓存键构建方法，避免每次调用时绑定参数
+    :param func: 被装饰的函数
+    :return: 根据位置参数和关键字参数生成缓存键的方法
+    """
+    signature = inspect.signature(func)
+    parameters = list(signature.parameters.values())
+    # 忽略第一个参数，如果它是实例(self)或类(cls)
+    skip = 1 if parameters and parameters[0].name in ("self", "cls") else 0
+    func_name = func.__name__
+
+    if any(param.kind not in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+           for param in parameters):
+        # 包含可变参数或仅关键字参数时，按签名绑定参数
+        def bind_key(args: tuple, kwargs: dict) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return _digest_key(func_name, tuple(bound.arguments[param.name] for param in parameters[skip:]))
+
+        return bind_key
+
+    names = [param.name for param in parameters]
+    defaults = [param.default for param in parameters]
+    count = len(parameters)
+
+    def build_key(args: tuple, kwargs: dict) -> str:
+        if not kwargs and len(args) == count:
+            values = args[skip:]
+        else:
+            values = list(args[skip:])
+            for index in range(max(len(args), skip), count):
+                name = names[index]
+                if name in kwargs:
+                    values.append(kwargs[name])
+                elif defaults[index] is not inspect.Parameter.empty:
+                    values.append(defaults[index])
+                else:
+                    # 参数缺失，按签名绑定以抛出与调用一致的异常
+                    signature.bind(*args, **kwargs)
+            values = tuple(values)
+        return _digest_key(func_name, values)
+
+    return build_key
+
+
+class CacheMetrics:
+    """
+    缓存统计，按缓存区记录命中、未命中、写入、淘汰次数以及后端读写耗时分布
+    """
+
+    # 耗时分布的桶上限，单位秒
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # region -> 计数，hits/misses/stale_hits/sets/evictions
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # (region, 操作) -> [各桶计数..., 超出最大桶的计数, 总次数, 总耗时]
+        self._latency: Dict[Tuple[str, str], list] = {}
+
+    def incr(self, region: str, name: str, count: Optional[int] = 1):
+        """
+        增加计数
+        """
+        with self._lock:
+            counters = self._counters.get(region)
+            if counters is None:
+                counters = self._counters[region] = dict.fromkeys(
+                    ("hits", "misses", "stale_hits", "sets", "evictions"), 0)
+            counters[name] += count
+
+    def observe(self, region: str, op: str, seconds: float):
+        """
+        记录后端操作耗时
+        """
+        key = (region, op)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = [0] * (len(self.BUCKETS) + 1) + [0, 0.0]
+            histogram[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def reset(self):
+        """
+        清空统计
+        """
+        with self._lock:
+            self._counters.clear()
+            self._latency.clear()
+
+    def stats(self, sizes: Optional[Dict[str, int]] = None) -> Dict[str, dict]:
+        """
+        获取各缓存区的统计数据
+
+        :param sizes: 各缓存区当前的条目数
+        :return: region -> 统计数据
+        """
+        sizes = sizes or {}
+        with self._lock:
+            counters = {region: dict(values) for region, values in self._counters.items()}
+            latency = {key: list(values) for key, values in self._latency.items()}
+        result = {}
+        for region in set(counters) | set(sizes) | {region for region, _ in latency}:
+            values = counters.get(region) or dict.fromkeys(("hits", "misses", "stale_hits", "sets", "evictions"), 0)
+            total = values["hits"] + values["misses"]
+            result[region] = {
+                **values,
+                "hit_rate": round(values["hits"] / total, 4) if total else 0,
+                "size": sizes.get(region),
+                "latency": {
+                    op: {
+                        "count": histogram[-2],
+                        "avg_ms": round(histogram[-1] / histogram[-2] * 1000, 3) if histogram[-2] else 0,
+                        "buckets": dict(zip([str(b) for b in self.BUCKETS] + ["+Inf"],
+                                            itertools.accumulate(histogram[:-2])))
+                    }
+                    for (r, op), histogram in latency.items() if r == region
+                }
+            }
+        return result
+
+    def prometheus(self, sizes: Optional[Dict[str, int]] = None) -> str:
+        """
+        以 Prometheus 文本格式输出统计数据
+
+        :param sizes: 各缓存区当前的条目数
+        """
+
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        stats = self.stats(sizes)
+        lines = []
+        for name, desc in (("hits", "Cache hits"), ("misses", "Cache misses"),
+                           ("stale_hits", "Cache hits served after soft expiry"),
+                           ("sets", "Cache writes"), ("evictions", "Cache entries evicted by size limit")):
+            lines.append(f"# HELP moviepilot_cache_{name}_total {desc}")
+            lines.append(f"# TYPE moviepilot_cache_{name}_total counter")
+            for region, values in sorted(stats.items()):
+                lines.append(f'moviepilot_cache_{name}_total{{region="{label(region)}"}} {values[name]}')
+        lines.append("# HELP moviepilot_cache_size Current number of cache entries")
+        lines.append("# TYPE moviepilot_cache_size gauge")
+        for region, values in sorted(stats.items()):
+            if values["size"] is not None:
+                lines.append(f'moviepilot_cache_size{{region="{label(region)}"}} {values["size"]}')
+        lines.append("# HELP moviepilot_cache_backend_seconds Cache backend operation latency")
+        lines.append("# TYPE moviepilot_cache_backend_seconds histogram")
+        with self._lock:
+            latency = {key: list(values) for key, values in self._latency.items()}
+        for (region, op), histogram in sorted(latency.items()):
+            labels = f'region="{label(region)}",op="{op}"'
+            for bound, count in zip([str(b) for b in self.BUCKETS] + ["+Inf"],
+                                    itertools.accumulate(histogram[:-2])):
+                lines.append(f'moviepilot_cache_backend_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"moviepilot_cache_backend_seconds_sum{{{labels}}} {histogram[-1]}")
+            lines.append(f"moviepilot_cache_backend_seconds_count{{{labels}}} {histogram[-2]}")
+        return "\n".join(lines) + "\n"
+
+
+class _MemoryBudget:
+    """
+    进程内缓存的内存预算，按估算的字节数记录所有缓存区的条目，超出预算时跨缓存区淘汰最久未使用的条目
+    """
+
+    def __init__(self, limit: int):
+        """
+        :param limit: 内存预算，单位字节
+        """
+        self.limit = limit
+        self.total = 0
+        self._lock = threading.Lock()
+        # (region, key) -> 估算的字节数，按最近使用排序
+        self._entries: OrderedDict[Tuple[str, Any], int] = OrderedDict()
+
+    @staticmethod
+    def estimate(value: Any) -> int:
+        """
+        估算缓存值占用的字节数，以 pickle 序列化后的长度近似，无法序列化时使用对象自身大小
+        """
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(value)
+
+    def add(self, region: str, key: Any, size: int) -> List[Tuple[str, Any]]:
+        """
+        记录条目，返回超出预算需要淘汰的条目
+        """
+        victims = []
+        with self._lock:
+            self.total += size - self._entries.pop((region, key), 0)
+            self._entries[(region, key)] = size
+            while self.total > self.limit and len(self._entries) > 1:
+                victim, victim_size = self._entries.popitem(last=False)
+                self.total -= victim_size
+                victims.append(victim)
+        return victims
+
+    def touch(self, region: str, key: Any):
+        """
+        标记条目最近被使用
+        """
+        with self._lock:
+            if (region, key) in self._entries:
+                self._entries.move_to_end((region, key))
+
+    def discard(self, region: str, key: Any):
+        """
+        移除条目
+        """
+        with self._lock:
+            self.total -= self._entries.pop((region, key), 0)
+
+    def discard_region(self, region: Optional[str] = None):
+        """
+        移除缓存区的所有条目，未指定缓存区时移除全部
+        """
+        with self._lock:
+            if region is None:
+                self._entries.clear()
+                self.total = 0
+                return
+            for entry in [entry for entry in self._entries if entry[0] == region]:
+                self.total -= self._entries.pop(entry)
+
+
+class _RegionTTLCache(TTLCache):
+    """
+    单个缓存区的 TTLCache，持有缓存区自己的锁，超出最大条目数或过期移除条目时同步内存预算和淘汰统计
+    """
+
+    def __init__(self, maxsize: int, ttl: int, region: str, budget: Optional[_MemoryBudget] = None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.region = region
+        self.budget = budget
+        self.lock = threading.RLock()
+
+    def popitem(self):
+        item = super().popitem()
+        cache_metrics.incr(self.region, "evictions")
+        if self.budget:
+            self.budget.discard(self.region, item[0])
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if self.budget:
+            for key, _ in expired:
+                self.budget.discard(self.region, key)
+        return expired
 
 
 class CacheToolsBackend(CacheBackend):
@@ -124,32 +505,51 @@ class CacheToolsBackend(CacheBackend):
 
     特性：
     - 支持动态设置缓存的 TTL（Time To Live，存活时间）和最大条目数（Maxsize）
-    - 缓存实例按区域（region）划分，不同 region 拥有独立的缓存实例
+    - 缓存实例按区域（region）划分，不同 region 拥有独立的缓存实例和锁
     - 同一 region 共享相同的 TTL 和 Maxsize，设置时只能作用于整个 region
+    - 可设置所有 region 共享的内存预算，超出时跨 region 淘汰最久未使用的条目
 
     限制：
     - 不支持按 `key` 独立隔离 TTL 和 Maxsize，仅支持作用于 region 级别
+    - 内存占用按序列化后的大小估算，与实际占用存在偏差
     """
 
-    def __init__(self, maxsize: Optional[int] = 512, ttl: Optional[int] = 1800):
+    def __init__(self, maxsize: Optional[int] = 512, ttl: Optional[int] = 1800,
+                 memory_limit: Optional[int] = None):
         """
         初始化缓存实例
 
         :param maxsize: 缓存的最大条目数
         :param ttl: 默认缓存存活时间，单位秒
+        :param memory_limit: 所有缓存区共享的内存预算，单位字节，为空或 0 时不限制
         """
         self.maxsize = maxsize
         self.ttl = ttl
+        self._budget = _MemoryBudget(memory_limit) if memory_limit else None
         # 存储各个 region 的缓存实例，region -> TTLCache
-        self._region_caches: Dict[str, TTLCache] = {}
+        self._region_caches: Dict[str, _RegionTTLCache] = {}
 
-    def __get_region_cache(self, region: str) -> Optional[TTLCache]:
+    def __get_region_cache(self, region: str) -> Optional[_RegionTTLCache]:
         """
         获取指定区域的缓存实例，如果不存在则返回 None
         """
         region = self.get_region(region)
         return self._region_caches.get(region)
 
+    def __evict(self, victims: List[Tuple[str, Any]]):
+        """
+        淘汰超出内存预算的条目
+        """
+        for region, key in victims:
+            region_cache = self.__get_region_cache(region)
+            if region_cache is None:
+                continue
+            with region_cache.lock:
+                # 先移除已过期的条目，未过期的条目直接删除
+                region_cache.expire()
+                region_cache.pop(key, None)
+            cache_metrics.incr(region, "evictions")
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None,
             region: Optional[str] = DEFAULT_CACHE_REGION, **kwargs) -> None:
         """
@@ -163,12 +563,21 @@ class CacheToolsBackend(CacheBackend):
         """
         ttl = ttl or self.ttl
         maxsize = kwargs.get("maxsize", self.maxsize)
+        region_name = region or DEFAULT_CACHE_REGION
         region = self.get_region(region)
         # 如果该 key 尚未有缓存实例，则创建一个新的 TTLCache 实例
-        region_cache = self._region_caches.setdefault(region, TTLCache(maxsize=maxsize, ttl=ttl))
+        region_cache = self._region_caches.get(region)
+        if region_cache is None:
+            with lock:
+                region_cache = self._region_caches.setdefault(
+                    region, _RegionTTLCache(maxsize=maxsize, ttl=ttl, region=region_name, budget=self._budget))
+        # 估算大小放在锁外
+        size = self._budget.estimate(value) if self._budget else 0
         # 设置缓存值
-        with lock:
+        with region_cache.lock:
             region_cache[key] = value
+        if self._budget:
+            self.__evict(self._budget.add(region_name, key, size))
 
     def exists(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> bool:
         """
@@ -181,7 +590,8 @@ class CacheToolsBackend(CacheBackend):
         region_cache = self.__get_region_cache(region)
         if region_cache is None:
             return False
-        return key in region_cache
+        with region_cache.lock:
+            return key in region_cache
 
     def get(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> Any:
         """
@@ -194,7 +604,11 @@ class CacheToolsBackend(CacheBackend):
         region_cache = self.__get_region_cache(region)
         if region_cache is None:
             return None
-        return region_cache.get(key)
+        with region_cache.lock:
+            value = region_cache.get(key)
+        if self._budget and value is not None:
+            self._budget.touch(region_cache.region, key)
+        return value
 
     def delete(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION):
         """
@@ -206,8 +620,10 @@ class CacheToolsBackend(CacheBackend):
         region_cache = self.__get_region_cache(region)
         if region_cache is None:
             return
-        with lock:
-            del region_cache[key]
+        with region_cache.lock:
+            region_cache.pop(key, None)
+        if self._budget:
+            self._budget.discard(region_cache.region, key)
 
     def clear(self, region: Optional[str] = None) -> None:
         """
@@ -219,16 +635,34 @@ class CacheToolsBackend(CacheBackend):
             # 清理指定缓存区
             region_cache = self.__get_region_cache(region)
             if region_cache:
-                with lock:
+                with region_cache.lock:
                     region_cache.clear()
+                if self._budget:
+                    self._budget.discard_region(region_cache.region)
                 logger.info(f"Cleared cache for region: {region}")
         else:
             # 清除所有区域的缓存
-            for region_cache in self._region_caches.values():
-                with lock:
+            for region_cache in list(self._region_caches.values()):
+                with region_cache.lock:
                     region_cache.clear()
+            if self._budget:
+                self._budget.discard_region()
             logger.info("Cleared all cache")
 
+    def get_region_sizes(self) -> Dict[str, int]:
+        """
+        获取各缓存区当前的条目数
+        """
+        return {region_cache.region: len(region_cache) for region_cache in list(self._region_caches.values())}
+
+    def get_memory_usage(self) -> Optional[Dict[str, int]]:
+        """
+        获取内存预算的使用情况，未设置内存预算时返回 None
+        """
+        if not self._budget:
+            return None
+        return {"limit": self._budget.limit, "used": self._budget.total}
+
     def close(self) -> None:
         """
         内存缓存不需要关闭资源
@@ -236,6 +670,100 @@ class CacheToolsBackend(CacheBackend):
         pass
 
 
+class CacheCodec:
+    """
+    Redis 缓存值的编解码器，值的头部记录序列化和压缩方式，格式为 `<序列化>[+<压缩>]\x00<数据>`
+
+    - 普通数据优先使用 msgpack（未安装时使用 JSON），无法序列化的对象使用 pickle 协议 5
+    - 序列化后超过指定大小时使用 zstd 或 lz4 压缩，对应依赖未安装时不压缩
+    """
+
+    # 可用的序列化方式
+    SERIALIZERS = ("msgpack", "json", "pickle")
+    # 可用的压缩方式
+    COMPRESSIONS = ("zstd", "lz4")
+
+    def __init__(self, serializer: Optional[str] = None, compression: Optional[str] = None,
+                 compress_min_size: Optional[int] = 1024):
+        """
+        :param serializer: 序列化方式，msgpack、json 或 pickle，默认 msgpack 可用时使用 msgpack，否则使用 json
+        :param compression: 压缩方式，zstd 或 lz4，默认不压缩
+        :param compress_min_size: 序列化后达到该字节数时才压缩
+        """
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed, falling back to json serializer")
+            serializer = "json"
+        if serializer not in self.SERIALIZERS:
+            serializer = "msgpack" if msgpack is not None else "json"
+        if compression and compression not in self.COMPRESSIONS:
+            logger.warning(f"Unknown cache compression: {compression}, compression disabled")
+            compression = None
+        if (compression == "zstd" and zstandard is None) or (compression == "lz4" and lz4_frame is None):
+            logger.warning(f"{compression} is not installed, compression disabled")
+            compression = None
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_size = compress_min_size or 0
+        # 已知无法使用普通数据序列化的类型，直接使用 pickle
+        self._pickle_types: Set[type] = set()
+
+    def __serialize(self, value: Any) -> Tuple[bytes, bytes]:
+        """
+        序列化值，返回格式标识和数据
+        """
+        vt = type(value)
+        if self.serializer != "pickle" and vt not in self._pickle_types:
+            try:
+                if self.serializer == "msgpack":
+                    return b"MSGPACK", msgpack.packb(value, use_bin_type=True)
+                return b"JSON", json.dumps(value).encode("utf-8")
+            except (TypeError, ValueError, OverflowError):
+                # 同一缓存区的返回值类型通常一致，记录后不再尝试
+                self._pickle_types.add(vt)
+        return b"PICKLE5", pickle.dumps(value, protocol=5)
+
+    def encode(self, value: Any) -> bytes:
+        """
+        将值编码为二进制数据
+        """
+        marker, data = self.__serialize(value)
+        if self.compression and len(data) >= self.compress_min_size:
+            if self.compression == "zstd":
+                data = zstandard.ZstdCompressor(level=3).compress(data)
+            else:
+                data = lz4_frame.compress(data)
+            marker += b"+" + self.compression.encode("utf-8")
+        return marker + b"\x00" + data
+
+    @staticmethod
+    def decode(value: bytes) -> Any:
+        """
+        将二进制数据解码为原始值
+        """
+        header, data = value.split(b"\x00", 1)
+        marker, _, compression = header.partition(b"+")
+        if compression == b"zstd":
+            if zstandard is None:
+                raise ValueError("zstandard is not installed")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        elif compression == b"lz4":
+            if lz4_frame is None:
+                raise ValueError("lz4 is not installed")
+            data = lz4_frame.decompress(data)
+        elif compression:
+            raise ValueError("Unknown compression format")
+        if marker == b"MSGPACK":
+            if msgpack is None:
+                raise ValueError("msgpack is not installed")
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        elif marker == b"JSON":
+            return json.loads(data.decode("utf-8"))
+        elif marker in (b"PICKLE", b"PICKLE5"):
+            return pickle.loads(data)
+        else:
+            raise ValueError("Unknown serialization format")
+
+
 class RedisBackend(CacheBackend):
     """
     基于 Redis 实现的缓存后端，支持通过 Redis 存储缓存
@@ -248,11 +776,18 @@ class RedisBackend(CacheBackend):
     限制：
     - 由于 Redis 的分布式特性，写入和读取可能受到网络延迟的影响
     - Pickle 反序列化可能存在安全风险，需进一步重构调用来源，避免复杂对象缓存
+    - 值的编解码由 `CacheCodec` 完成，可通过 `register_codec` 为缓存区单独指定
     """
 
-    # 类型缓存集合，针对非容器简单类型
-    _complex_serializable_types = set()
-    _simple_serializable_types = set()
+    # 缓存区对应的编解码器
+    _region_codecs: Dict[str, "CacheCodec"] = {}
+    # 只删除自己持有的锁
+    _release_lock_script = """
+        if redis.call("get", KEYS[1]) == ARGV[1] then
+            return redis.call("del", KEYS[1])
+        end
+        return 0
+    """
 
     def __init__(self, redis_url: Optional[str] = "redis://localhost", ttl: Optional[int] = 1800):
         """
@@ -263,6 +798,9 @@ class RedisBackend(CacheBackend):
         """
         self.redis_url = redis_url
         self.ttl = ttl
+        # 异步客户端，按事件循环创建，事件循环销毁后自动移除
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
         try:
             self.client = redis.Redis.from_url(
                 redis_url,
@@ -293,61 +831,41 @@ class RedisBackend(CacheBackend):
         except Exception as e:
             logger.error(f"Failed to set Redis maxmemory or policy: {e}")
 
-    @staticmethod
-    def is_container_type(t):
-        return t in (list, dict, tuple, set)
-
     @classmethod
-    def serialize(cls, value: Any) -> bytes:
+    def register_codec(cls, region: str, codec: "CacheCodec"):
         """
-        将值序列化为二进制数据，根据序列化方式标识格式
+        为缓存区指定编解码器，未指定的缓存区使用配置的默认编解码器
+
+        :param region: 缓存的区
+        :param codec: 编解码器
         """
-        vt = type(value)
-        # 针对非容器类型使用缓存策略
-        if not cls.is_container_type(vt):
-            # 如果已知需要复杂序列化
-            if vt in cls._complex_serializable_types:
-                return b"PICKLE" + b"\x00" + pickle.dumps(value)
-            # 如果已知可以简单序列化
-            if vt in cls._simple_serializable_types:
-                json_data = json.dumps(value).encode("utf-8")
-                return b"JSON" + b"\x00" + json_data
-            # 对于未知的非容器类型，尝试简单序列化，如抛出异常，再使用复杂序列化
-            try:
-                json_data = json.dumps(value).encode("utf-8")
-                cls._simple_serializable_types.add(vt)
-                return b"JSON" + b"\x00" + json_data
-            except TypeError:
-                cls._complex_serializable_types.add(vt)
-                return b"PICKLE" + b"\x00" + pickle.dumps(value)
-        # 针对容器类型，每次尝试简单序列化，不使用缓存
-        else:
-            try:
-                json_data = json.dumps(value).encode("utf-8")
-                return b"JSON" + b"\x00" + json_data
-            except TypeError:
-                return b"PICKLE" + b"\x00" + pickle.dumps(value)
+        cls._region_codecs[region] = codec
 
-    @classmethod
-    def deserialize(cls, value: bytes) -> Any:
+    def get_codec(self, region: Optional[str]) -> "CacheCodec":
         """
-        将二进制数据反序列化为原始值，根据格式标识区分序列化方式
+        获取缓存区的编解码器，每个缓存区独立记录需要 pickle 序列化的类型
         """
-        format_marker, data = value.split(b"\x00", 1)
-        if format_marker == b"JSON":
-            return json.loads(data.decode("utf-8"))
-        elif format_marker == b"PICKLE":
-            return pickle.loads(data)
-        else:
-            raise ValueError("Unknown serialization format")
+        region = region or DEFAULT_CACHE_REGION
+        codec = self._region_codecs.get(region)
+        if codec is None:
+            codec = self._region_codecs.setdefault(region, CacheCodec(
+                compression=settings.CACHE_REDIS_COMPRESSION,
+                compress_min_size=settings.CACHE_REDIS_COMPRESS_MIN_SIZE
+            ))
+        return codec
+
+    def serialize(self, value: Any, region: Optional[str] = DEFAULT_CACHE_REGION) -> bytes:
+        """
+        按缓存区的编解码器将值序列化为二进制数据
+        """
+        return self.get_codec(region).encode(value)
 
-    # @staticmethod
-    # def serialize(value: Any) -> bytes:
-    #     return msgpack.packb(value, use_bin_type=True)
-    #
-    # @staticmethod
-    # def deserialize(value: bytes) -> Any:
-    #     return msgpack.unpackb(value, raw=False)
+    @staticmethod
+    def deserialize(value: bytes) -> Any:
+        """
+        将二进制数据反序列化为原始值，序列化和压缩方式从头部读取，与写入时的编解码器无关
+        """
+        return CacheCodec.decode(value)
 
     def get_redis_key(self, region: str, key: str) -> str:
         """
@@ -372,7 +890,7 @@ class RedisBackend(CacheBackend):
             ttl = ttl or self.ttl
             redis_key = self.get_redis_key(region, key)
             # 对值进行序列化
-            serialized_value = self.serialize(value)
+            serialized_value = self.serialize(value, region=region)
             kwargs.pop("maxsize", None)
             self.client.set(redis_key, serialized_value, ex=ttl, **kwargs)
         except Exception as e:
@@ -424,6 +942,134 @@ class RedisBackend(CacheBackend):
         except Exception as e:
             logger.error(f"Failed to delete key: {key} in region: {region}, error: {e}")
 
+    def acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                     timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        通过 SET NX 获取跨进程的缓存计算锁
+
+        :param key: 缓存的键
+        :param region: 缓存的区
+        :param timeout: 锁的超时时间，单位秒
+        :return: 获取成功返回锁标识，锁已被其它进程持有时返回 None
+        """
+        token = uuid.uuid4().hex
+        try:
+            if self.client.set(f"{self.get_redis_key(region, key)}:lock", token, nx=True, ex=timeout):
+                return token
+            return None
+        except Exception as e:
+            logger.error(f"Failed to acquire lock for key: {key} in region: {region}, error: {e}")
+            # Redis 异常时不阻塞计算
+            return token
+
+    def release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        释放跨进程的缓存计算锁，只释放自己持有的锁
+
+        :param key: 缓存的键
+        :param token: 获取锁时返回的锁标识
+        :param region: 缓存的区
+        """
+        try:
+            self.client.eval(self._release_lock_script, 1, f"{self.get_redis_key(region, key)}:lock", token)
+        except Exception as e:
+            logger.error(f"Failed to release lock for key: {key} in region: {region}, error: {e}")
+
+    @property
+    def async_client(self) -> redis.asyncio.Redis:
+        """
+        当前事件循环的异步客户端，连接与事件循环绑定，每个事件循环使用各自的客户端
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is not None:
+            return client
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # 已关闭的事件循环的客户端不再可用，移除后其连接随对象回收释放
+                for closed_loop in [item for item in self._async_clients.keys() if item.is_closed()]:
+                    self._async_clients.pop(closed_loop, None)
+                client = redis.asyncio.Redis.from_url(
+                    self.redis_url,
+                    decode_responses=False,
+                    socket_timeout=30,
+                    socket_connect_timeout=5,
+                    health_check_interval=60,
+                )
+                self._async_clients[loop] = client
+        return client
+
+    async def async_set(self, key: str, value: Any, ttl: Optional[int] = None,
+                        region: Optional[str] = DEFAULT_CACHE_REGION, **kwargs) -> None:
+        """
+        异步设置缓存
+        """
+        try:
+            ttl = ttl or self.ttl
+            redis_key = self.get_redis_key(region, key)
+            serialized_value = self.serialize(value, region=region)
+            kwargs.pop("maxsize", None)
+            await self.async_client.set(redis_key, serialized_value, ex=ttl, **kwargs)
+        except Exception as e:
+            logger.error(f"Failed to set key: {key} in region: {region}, error: {e}")
+
+    async def async_exists(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> bool:
+        """
+        异步判断缓存键是否存在
+        """
+        try:
+            return await self.async_client.exists(self.get_redis_key(region, key)) == 1
+        except Exception as e:
+            logger.error(f"Failed to exists key: {key} region: {region}, error: {e}")
+            return False
+
+    async def async_get(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> Optional[Any]:
+        """
+        异步获取缓存的值
+        """
+        try:
+            value = await self.async_client.get(self.get_redis_key(region, key))
+            if value is not None:
+                return self.deserialize(value)  # noqa
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get key: {key} in region: {region}, error: {e}")
+            return None
+
+    async def async_delete(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步删除缓存
+        """
+        try:
+            await self.async_client.delete(self.get_redis_key(region, key))
+        except Exception as e:
+            logger.error(f"Failed to delete key: {key} in region: {region}, error: {e}")
+
+    async def async_acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                                 timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        异步获取跨进程的缓存计算锁
+        """
+        token = uuid.uuid4().hex
+        try:
+            if await self.async_client.set(f"{self.get_redis_key(region, key)}:lock", token, nx=True, ex=timeout):
+                return token
+            return None
+        except Exception as e:
+            logger.error(f"Failed to acquire lock for key: {key} in region: {region}, error: {e}")
+            return token
+
+    async def async_release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步释放跨进程的缓存计算锁
+        """
+        try:
+            await self.async_client.eval(self._release_lock_script, 1,
+                                         f"{self.get_redis_key(region, key)}:lock", token)
+        except Exception as e:
+            logger.error(f"Failed to release lock for key: {key} in region: {region}, error: {e}")
+
     def clear(self, region: Optional[str] = None) -> None:
         """
         清除指定区域的缓存或全部缓存
@@ -446,12 +1092,291 @@ class RedisBackend(CacheBackend):
         except Exception as e:
             logger.error(f"Failed to clear cache, region: {region}, error: {e}")
 
+    def get_region_sizes(self) -> Dict[str, int]:
+        """
+        获取已有统计的缓存区在 Redis 中的条目数，需要遍历键，仅在查询统计时调用
+        """
+        sizes = {}
+        for region in cache_metrics.stats():
+            try:
+                match = f"{self.get_region(quote(region))}:key:*"
+                sizes[region] = sum(1 for key in self.client.scan_iter(match, count=1000)
+                                    if not key.endswith(b":lock"))
+            except Exception as e:
+                logger.error(f"Failed to count keys in region: {region}, error: {e}")
+        return sizes
+
     def close(self) -> None:
         """
         关闭 Redis 客户端的连接池
         """
         if self.client:
             self.client.close()
+        with self._async_lock:
+            async_clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        for loop, client in async_clients:
+            # 异步客户端需在所属事件循环中关闭，事件循环已关闭时连接随其释放
+            if loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                else:
+                    loop.run_until_complete(client.aclose())
+            except Exception as e:
+                logger.debug(f"Failed to close async Redis client: {e}")
+
+
+class TieredBackend(CacheBackend):
+    """
+    两级缓存后端，进程内 `TTLCache` 在前，Redis 在后
+
+    特性：
+    - 读取时优先命中本地缓存，未命中时从 Redis 读取并回填本地缓存
+    - 写入时同时写入本地缓存和 Redis（write-through）
+    - 写入、删除和清理时通过 Redis 发布订阅通知其它进程失效本地缓存
+
+    限制：
+    - 本地缓存的存活时间较短，其它进程的失效通知丢失时最多在本地缓存过期前读到旧值
+    - 订阅连接中断时退避重连，恢复后清空本地缓存
+    """
+
+    # 缓存失效通知频道
+    _channel = "moviepilot:cache:invalidate"
+
+    def __init__(self, remote: RedisBackend, maxsize: Optional[int] = 256, ttl: Optional[int] = 60):
+        """
+        初始化两级缓存实例
+
+        :param remote: Redis 缓存后端
+        :param maxsize: 本地缓存每个区的最大条目数
+        :param ttl: 本地缓存存活时间，单位秒
+        """
+        self.remote = remote
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.local = CacheToolsBackend(maxsize=maxsize, ttl=ttl)
+        # 当前进程标识，忽略自己发出的失效通知
+        self._source = uuid.uuid4().hex
+        self._pubsub_thread = None
+        # 订阅中断后的重连等待时间（秒），为 0 时订阅正常
+        self._pubsub_backoff = 0
+        self._closed = threading.Event()
+        try:
+            pubsub = self.remote.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self._channel: self.__on_invalidate})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True,
+                                                       exception_handler=self.__on_pubsub_error)
+        except Exception as e:
+            logger.error(f"Failed to subscribe cache invalidation channel, "
+                         f"local cache will only expire by TTL ({self.ttl}s): {e}")
+
+    def __on_pubsub_error(self, error: BaseException, pubsub: redis.client.PubSub, _thread: Any):
+        """
+        处理失效通知订阅线程的异常，避免线程退出，退避后重新连接并订阅
+        """
+        if not self._pubsub_backoff:
+            logger.warning(f"Cache invalidation subscription lost, local cache may serve stale values "
+                           f"for up to {self.ttl}s until it is restored: {error}")
+        self._pubsub_backoff = min(self._pubsub_backoff * 2 or 1, 60)
+        if self._closed.wait(self._pubsub_backoff):
+            return
+        try:
+            # 重新连接时会自动订阅之前的频道
+            pubsub.ping()
+        except Exception as e:
+            logger.debug(f"Cache invalidation subscription still unavailable, "
+                         f"retry in {self._pubsub_backoff}s: {e}")
+            return
+        logger.info("Cache invalidation subscription restored")
+        self._pubsub_backoff = 0
+        # 中断期间可能错过其它进程的失效通知
+        self.local.clear()
+
+    def __on_invalidate(self, message: dict):
+        """
+        处理其它进程发出的缓存失效通知
+        """
+        try:
+            data = json.loads(message.get("data"))
+            if data.get("source") == self._source:
+                return
+            if data.get("key") is not None:
+                self.local.delete(data.get("key"), region=data.get("region"))
+            else:
+                self.local.clear(region=data.get("region"))
+        except Exception as e:
+            logger.error(f"Failed to handle cache invalidation message: {e}")
+
+    def __publish(self, region: Optional[str], key: Optional[str] = None):
+        """
+        通知其它进程失效本地缓存
+        """
+        try:
+            self.remote.client.publish(self._channel, json.dumps({
+                "source": self._source,
+                "region": region,
+                "key": key
+            }))
+        except Exception as e:
+            logger.error(f"Failed to publish cache invalidation, region: {region}, error: {e}")
+
+    async def __async_publish(self, region: Optional[str], key: Optional[str] = None):
+        """
+        异步通知其它进程失效本地缓存
+        """
+        try:
+            await self.remote.async_client.publish(self._channel, json.dumps({
+                "source": self._source,
+                "region": region,
+                "key": key
+            }))
+        except Exception as e:
+            logger.error(f"Failed to publish cache invalidation, region: {region}, error: {e}")
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None,
+            region: Optional[str] = DEFAULT_CACHE_REGION, **kwargs) -> None:
+        """
+        同时写入本地缓存和 Redis
+
+        :param key: 缓存的键
+        :param value: 缓存的值
+        :param ttl: 缓存的存活时间，单位秒如果未传入则使用默认值
+        :param region: 缓存的区
+        :param kwargs: maxsize: 缓存的最大条目数，本地缓存不超过本地最大条目数
+        """
+        maxsize = kwargs.pop("maxsize", None)
+        self.remote.set(key, value, ttl=ttl, region=region, **kwargs)
+        self.local.set(key, value, ttl=min(ttl or self.ttl, self.ttl),
+                       maxsize=min(maxsize or self.maxsize, self.maxsize), region=region)
+        self.__publish(region, key)
+
+    def exists(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> bool:
+        """
+        判断缓存键是否存在
+
+        :param key: 缓存的键
+        :param region: 缓存的区
+        :return: 存在返回 True，否则返回 False
+        """
+        return self.local.exists(key, region=region) or self.remote.exists(key, region=region)
+
+    def get(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> Any:
+        """
+        获取缓存的值，本地缓存未命中时从 Redis 读取并回填
+
+        :param key: 缓存的键
+        :param region: 缓存的区
+        :return: 返回缓存的值，如果缓存不存在返回 None
+        """
+        value = self.local.get(key, region=region)
+        if value is not None or self.local.exists(key, region=region):
+            return value
+        value = self.remote.get(key, region=region)
+        if value is not None:
+            self.local.set(key, value, ttl=self.ttl, maxsize=self.maxsize, region=region)
+        return value
+
+    def delete(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        删除缓存
+
+        :param key: 缓存的键
+        :param region: 缓存的区
+        """
+        self.local.delete(key, region=region)
+        self.remote.delete(key, region=region)
+        self.__publish(region, key)
+
+    def clear(self, region: Optional[str] = None) -> None:
+        """
+        清除指定区域的缓存或全部缓存
+
+        :param region: 缓存的区
+        """
+        self.local.clear(region=region)
+        self.remote.clear(region=region)
+        self.__publish(region)
+
+    async def async_set(self, key: str, value: Any, ttl: Optional[int] = None,
+                        region: Optional[str] = DEFAULT_CACHE_REGION, **kwargs) -> None:
+        """
+        异步同时写入本地缓存和 Redis
+        """
+        maxsize = kwargs.pop("maxsize", None)
+        await self.remote.async_set(key, value, ttl=ttl, region=region, **kwargs)
+        self.local.set(key, value, ttl=min(ttl or self.ttl, self.ttl),
+                       maxsize=min(maxsize or self.maxsize, self.maxsize), region=region)
+        await self.__async_publish(region, key)
+
+    async def async_exists(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> bool:
+        """
+        异步判断缓存键是否存在
+        """
+        return self.local.exists(key, region=region) or await self.remote.async_exists(key, region=region)
+
+    async def async_get(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> Any:
+        """
+        异步获取缓存的值，本地缓存未命中时从 Redis 读取并回填
+        """
+        value = self.local.get(key, region=region)
+        if value is not None or self.local.exists(key, region=region):
+            return value
+        value = await self.remote.async_get(key, region=region)
+        if value is not None:
+            self.local.set(key, value, ttl=self.ttl, maxsize=self.maxsize, region=region)
+        return value
+
+    async def async_delete(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步删除缓存
+        """
+        self.local.delete(key, region=region)
+        await self.remote.async_delete(key, region=region)
+        await self.__async_publish(region, key)
+
+    async def async_acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                                 timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        异步通过 Redis 获取跨进程的缓存计算锁
+        """
+        return await self.remote.async_acquire_lock(key, region=region, timeout=timeout)
+
+    async def async_release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        异步释放跨进程的缓存计算锁
+        """
+        await self.remote.async_release_lock(key, token, region=region)
+
+    def acquire_lock(self, key: str, region: Optional[str] = DEFAULT_CACHE_REGION,
+                     timeout: Optional[int] = 30) -> Optional[str]:
+        """
+        通过 Redis 获取跨进程的缓存计算锁
+        """
+        return self.remote.acquire_lock(key, region=region, timeout=timeout)
+
+    def release_lock(self, key: str, token: str, region: Optional[str] = DEFAULT_CACHE_REGION) -> None:
+        """
+        释放跨进程的缓存计算锁
+        """
+        self.remote.release_lock(key, token, region=region)
+
+    def get_region_sizes(self) -> Dict[str, int]:
+        """
+        获取各缓存区在 Redis 中的条目数
+        """
+        return self.remote.get_region_sizes()
+
+    def close(self) -> None:
+        """
+        停止失效通知订阅并关闭 Redis 连接
+        """
+        self._closed.set()
+        if self._pubsub_thread:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+        self.remote.close()
 
 
 def get_cache_backend(maxsize: Optional[int] = 512, ttl: Optional[int] = 1800) -> CacheBackend:
@@ -470,7 +1395,13 @@ def get_cache_backend(maxsize: Optional[int] = 512, ttl: Optional[int] = 1800) -
         if redis_url:
             try:
                 logger.debug(f"Attempting to use RedisBackend with URL: {redis_url}, TTL: {ttl}")
-                return RedisBackend(redis_url=redis_url, ttl=ttl)
+                redis_backend = RedisBackend(redis_url=redis_url, ttl=ttl)
+                if settings.CACHE_LOCAL_TTL:
+                    logger.debug(f"Using TieredBackend with local maxsize: {settings.CACHE_LOCAL_MAXSIZE}, "
+                                 f"TTL: {settings.CACHE_LOCAL_TTL}")
+                    return TieredBackend(remote=redis_backend, maxsize=settings.CACHE_LOCAL_MAXSIZE,
+                                         ttl=settings.CACHE_LOCAL_TTL)
+                return redis_backend
             except RuntimeError:
                 logger.warning("Falling back to CacheToolsBackend due to Redis connection failure.")
         else:
@@ -478,20 +1409,79 @@ def get_cache_backend(maxsize: Optional[int] = 512, ttl: Optional[int] = 1800) -
                          "Falling back to CacheToolsBackend.")
 
     # 如果不是 Redis，回退到内存缓存
-    logger.debug(f"Using CacheToolsBackend with default maxsize: {maxsize}, TTL: {ttl}")
-    return CacheToolsBackend(maxsize=maxsize, ttl=ttl)
+    # 内存上限需要显式配置才启用，未配置或为 0 时不统计字节数，仅按各缓存区的条目数量淘汰
+    memory_limit = StringUtils.num_filesize(settings.CACHE_MEMORY_LIMIT) if settings.CACHE_MEMORY_LIMIT else 0
+    logger.debug(f"Using CacheToolsBackend with default maxsize: {maxsize}, TTL: {ttl}, "
+                 f"memory limit: {memory_limit or 'unlimited'}")
+    return CacheToolsBackend(maxsize=maxsize, ttl=ttl, memory_limit=memory_limit)
+
+
+class _Flight:
+    """
+    正在进行中的缓存计算，同一缓存键的并发未命中请求等待同一次计算结果
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.owner = threading.get_ident()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncFlight:
+    """
+    事件循环内正在进行中的缓存计算，同一缓存键的并发未命中协程等待同一个 Future
+    """
+
+    def __init__(self):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.owner = asyncio.current_task()
+
+
+# 进行中的缓存计算，(region, key) -> _Flight
+_flights: Dict[Tuple[str, str], _Flight] = {}
+# 进行中的异步缓存计算，(事件循环, region, key) -> _AsyncFlight
+_async_flights: Dict[Tuple[asyncio.AbstractEventLoop, str, str], _AsyncFlight] = {}
+# 进行中的后台刷新，(region, key)
+_refreshing: Set[Tuple[str, str]] = set()
+# 后台刷新任务，保持引用避免被回收
+_refresh_tasks: Set[asyncio.Task] = set()
+_flights_lock = threading.Lock()
+# 强制刷新的缓存区，在当前线程或协程上下文内有效
+_refresh_regions: ContextVar[frozenset] = ContextVar("cache_refresh_regions", default=frozenset())
+# 支持过期后继续使用的缓存值中，软过期时间戳的键名
+SOFT_EXPIRE_KEY = "__cache_soft_expire__"
+
+
+@contextmanager
+def cache_refresh(*regions: str):
+    """
+    在上下文中调用指定缓存区的函数时跳过缓存读取，重新执行函数并覆盖缓存，用于定时预热缓存而不清空
+
+    :param regions: 缓存的区
+    """
+    token = _refresh_regions.set(_refresh_regions.get() | set(regions))
+    try:
+        yield
+    finally:
+        _refresh_regions.reset(token)
 
 
 def cached(region: Optional[str] = None, maxsize: Optional[int] = 512, ttl: Optional[int] = 1800,
-           skip_none: Optional[bool] = True, skip_empty: Optional[bool] = False):
+           skip_none: Optional[bool] = True, skip_empty: Optional[bool] = False,
+           single_flight: Optional[bool] = True, flight_timeout: Optional[int] = 30,
+           stale_ttl: Optional[int] = None):
     """
-    自定义缓存装饰器，支持为每个 key 动态传递 maxsize 和 ttl
+    自定义缓存装饰器，支持为每个 key 动态传递 maxsize 和 ttl，支持同步函数和协程函数
 
     :param region: 缓存的区
     :param maxsize: 缓存的最大条目数，默认值为 512
     :param ttl: 缓存的存活时间，单位秒，默认值为 1800
     :param skip_none: 跳过 None 缓存，默认为 True
     :param skip_empty: 跳过空值缓存（如 None, [], {}, "", set()），默认为 False
+    :param single_flight: 合并同一缓存键的并发未命中请求，只执行一次函数，默认为 True
+    :param flight_timeout: 等待其它请求计算结果的超时时间，单位秒，超时后自行执行函数，默认值为 30
+    :param stale_ttl: 超过 ttl 后仍可使用旧值的时间，单位秒，期间返回旧值并在后台刷新，超过 ttl + stale_ttl 后才等待重新执行，默认不启用
     :return: 装饰器函数
     """
 
@@ -528,24 +1518,273 @@ def cached(region: Optional[str] = None, maxsize: Optional[int] = 512, ttl: Opti
 
         # 获取缓存区
         cache_region = region if region is not None else f"{func.__module__}.{func.__name__}"
+        # 缓存键构建方法，装饰时预先解析函数签名
+        build_cache_key = make_cache_key_builder(func)
 
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # 获取缓存键
-            cache_key = cache_backend.get_cache_key(func, args, kwargs)
-            # 尝试获取缓存
+        def get_cached_value(cache_key: str) -> Tuple[bool, Any, bool]:
+            """
+            获取缓存值，返回是否命中、缓存的值和是否已软过期
+            """
+            start = time.perf_counter()
             cached_value = cache_backend.get(cache_key, region=cache_region)
+            cache_metrics.observe(cache_region, "get", time.perf_counter() - start)
+            if stale_ttl and isinstance(cached_value, dict) and SOFT_EXPIRE_KEY in cached_value:
+                return True, cached_value.get("value"), time.time() >= cached_value[SOFT_EXPIRE_KEY]
             if should_cache(cached_value) and is_valid_cache_value(cache_key, cached_value, cache_region):
-                return cached_value
-            # 执行函数并缓存结果
+                return True, cached_value, False
+            return False, None, False
+
+        def make_cache_entry(result: Any) -> Any:
+            """
+            生成写入缓存的值，启用 stale_ttl 时缓存保留到硬过期，软过期时间随值一起保存
+            """
+            if stale_ttl:
+                return {SOFT_EXPIRE_KEY: time.time() + ttl, "value": result}
+            return result
+
+        def compute(cache_key: str, args, kwargs) -> Any:
+            """
+            执行函数并缓存结果
+            """
             result = func(*args, **kwargs)
             # 判断是否需要缓存
             if not should_cache(result):
                 return result
             # 设置缓存（如果有传入的 maxsize 和 ttl，则覆盖默认值）
-            cache_backend.set(cache_key, result, ttl=ttl, maxsize=maxsize, region=cache_region)
+            start = time.perf_counter()
+            cache_backend.set(cache_key, make_cache_entry(result), ttl=ttl + (stale_ttl or 0),
+                              maxsize=maxsize, region=cache_region)
+            cache_metrics.observe(cache_region, "set", time.perf_counter() - start)
+            cache_metrics.incr(cache_region, "sets")
             return result
 
+        def refresh_in_background(cache_key: str, args, kwargs):
+            """
+            在共享线程池中刷新已软过期的缓存，同一缓存键同时只刷新一次
+            """
+            flight_key = (cache_region, cache_key)
+            with _flights_lock:
+                if flight_key in _refreshing:
+                    return
+                _refreshing.add(flight_key)
+
+            def __refresh():
+                try:
+                    compute_locked(cache_key, args, kwargs, wait_hit=False)
+                except Exception as e:
+                    logger.error(f"Failed to refresh cache in background, region: {cache_region}, "
+                                 f"key: {cache_key}, error: {e}")
+                finally:
+                    with _flights_lock:
+                        _refreshing.discard(flight_key)
+
+            ThreadHelper().submit(__refresh)
+
+        def compute_locked(cache_key: str, args, kwargs, wait_hit: bool = True) -> Any:
+            """
+            持有跨进程锁执行函数，锁被其它进程持有时等待其写入缓存
+            :param wait_hit: 等待期间命中缓存时直接返回，为 False 时只在命中未过期的缓存时返回
+            """
+            token = cache_backend.acquire_lock(cache_key, region=cache_region, timeout=flight_timeout)
+            if token is None:
+                deadline = time.monotonic() + flight_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    hit, cached_value, stale = get_cached_value(cache_key)
+                    if hit and (wait_hit or not stale):
+                        return cached_value
+                    token = cache_backend.acquire_lock(cache_key, region=cache_region, timeout=flight_timeout)
+                    if token is not None:
+                        break
+            try:
+                return compute(cache_key, args, kwargs)
+            finally:
+                if token is not None:
+                    cache_backend.release_lock(cache_key, token, region=cache_region)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # 获取缓存键
+            cache_key = build_cache_key(args, kwargs)
+            if cache_region in _refresh_regions.get():
+                # 强制刷新
+                return compute_locked(cache_key, args, kwargs, wait_hit=False)
+            # 尝试获取缓存
+            hit, cached_value, stale = get_cached_value(cache_key)
+            if hit:
+                cache_metrics.incr(cache_region, "hits")
+                if stale:
+                    # 已软过期，返回旧值并在后台刷新
+                    cache_metrics.incr(cache_region, "stale_hits")
+                    refresh_in_background(cache_key, args, kwargs)
+                return cached_value
+            cache_metrics.incr(cache_region, "misses")
+            if not single_flight:
+                return compute(cache_key, args, kwargs)
+            # 合并并发请求，只有第一个请求执行函数
+            flight_key = (cache_region, cache_key)
+            with _flights_lock:
+                flight = _flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = _flights[flight_key] = _Flight()
+            if not leader:
+                if flight.owner == threading.get_ident():
+                    # 同一线程内递归调用，直接执行
+                    return compute(cache_key, args, kwargs)
+                if flight.event.wait(flight_timeout):
+                    if flight.error is not None:
+                        raise flight.error
+                    return flight.result
+                logger.warning(f"Waiting for in-flight cache computation timed out, "
+                               f"region: {cache_region}, key: {cache_key}")
+                return compute(cache_key, args, kwargs)
+            try:
+                flight.result = compute_locked(cache_key, args, kwargs)
+                return flight.result
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with _flights_lock:
+                    _flights.pop(flight_key, None)
+                flight.event.set()
+
+        async def async_get_cached_value(cache_key: str) -> Tuple[bool, Any, bool]:
+            """
+            异步获取缓存值，返回是否命中、缓存的值和是否已软过期
+            """
+            start = time.perf_counter()
+            cached_value = await cache_backend.async_get(cache_key, region=cache_region)
+            cache_metrics.observe(cache_region, "get", time.perf_counter() - start)
+            if stale_ttl and isinstance(cached_value, dict) and SOFT_EXPIRE_KEY in cached_value:
+                return True, cached_value.get("value"), time.time() >= cached_value[SOFT_EXPIRE_KEY]
+            if not should_cache(cached_value):
+                return False, None, False
+            if not skip_none and cached_value is None \
+                    and not await cache_backend.async_exists(key=cache_key, region=cache_region):
+                return False, None, False
+            return True, cached_value, False
+
+        async def async_compute(cache_key: str, args, kwargs) -> Any:
+            """
+            等待协程执行并缓存结果
+            """
+            result = await func(*args, **kwargs)
+            if not should_cache(result):
+                return result
+            start = time.perf_counter()
+            await cache_backend.async_set(cache_key, make_cache_entry(result), ttl=ttl + (stale_ttl or 0),
+                                          maxsize=maxsize, region=cache_region)
+            cache_metrics.observe(cache_region, "set", time.perf_counter() - start)
+            cache_metrics.incr(cache_region, "sets")
+            return result
+
+        async def async_compute_locked(cache_key: str, args, kwargs, wait_hit: bool = True) -> Any:
+            """
+            持有跨进程锁执行协程，锁被其它进程持有时等待其写入缓存
+            :param wait_hit: 等待期间命中缓存时直接返回，为 False 时只在命中未过期的缓存时返回
+            """
+            token = await cache_backend.async_acquire_lock(cache_key, region=cache_region, timeout=flight_timeout)
+            if token is None:
+                deadline = time.monotonic() + flight_timeout
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.1)
+                    hit, cached_value, stale = await async_get_cached_value(cache_key)
+                    if hit and (wait_hit or not stale):
+                        return cached_value
+                    token = await cache_backend.async_acquire_lock(cache_key, region=cache_region,
+                                                                   timeout=flight_timeout)
+                    if token is not None:
+                        break
+            try:
+                return await async_compute(cache_key, args, kwargs)
+            finally:
+                if token is not None:
+                    await cache_backend.async_release_lock(cache_key, token, region=cache_region)
+
+        def async_refresh_in_background(cache_key: str, args, kwargs):
+            """
+            在当前事件循环中刷新已软过期的缓存，同一缓存键同时只刷新一次
+            """
+            flight_key = (cache_region, cache_key)
+            with _flights_lock:
+                if flight_key in _refreshing:
+                    return
+                _refreshing.add(flight_key)
+
+            async def __refresh():
+                try:
+                    await async_compute_locked(cache_key, args, kwargs, wait_hit=False)
+                except Exception as e:
+                    logger.error(f"Failed to refresh cache in background, region: {cache_region}, "
+                                 f"key: {cache_key}, error: {e}")
+                finally:
+                    with _flights_lock:
+                        _refreshing.discard(flight_key)
+
+            task = asyncio.create_task(__refresh())
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            # 获取缓存键
+            cache_key = build_cache_key(args, kwargs)
+            if cache_region in _refresh_regions.get():
+                # 强制刷新
+                return await async_compute_locked(cache_key, args, kwargs, wait_hit=False)
+            # 尝试获取缓存
+            hit, cached_value, stale = await async_get_cached_value(cache_key)
+            if hit:
+                cache_metrics.incr(cache_region, "hits")
+                if stale:
+                    # 已软过期，返回旧值并在后台刷新
+                    cache_metrics.incr(cache_region, "stale_hits")
+                    async_refresh_in_background(cache_key, args, kwargs)
+                return cached_value
+            cache_metrics.incr(cache_region, "misses")
+            if not single_flight:
+                return await async_compute(cache_key, args, kwargs)
+            # 合并同一事件循环内的并发请求，只有第一个协程执行函数
+            flight_key = (asyncio.get_running_loop(), cache_region, cache_key)
+            with _flights_lock:
+                flight = _async_flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = _async_flights[flight_key] = _AsyncFlight()
+            if not leader:
+                if flight.owner is asyncio.current_task():
+                    # 同一协程内递归调用，直接执行
+                    return await async_compute(cache_key, args, kwargs)
+                try:
+                    # shield 避免等待方超时或取消时影响正在执行的计算
+                    return await asyncio.wait_for(asyncio.shield(flight.future), flight_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Waiting for in-flight cache computation timed out, "
+                                   f"region: {cache_region}, key: {cache_key}")
+                    return await async_compute(cache_key, args, kwargs)
+                except asyncio.CancelledError:
+                    if not flight.future.cancelled():
+                        raise
+                    # 执行计算的协程被取消，自行执行
+                    return await async_compute(cache_key, args, kwargs)
+            try:
+                result = await async_compute_locked(cache_key, args, kwargs)
+                flight.future.set_result(result)
+                return result
+            except asyncio.CancelledError:
+                flight.future.cancel()
+                raise
+            except BaseException as e:
+                flight.future.set_exception(e)
+                # 没有等待方时避免 Future 未读取异常的警告
+                flight.future.exception()
+                raise
+            finally:
+                with _flights_lock:
+                    _async_flights.pop(flight_key, None)
+
         def cache_clear():
             """
             清理缓存区
@@ -553,6 +1792,9 @@ def cached(region: Optional[str] = None, maxsize: Optional[int] = 512, ttl: Opti
             # 清理缓存区
             cache_backend.clear(region=cache_region)
 
+        if inspect.iscoroutinefunction(func):
+            # 协程函数缓存等待后的结果，而不是协程对象
+            wrapper = async_wrapper
         wrapper.cache_region = cache_region
         wrapper.cache_clear = cache_clear
         return wrapper
@@ -560,6 +1802,8 @@ def cached(region: Optional[str] = None, maxsize: Optional[int] = 512, ttl: Opti
     return decorator
 
 
+# 缓存统计实例
+cache_metrics = CacheMetrics()
 # 缓存后端实例
 cache_backend = get_cache_backend()
 
@@ -33,6 +33,8 @@ class SystemConfModel(BaseModel):
     fanart: int = 0
     # 元数据缓存过期时间（秒）
     meta: int = 0
+    # 标题识别缓存数量
+    metainfo: int = 0
     # 调度器数量
     scheduler: int = 0
     # 线程池大小
@@ -95,12 +97,24 @@ class ConfigModel(BaseModel):
     DB_TIMEOUT: int = 60
     # SQLite 是否启用 WAL 模式，默认开启
     DB_WAL_ENABLE: bool = True
+    # SQLite 是否启用单线程写入，所有写操作由同一线程排队合并提交，查询使用只读连接，需开启 WAL 模式
+    DB_SINGLE_WRITER: bool = False
     # 缓存类型，支持 cachetools 和 redis，默认使用 cachetools
     CACHE_BACKEND_TYPE: str = "cachetools"
     # 缓存连接字符串，仅外部缓存（如 Redis、Memcached）需要
     CACHE_BACKEND_URL: Optional[str] = None
     # Redis 缓存最大内存限制，未配置时，如开启大内存模式时为 "1024mb"，未开启时为 "256mb"
     CACHE_REDIS_MAXMEMORY: Optional[str] = None
+    # Redis 缓存值的压缩方式，支持 zstd 和 lz4（需安装 zstandard 或 lz4），为空时不压缩
+    CACHE_REDIS_COMPRESSION: Optional[str] = None
+    # Redis 缓存值序列化后达到该字节数时才压缩
+    CACHE_REDIS_COMPRESS_MIN_SIZE: int = 1024
+    # 内存缓存所有缓存区共享的内存上限，如 "512mb"，超出时跨缓存区淘汰最久未使用的条目，写入时需序列化估算条目大小，未配置或为 "0" 时不启用，仅按各缓存区的条目数量淘汰
+    CACHE_MEMORY_LIMIT: Optional[str] = None
+    # 使用 Redis 缓存时，进程内本地缓存的存活时间（秒），为 0 时不启用本地缓存
+    CACHE_LOCAL_TTL: int = 60
+    # 进程内本地缓存每个缓存区的最大条目数
+    CACHE_LOCAL_MAXSIZE: int = 256
     # 配置文件目录
     CONFIG_DIR: Optional[str] = None
     # 超级管理员
@@ -195,10 +209,14 @@ class ConfigModel(BaseModel):
     DOWNLOAD_TMPEXT: list = Field(default_factory=lambda: ['.!qb', '.part'])
     # 媒体服务器同步间隔（小时）
     MEDIASERVER_SYNC_INTERVAL: int = 6
+    # 媒体服务器全量同步间隔（小时），期间定时同步只获取有变化的项目，为 0 时每次都全量同步
+    MEDIASERVER_SYNC_FULL_INTERVAL: int = 24
     # 订阅模式
     SUBSCRIBE_MODE: str = "spider"
     # RSS订阅模式刷新时间间隔（分钟）
     SUBSCRIBE_RSS_INTERVAL: int = 30
+    # 订阅刷新站点并发数，为1时逐个站点刷新
+    SUBSCRIBE_REFRESH_THREADS: int = 10
     # 订阅数据共享
     SUBSCRIBE_STATISTIC_SHARE: bool = True
     # 订阅搜索开关
@@ -558,6 +576,7 @@ class Settings(BaseSettings, ConfigModel, LogConfigModel):
                 bangumi=512,
                 fanart=512,
                 meta=(self.META_CACHE_EXPIRE or 24) * 3600,
+                metainfo=20000,
                 scheduler=100,
                 threadpool=100,
                 dbpool=100,
@@ -571,6 +590,7 @@ class Settings(BaseSettings, ConfigModel, LogConfigModel):
             bangumi=256,
             fanart=128,
             meta=(self.META_CACHE_EXPIRE or 2) * 3600,
+            metainfo=5000,
             scheduler=50,
             threadpool=50,
             dbpool=50,
@@ -1,6 +1,7 @@
 import regex as re
 
 from app.db.systemconfig_oper import SystemConfigOper
+from app.helper.regex import RegexHelper
 from app.schemas.types import SystemConfigKey
 from app.utils.singleton import Singleton
 
@@ -12,8 +13,11 @@ class CustomizationMatcher(metaclass=Singleton):
 
     def __init__(self):
         self.systemconfig = SystemConfigOper()
+        self.regexhelper = RegexHelper()
         self.customization = None
         self.custom_separator = None
+        # 生成占位符正则时的自定义占位符配置
+        self._customization_conf = None
 
     def match(self, title=None):
         """
@@ -22,16 +26,17 @@ class CustomizationMatcher(metaclass=Singleton):
         """
         if not title:
             return ""
-        if not self.customization:
-            # 自定义占位符
-            customization = self.systemconfig.get(SystemConfigKey.Customization)
-            if not customization:
-                return ""
+        # 自定义占位符，系统配置为内存读取，配置变化后重新生成
+        customization = self.systemconfig.get(SystemConfigKey.Customization)
+        if not customization:
+            return ""
+        if not self.customization or self._customization_conf != customization:
+            self._customization_conf = customization
             if isinstance(customization, str):
                 customization = customization.replace("\n", ";").replace("|", ";").strip(";").split(";")
             self.customization = "|".join([f"({item})" for item in customization])
 
-        customization_re = re.compile(r"%s" % self.customization)
+        customization_re = self.regexhelper.compile(r"%s" % self.customization)
         # 处理重复多次的情况，保留先后顺序（按添加自定义占位符的顺序）
         unique_customization = {}
         for item in re.findall(customization_re, title):
@@ -1,6 +1,7 @@
 import regex as re
 
 from app.db.systemconfig_oper import SystemConfigOper
+from app.helper.regex import RegexHelper
 from app.schemas.types import SystemConfigKey
 from app.utils.singleton import Singleton
 
@@ -85,6 +86,10 @@ class ReleaseGroupsMatcher(metaclass=Singleton):
             for release_group in site_groups:
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
+        self.regexhelper = RegexHelper()
+        # 编译好的内置组+自定义组正则及对应的自定义组
+        self._groups_re = None
+        self._custom_groups = None
 
     def match(self, title: str = None, groups: str = None):
         """
@@ -94,21 +99,32 @@ class ReleaseGroupsMatcher(metaclass=Singleton):
         """
         if not title:
             return ""
-        if not groups:
-            # 自定义组
+        if groups:
+            groups_re = self.__compile_groups(groups)
+        else:
+            # 自定义组，系统配置为内存读取，配置变化后重新编译
             custom_release_groups = SystemConfigOper().get(SystemConfigKey.CustomReleaseGroups)
             if isinstance(custom_release_groups, list):
-                custom_release_groups = list(filter(None, custom_release_groups))
-            if custom_release_groups:
-                custom_release_groups_str = '|'.join(custom_release_groups)
-                groups = f"{self.__release_groups}|{custom_release_groups_str}"
-            else:
-                groups = self.__release_groups
+                custom_release_groups = tuple(filter(None, custom_release_groups))
+            groups_re = self._groups_re
+            if groups_re is None or self._custom_groups != custom_release_groups:
+                if custom_release_groups:
+                    custom_release_groups_str = '|'.join(custom_release_groups)
+                    groups = f"{self.__release_groups}|{custom_release_groups_str}"
+                else:
+                    groups = self.__release_groups
+                groups_re = self.__compile_groups(groups)
+                self._groups_re, self._custom_groups = groups_re, custom_release_groups
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\S\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
         for item in re.findall(groups_re, title):
             if item not in unique_groups:
                 unique_groups.append(item)
         return "@".join(unique_groups)
+
+    def __compile_groups(self, groups: str) -> re.Pattern:
+        """
+        编译制作组正则
+        """
+        return self.regexhelper.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\S\]\[】&])" % groups, re.I)
@@ -1,9 +1,12 @@
-from typing import List, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Optional
 
 import cn2an
 import regex as re
 
 from app.db.systemconfig_oper import SystemConfigOper
+from app.helper.regex import RegexHelper
 from app.log import logger
 from app.schemas.types import SystemConfigKey
 from app.utils.singleton import Singleton
@@ -11,8 +14,15 @@ from app.utils.singleton import Singleton
 
 class WordsMatcher(metaclass=Singleton):
 
+    # 最多缓存的识别词程序数量
+    _max_programs = 128
+
     def __init__(self):
         self.systemconfig = SystemConfigOper()
+        self.regexhelper = RegexHelper()
+        self._lock = threading.Lock()
+        # 按识别词列表缓存编译好的识别词程序
+        self._programs: OrderedDict[tuple, list] = OrderedDict()
 
     def prepare(self, title: str, custom_words: List[str] = None) -> Tuple[str, List[str]]:
         """
@@ -22,8 +32,53 @@ class WordsMatcher(metaclass=Singleton):
         3：前定位词 <> 后定位词 >> 偏移量（EP）
         """
         appley_words = []
-        # 读取自定义识别词
+        for word, action, args in self.__get_program(custom_words):
+            try:
+                if action == "replace_offset":
+                    # 替换词
+                    title, message, state = self.__replace_regex(title, args[0], args[1])
+                    if state:
+                        # 替换词成功再进行集偏移
+                        title, message, state = self.__episode_offset(title, *args[2:])
+                elif action == "offset":
+                    # 集偏移
+                    title, message, state = self.__episode_offset(title, *args)
+                else:
+                    # 替换词、屏蔽词
+                    title, message, state = self.__replace_regex(title, args[0], args[1])
+
+                if state:
+                    appley_words.append(word)
+
+            except Exception as err:
+                logger.warn(f"自定义识别词 {word} 预处理标题失败：{str(err)} - 标题：{title}")
+
+        return title, appley_words
+
+    def __get_program(self, custom_words: List[str] = None) -> List[tuple]:
+        """
+        获取按顺序编译好的识别词程序，按识别词内容缓存，识别词配置变化后重新编译
+        """
+        # 读取自定义识别词，系统配置为内存读取，保存后即时生效
         words: List[str] = custom_words or self.systemconfig.get(SystemConfigKey.CustomIdentifiers) or []
+        key = tuple(words)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                return program
+        program = self.__compile_words(words)
+        with self._lock:
+            self._programs[key] = program
+            while len(self._programs) > self._max_programs:
+                self._programs.popitem(last=False)
+        return program
+
+    def __compile_words(self, words: List[str]) -> List[tuple]:
+        """
+        将识别词编译为按顺序执行的程序，每项为 (识别词, 动作, 参数)
+        """
+        program = []
         for word in words:
             if not word or word.startswith("#"):
                 continue
@@ -39,61 +94,64 @@ class WordsMatcher(metaclass=Singleton):
                     pyh = str(re.findall(r'<>(.*?)\s*>>', word)[0]).strip()
                     # 集偏移
                     offsets = str(re.findall(r'>>\s*(.*?)$', word)[0]).strip()
-                    # 替换词
-                    title, message, state = self.__replace_regex(title, thc, bthc)
-                    if state:
-                        # 替换词成功再进行集偏移
-                        title, message, state = self.__episode_offset(title, pyq, pyh, offsets)
+                    program.append((word, "replace_offset",
+                                    (self.regexhelper.compile(r'%s' % thc), bthc,
+                                     *self.__compile_offset(pyq, pyh), offsets)))
                 elif word.count(" => "):
                     # 替换词
                     strings = word.split(" => ")
-                    title, message, state = self.__replace_regex(title, strings[0], strings[1])
+                    program.append((word, "replace", (self.regexhelper.compile(r'%s' % strings[0]), strings[1])))
                 elif word.count(" >> ") and word.count(" <> "):
                     # 集偏移
                     strings = word.split(" <> ")
                     offsets = strings[1].split(" >> ")
                     strings[1] = offsets[0]
-                    title, message, state = self.__episode_offset(title, strings[0], strings[1], offsets[1])
+                    program.append((word, "offset", (*self.__compile_offset(strings[0], strings[1]), offsets[1])))
                 else:
                     # 屏蔽词
                     if not word.strip():
                         continue
-                    title, message, state = self.__replace_regex(title, word, "")
-
-                if state:
-                    appley_words.append(word)
-
+                    program.append((word, "replace", (self.regexhelper.compile(r'%s' % word), "")))
             except Exception as err:
-                logger.warn(f"自定义识别词 {word} 预处理标题失败：{str(err)} - 标题：{title}")
+                logger.warn(f"自定义识别词 {word} 编译失败：{str(err)}")
+        return program
 
-        return title, appley_words
+    def __compile_offset(self, front: str, back: str) -> Tuple[str, str, Optional[re.Pattern],
+                                                               Optional[re.Pattern], re.Pattern]:
+        """
+        编译集偏移的前后定位词
+        """
+        return (front, back,
+                self.regexhelper.compile(r'%s' % front) if front else None,
+                self.regexhelper.compile(r'%s' % back) if back else None,
+                self.regexhelper.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back)))
 
     @staticmethod
-    def __replace_regex(title: str, replaced: str, replace: str) -> Tuple[str, str, bool]:
+    def __replace_regex(title: str, replaced: re.Pattern, replace: str) -> Tuple[str, str, bool]:
         """
         正则替换
         """
         try:
-            if not re.findall(r'%s' % replaced, title):
+            if not replaced.search(title):
                 return title, "", False
             else:
-                return re.sub(r'%s' % replaced, r'%s' % replace, title), "", True
+                return replaced.sub(r'%s' % replace, title), "", True
         except Exception as err:
-            logger.warn(f"自定义识别词正则替换失败：{str(err)} - 标题：{title}，被替换词：{replaced}，替换词：{replace}")
+            logger.warn(f"自定义识别词正则替换失败：{str(err)} - 标题：{title}，被替换词：{replaced.pattern}，替换词：{replace}")
             return title, str(err), False
 
-    @staticmethod
-    def __episode_offset(title: str, front: str, back: str, offset: str) -> Tuple[str, str, bool]:
+    def __episode_offset(self, title: str, front: str, back: str, front_re: Optional[re.Pattern],
+                         back_re: Optional[re.Pattern], offset_word_info_re: re.Pattern,
+                         offset: str) -> Tuple[str, str, bool]:
         """
         集数偏移
         """
         try:
-            if back and not re.findall(r'%s' % back, title):
+            if back_re and not back_re.search(title):
                 return title, "", False
-            if front and not re.findall(r'%s' % front, title):
+            if front_re and not front_re.search(title):
                 return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
+            episode_nums_str = offset_word_info_re.findall(title)
             if not episode_nums_str:
                 return title, "", False
             episode_nums_offset_str = []
@@ -126,9 +184,9 @@ class WordsMatcher(metaclass=Singleton):
             else:
                 episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1], reverse=True)
             for episode_num in episode_nums_list:
-                episode_offset_re = re.compile(
+                episode_offset_re = self.regexhelper.compile(
                     r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back))
-                title = re.sub(episode_offset_re, r'%s' % episode_num[1], title)
+                title = episode_offset_re.sub(r'%s' % episode_num[1], title)
             return title, "", True
         except Exception as err:
             logger.warn(f"自定义识别词集数偏移失败：{str(err)} - 标题：{title}，前定位词：{front}，后定位词：{back}，偏移量：{offset}")
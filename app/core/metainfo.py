@@ -1,3 +1,6 @@
+import copy
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Tuple, List, Optional
 
@@ -6,18 +9,109 @@ import regex as re
 from app.core.config import settings
 from app.core.meta import MetaAnime, MetaVideo, MetaBase
 from app.core.meta.words import WordsMatcher
+from app.db.systemconfig_oper import SystemConfigOper
 from app.log import logger
-from app.schemas.types import MediaType
+from app.schemas.types import MediaType, SystemConfigKey
+from app.utils.singleton import Singleton
+
+
+class MetaInfoCache(metaclass=Singleton):
+    """
+    标题识别结果缓存，按标题、副标题、自定义识别词和识别相关配置缓存，超过容量时淘汰最久未使用的项
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple, MetaBase] = OrderedDict()
+        self._maxsize = settings.CONF.metainfo
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[MetaBase]:
+        """
+        获取缓存的识别结果
+        """
+        with self._lock:
+            meta = self._cache.get(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return meta
+
+    def set(self, key: tuple, meta: MetaBase):
+        """
+        缓存识别结果
+        """
+        if not self._maxsize:
+            return
+        with self._lock:
+            self._cache[key] = meta
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        缓存统计信息
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0
+            }
 
 
 def MetaInfo(title: str, subtitle: Optional[str] = None, custom_words: List[str] = None) -> MetaBase:
     """
-    根据标题和副标题识别元数据
+    根据标题和副标题识别元数据，相同标题直接返回缓存识别结果的副本
     :param title: 标题、种子名、文件名
     :param subtitle: 副标题、描述
     :param custom_words: 自定义识别词列表
     :return: MetaAnime、MetaVideo
     """
+    cache = MetaInfoCache()
+    key = (title, subtitle, tuple(custom_words) if custom_words else None, _config_key())
+    meta = cache.get(key)
+    if meta is None:
+        meta = _parse_metainfo(title, subtitle, custom_words)
+        cache.set(key, meta)
+    # 返回副本，避免调用方修改缓存的识别结果
+    return copy.deepcopy(meta)
+
+
+def _config_key() -> tuple:
+    """
+    识别相关配置的当前值，作为缓存键的一部分，配置保存后即时生效
+    """
+    systemconfig = SystemConfigOper()
+    values = []
+    for key in (SystemConfigKey.CustomIdentifiers,
+                SystemConfigKey.CustomReleaseGroups,
+                SystemConfigKey.Customization):
+        value = systemconfig.get(key)
+        values.append(tuple(value) if isinstance(value, list) else value)
+    return tuple(values)
+
+
+def _parse_metainfo(title: str, subtitle: Optional[str] = None, custom_words: List[str] = None) -> MetaBase:
+    """
+    识别标题和副标题中的元数据
+    """
     # 原标题
     org_title = title
     # 预处理标题
@@ -1,7 +1,13 @@
-from typing import Any, Generator, List, Optional, Self, Tuple
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from queue import Empty, SimpleQueue
+from typing import Any, Callable, Dict, Generator, List, Optional, Self, Tuple
 
-from sqlalchemy import NullPool, QueuePool, and_, create_engine, inspect, text
-from sqlalchemy.orm import Session, as_declarative, declared_attr, scoped_session, sessionmaker
+from sqlalchemy import Integer, NullPool, QueuePool, and_, column, create_engine, event, insert, inspect, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, as_declarative, declared_attr, object_session, scoped_session, sessionmaker
 
 from app.core.config import settings
 
@@ -36,12 +42,53 @@ with Engine.connect() as connection:
     current_mode = connection.execute(text(f"PRAGMA journal_mode={journal_mode};")).scalar()
     print(f"Database journal mode set to: {current_mode}")
 
-# 会话工厂
-SessionFactory = sessionmaker(bind=Engine)
+# 是否启用单线程写入，需开启 WAL 模式才能与只读连接并发
+single_writer = settings.DB_SINGLE_WRITER and settings.DB_WAL_ENABLE
+if single_writer:
+    # 只读连接池，用于查询
+    ReadEngine = create_engine(**{
+        **db_kwargs,
+        "url": f"sqlite:///file:{settings.CONFIG_PATH.as_posix()}/user.db?mode=ro&uri=true"
+    })
+    # 写入连接，仅由写入线程或独占写入的线程使用
+    WriteEngine = create_engine(url=db_kwargs["url"],
+                                echo=settings.DB_ECHO,
+                                poolclass=QueuePool,
+                                pool_size=1,
+                                max_overflow=1,
+                                pool_timeout=settings.DB_POOL_TIMEOUT,
+                                pool_recycle=settings.DB_POOL_RECYCLE,
+                                connect_args=connect_args)
+
+    @event.listens_for(WriteEngine, "connect")
+    def _write_connect(dbapi_connection, _):
+        # 由 SQLAlchemy 控制事务，以支持 SAVEPOINT
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(WriteEngine, "begin")
+    def _write_begin(conn):
+        # 开始事务时即获取写锁
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    # 会话工厂
+    SessionFactory = sessionmaker(bind=ReadEngine)
+    # 写入会话工厂
+    WriteSessionFactory = sessionmaker(bind=WriteEngine, expire_on_commit=False)
+else:
+    # 会话工厂
+    SessionFactory = sessionmaker(bind=Engine)
+    # 写入会话工厂，提交后不过期，事务结束后仍可读取对象属性
+    WriteSessionFactory = sessionmaker(bind=Engine, expire_on_commit=False)
 
 # 多线程全局使用的数据库会话
 ScopedSession = scoped_session(SessionFactory)
 
+# 当前上下文中的事务会话
+_transaction_db: ContextVar[Optional[Session]] = ContextVar("transaction_db", default=None)
+
+# 全文索引表是否存在
+_fts_tables: Dict[str, bool] = {}
+
 
 def get_db() -> Generator:
     """
@@ -80,6 +127,9 @@ def close_database():
     """
     关闭所有数据库连接并清理资源
     """
+    if db_writer is not None:
+        # 写入队列中剩余的数据
+        db_writer.stop()
     try:
         # 释放连接池，SQLite 会自动清空 WAL 文件，这里不单独再调用 checkpoint
         Engine.dispose()
@@ -87,6 +137,239 @@ def close_database():
         print(f"Error while disposing database connections: {e}")
 
 
+@contextmanager
+def db_transaction(db: Optional[Session] = None) -> Generator[Session, None, None]:
+    """
+    将多个数据库写操作合并到一个事务中提交
+    上下文中未指定会话的 db_update、db_query 操作共用事务会话，写操作只刷新不提交，退出时统一提交，
+    出现异常时整体回滚，嵌套使用时加入外层事务
+    :param db: 事务使用的数据库会话，默认新建会话；单线程写入模式下会话为只读，始终新建写入会话
+    :return: Session
+    """
+    transaction_db = _transaction_db.get()
+    if transaction_db is not None:
+        yield transaction_db
+        return
+    if db_writer is not None:
+        # 暂停写入线程，由当前线程独占写入
+        with db_writer.lease():
+            with _session_transaction(WriteSessionFactory(), close=True) as db:
+                yield db
+        return
+    with _session_transaction(db or WriteSessionFactory(), close=db is None) as db:
+        yield db
+
+
+@contextmanager
+def _session_transaction(db: Session, close: bool) -> Generator[Session, None, None]:
+    """
+    将会话设置为当前上下文的事务会话，退出时提交，出现异常时回滚
+    """
+    token = _transaction_db.set(db)
+    try:
+        yield db
+        db.commit()
+    except Exception as err:
+        db.rollback()
+        raise err
+    finally:
+        _transaction_db.reset(token)
+        if close:
+            db.close()
+
+
+class _WriteJob:
+    """
+    写入任务
+    """
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _WriteLease:
+    """
+    独占写入请求，写入线程提交已执行的任务后暂停，直到独占结束
+    """
+
+    def __init__(self):
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+
+
+# 停止写入线程
+_WRITER_STOP = object()
+
+
+class DbWriter:
+    """
+    SQLite 单线程写入，所有写操作排队后由同一线程执行，每批任务各自使用 SAVEPOINT，合并为一次提交，
+    空闲时执行 WAL checkpoint
+    """
+    # 每批合并提交的最大任务数
+    _batch_size = 200
+    # 空闲多久后执行 checkpoint（秒）
+    _checkpoint_idle = 60
+
+    def __init__(self):
+        self._queue: SimpleQueue = SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # 上次 checkpoint 后的提交次数
+        self._commits = 0
+
+    def __put(self, job: Any):
+        """
+        加入队列，写入线程未运行时启动
+        """
+        with self._lock:
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.__run, name="DbWriter", daemon=True)
+                self._thread.start()
+            self._queue.put(job)
+
+    def submit(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """
+        提交写操作并等待提交完成
+        """
+        job = _WriteJob(func, args, kwargs)
+        self.__put(job)
+        return job.future.result()
+
+    @contextmanager
+    def lease(self):
+        """
+        暂停写入线程，由当前线程独占写入
+        """
+        lease = _WriteLease()
+        self.__put(lease)
+        lease.paused.wait()
+        try:
+            yield
+        finally:
+            lease.resume.set()
+
+    def stop(self):
+        """
+        执行完队列中的任务后停止写入线程
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            if thread and thread.is_alive():
+                self._queue.put(_WRITER_STOP)
+        if thread:
+            thread.join(timeout=settings.DB_TIMEOUT)
+
+    def __run(self):
+        """
+        写入线程
+        """
+        db = WriteSessionFactory()
+        _transaction_db.set(db)
+        try:
+            while True:
+                try:
+                    job = self._queue.get(timeout=self._checkpoint_idle)
+                except Empty:
+                    self.__checkpoint()
+                    continue
+                # 合并执行队列中的写入任务
+                pending: List[_WriteJob] = []
+                while isinstance(job, _WriteJob):
+                    self.__execute(db, job)
+                    pending.append(job)
+                    if len(pending) >= self._batch_size:
+                        job = None
+                        break
+                    try:
+                        job = self._queue.get_nowait()
+                    except Empty:
+                        job = None
+                self.__commit(db, pending)
+                if isinstance(job, _WriteLease):
+                    job.paused.set()
+                    job.resume.wait()
+                elif job is _WRITER_STOP:
+                    self.__checkpoint()
+                    return
+        finally:
+            db.close()
+
+    @staticmethod
+    def __execute(db: Session, job: _WriteJob):
+        """
+        在 SAVEPOINT 中执行写入任务，失败时只回滚该任务
+        """
+        try:
+            args, kwargs = replace_args_db(job.args, job.kwargs, db)
+            with db.begin_nested():
+                job.result = job.func(*args, **kwargs)
+        except Exception as err:
+            job.error = err
+
+    def __commit(self, db: Session, pending: List[_WriteJob]):
+        """
+        提交本批任务并通知等待方
+        """
+        if not pending:
+            return
+        try:
+            db.commit()
+            self._commits += 1
+        except Exception as err:
+            db.rollback()
+            for job in pending:
+                job.error = job.error or err
+        finally:
+            db.expunge_all()
+        for job in pending:
+            if job.error:
+                job.future.set_exception(job.error)
+            else:
+                job.future.set_result(job.result)
+
+    def __checkpoint(self):
+        """
+        空闲时将 WAL 内容写回主数据库
+        """
+        if self._commits:
+            perform_checkpoint()
+            self._commits = 0
+
+
+# 单线程写入
+db_writer: Optional[DbWriter] = DbWriter() if single_writer else None
+
+
+def detach_args(args: tuple, kwargs: dict, db: Optional[Session] = None):
+    """
+    将参数中属于其它会话的数据对象移出原会话，以便在写入会话中使用
+    """
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, Base):
+            session = object_session(value)
+            if session is not None and session is not db:
+                session.expunge(value)
+
+
+def replace_args_db(args: tuple, kwargs: dict, db: Session) -> Tuple[tuple, dict]:
+    """
+    将参数中的数据库会话替换为指定会话，没有会话参数时按 update_args_db 更新
+    """
+    detach_args(args, kwargs, db)
+    if get_args_db(args, kwargs) is None:
+        return update_args_db(args, kwargs, db)
+    args = tuple(db if isinstance(arg, Session) else arg for arg in args)
+    kwargs = {key: db if isinstance(value, Session) else value for key, value in kwargs.items()}
+    return args, kwargs
+
+
 def get_args_db(args: tuple, kwargs: dict) -> Optional[Session]:
     """
     从参数中获取数据库Session对象
@@ -125,10 +408,27 @@ def db_update(func):
     """
 
     def wrapper(*args, **kwargs):
+        transaction_db = _transaction_db.get()
+        if db_writer is not None:
+            if transaction_db is None:
+                # 交由写入线程执行
+                detach_args(args, kwargs)
+                return db_writer.submit(func, args, kwargs)
+            # 写入线程或独占写入时，统一使用写入会话
+            args, kwargs = replace_args_db(args, kwargs, transaction_db)
         # 是否关闭数据库会话
         _close_db = False
         # 从参数中获取数据库会话
         db = get_args_db(args, kwargs)
+        if not db and transaction_db is not None:
+            # 加入当前事务
+            db = transaction_db
+            args, kwargs = update_args_db(args, kwargs, db)
+        if db is not None and db is transaction_db:
+            # 事务中只刷新，由事务统一提交
+            result = func(*args, **kwargs)
+            db.flush()
+            return result
         if not db:
             # 如果没有获取到数据库会话，创建一个
             db = ScopedSession()
@@ -161,15 +461,20 @@ def db_query(func):
     """
 
     def wrapper(*args, **kwargs):
+        if db_writer is not None and _transaction_db.get() is not None:
+            # 写入线程或独占写入时，统一使用写入会话，以读取未提交的数据
+            args, kwargs = replace_args_db(args, kwargs, _transaction_db.get())
         # 是否关闭数据库会话
         _close_db = False
         # 从参数中获取数据库会话
         db = get_args_db(args, kwargs)
         if not db:
-            # 如果没有获取到数据库会话，创建一个
-            db = ScopedSession()
-            # 标记需要关闭数据库会话
-            _close_db = True
+            # 在事务中时使用事务会话，否则创建一个
+            db = _transaction_db.get()
+            if db is None:
+                db = ScopedSession()
+                # 标记需要关闭数据库会话
+                _close_db = True
             # 更新参数中的数据库会话
             args, kwargs = update_args_db(args, kwargs, db)
         try:
@@ -218,11 +523,67 @@ class Base:
     def truncate(cls, db: Session):
         db.query(cls).delete()
 
+    @classmethod
+    @db_update
+    def bulk_insert(cls, db: Session, items: List[dict]):
+        """
+        批量新增，一条语句通过 executemany 写入
+        """
+        if items:
+            db.execute(insert(cls), items)
+
+    @classmethod
+    @db_update
+    def bulk_update(cls, db: Session, items: List[dict]):
+        """
+        按主键批量更新，每条数据需包含id
+        """
+        if items:
+            db.execute(update(cls), items)
+
+    @classmethod
+    @db_update
+    def bulk_upsert(cls, db: Session, items: List[dict], index_elements: List[str]):
+        """
+        批量新增或更新，已存在时更新除索引列以外的字段
+        :param items: 数据列表，每条数据的字段需一致
+        :param index_elements: 唯一索引列
+        """
+        if not items:
+            return
+        stmt = sqlite_insert(cls)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={key: stmt.excluded[key] for key in items[0] if key not in index_elements and key != "id"}
+        )
+        db.execute(stmt, items)
+
     @classmethod
     @db_query
     def list(cls, db: Session) -> List[Self]:
         return db.query(cls).all()
 
+    @classmethod
+    def fts_filter(cls, db: Session, keyword: str):
+        """
+        全文索引过滤条件，用于缩小 LIKE 查询的范围，索引表为 {表名}_fts，使用 trigram 分词
+        :param keyword: 以 % 分隔的关键字
+        :return: 索引表不存在或关键字均少于3个字符无法使用索引时返回None
+        """
+        table = f"{cls.__tablename__}_fts"
+        if table not in _fts_tables:
+            _fts_tables[table] = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                            {"name": table}).first() is not None
+        if not _fts_tables[table]:
+            return None
+        # trigram 分词只能匹配不少于3个字符的词
+        words = [word for word in keyword.split("%") if len(word) >= 3]
+        if not words:
+            return None
+        match = " AND ".join('"%s"' % word.replace('"', '""') for word in words)
+        return cls.id.in_(text(f"SELECT rowid FROM {table} WHERE {table} MATCH :match")
+                          .bindparams(match=match).columns(column("rowid", Integer)))
+
     def to_dict(self):
         return {c.name: getattr(self, c.name, None) for c in self.__table__.columns} # noqa
 
@@ -41,9 +41,7 @@ class DownloadHistoryOper(DbOper):
         """
         新增下载历史文件
         """
-        for file_item in file_items:
-            downloadfile = DownloadFiles(**file_item)
-            downloadfile.create(self._db)
+        DownloadFiles.bulk_insert(self._db, file_items)
 
     def truncate_files(self):
         """
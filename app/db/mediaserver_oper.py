@@ -1,8 +1,8 @@
-from typing import Optional
+from typing import Optional, List
 
 from sqlalchemy.orm import Session
 
-from app.db import DbOper
+from app.db import DbOper, db_transaction
 from app.db.models.mediaserver import MediaServerItem
 
 
@@ -26,6 +26,34 @@ class MediaServerOper(DbOper):
             return True
         return False
 
+    def upsert(self, server: str, items: List[dict]):
+        """
+        按服务器和条目ID批量新增或更新媒体服务器数据，在一个事务中提交
+        """
+        # MediaServerItem中没有的属性和主键剔除
+        items = [{k: v for k, v in item.items() if k != "id" and hasattr(MediaServerItem, k)} for item in items]
+        if not items:
+            return
+        with db_transaction(self._db):
+            exists = MediaServerItem.get_ids_by_itemids(self._db, server, [item.get("item_id") for item in items])
+            MediaServerItem.bulk_update(self._db, [{**item, "id": exists[item.get("item_id")]}
+                                                   for item in items if item.get("item_id") in exists])
+            MediaServerItem.bulk_insert(self._db, [item for item in items if item.get("item_id") not in exists])
+
+    def delete_stale(self, server: str, before: str):
+        """
+        删除本次同步中未出现的媒体服务器数据
+        :param server: 媒体服务器名称
+        :param before: 本次同步开始时间，早于该时间更新的数据视为已不存在
+        """
+        MediaServerItem.delete_stale(self._db, server, before)
+
+    def delete_other_servers(self, servers: List[str]):
+        """
+        删除已不同步的媒体服务器数据
+        """
+        MediaServerItem.delete_other_servers(self._db, servers)
+
     def empty(self, server: Optional[str] = None):
         """
         清空媒体服务器数据
@@ -1,7 +1,7 @@
 import time
 from typing import Optional
 
-from sqlalchemy import Column, Integer, String, Sequence, JSON
+from sqlalchemy import Column, Integer, String, Sequence, JSON, or_
 from sqlalchemy.orm import Session
 
 from app.db import db_query, db_update, Base
@@ -73,8 +73,40 @@ class DownloadHistory(Base):
 
     @staticmethod
     @db_query
-    def list_by_page(db: Session, page: Optional[int] = 1, count: Optional[int] = 30):
-        return db.query(DownloadHistory).offset((page - 1) * count).limit(count).all()
+    def list_by_page(db: Session, page: Optional[int] = 1, count: Optional[int] = 30, last_id: Optional[int] = None):
+        """
+        分页查询，传入上一页最后一条记录的ID时按ID翻页
+        """
+        query = db.query(DownloadHistory)
+        query = query.order_by(DownloadHistory.id)
+        if last_id:
+            query = query.filter(DownloadHistory.id > last_id)
+        else:
+            query = query.offset((page - 1) * count)
+        return query.limit(count).all()
+
+    @staticmethod
+    @db_query
+    def list_by_title(db: Session, title: str, page: Optional[int] = 1, count: Optional[int] = 30,
+                      last_id: Optional[int] = None):
+        """
+        按标题、种子名称、保存路径查询，有全文索引时先按索引缩小范围，传入上一页最后一条记录的ID时按ID翻页
+        """
+        filters = [or_(
+            DownloadHistory.title.like(f'%{title}%'),
+            DownloadHistory.torrent_name.like(f'%{title}%'),
+            DownloadHistory.path.like(f'%{title}%'),
+        )]
+        fts_filter = DownloadHistory.fts_filter(db, title)
+        if fts_filter is not None:
+            filters.insert(0, fts_filter)
+        query = db.query(DownloadHistory).filter(*filters)
+        query = query.order_by(DownloadHistory.id)
+        if last_id:
+            query = query.filter(DownloadHistory.id > last_id)
+        else:
+            query = query.offset((page - 1) * count)
+        return query.limit(count).all()
 
     @staticmethod
     @db_query
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict
 
-from sqlalchemy import Column, Integer, String, Sequence, JSON
+from sqlalchemy import Column, Integer, String, Sequence, JSON, Index
 from sqlalchemy.orm import Session
 
 from app.db import db_query, db_update, Base
@@ -12,7 +12,7 @@ class MediaServerItem(Base):
     媒体服务器媒体条目表
     """
     id = Column(Integer, Sequence('id'), primary_key=True, index=True)
-    # 服务器类型
+    # 服务器名称
     server = Column(String)
     # 媒体库ID
     library = Column(String)
@@ -41,6 +41,10 @@ class MediaServerItem(Base):
     # 同步时间
     lst_mod_date = Column(String, default=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
+    __table_args__ = (
+        Index('ix_mediaserveritem_server_item_id', 'server', 'item_id'),
+    )
+
     @staticmethod
     @db_query
     def get_by_itemid(db: Session, item_id: str):
@@ -54,6 +58,38 @@ class MediaServerItem(Base):
         else:
             db.query(MediaServerItem).filter(MediaServerItem.server == server).delete()
 
+    @staticmethod
+    @db_query
+    def get_ids_by_itemids(db: Session, server: str, item_ids: List[str]) -> Dict[str, int]:
+        """
+        查询服务器中已存在条目的主键，返回条目ID -> 主键
+        """
+        if not item_ids:
+            return {}
+        return {
+            item_id: rid for rid, item_id in db.query(MediaServerItem.id, MediaServerItem.item_id).filter(
+                MediaServerItem.server == server,
+                MediaServerItem.item_id.in_(item_ids)
+            ).all()
+        }
+
+    @staticmethod
+    @db_update
+    def delete_stale(db: Session, server: str, before: str):
+        """
+        删除服务器中同步时间早于指定时间的条目
+        """
+        db.query(MediaServerItem).filter(MediaServerItem.server == server,
+                                         MediaServerItem.lst_mod_date < before).delete()
+
+    @staticmethod
+    @db_update
+    def delete_other_servers(db: Session, servers: List[str]):
+        """
+        删除不在指定服务器列表中的条目
+        """
+        db.query(MediaServerItem).filter(MediaServerItem.server.notin_(servers)).delete()
+
     @staticmethod
     @db_query
     def exist_by_tmdbid(db: Session, tmdbid: int, mtype: str):
@@ -59,37 +59,56 @@ class TransferHistory(Base):
     # 剧集组
     episode_group = Column(String)
 
+    @staticmethod
+    def __title_filters(db: Session, title: str) -> list:
+        """
+        标题、源路径、目标路径模糊查询条件，有全文索引时先按索引缩小范围
+        """
+        filters = [or_(
+            TransferHistory.title.like(f'%{title}%'),
+            TransferHistory.src.like(f'%{title}%'),
+            TransferHistory.dest.like(f'%{title}%'),
+        )]
+        fts_filter = TransferHistory.fts_filter(db, title)
+        if fts_filter is not None:
+            filters.insert(0, fts_filter)
+        return filters
+
     @staticmethod
     @db_query
-    def list_by_title(db: Session, title: str, page: Optional[int] = 1, count: Optional[int] = 30, status: bool = None):
+    def list_by_title(db: Session, title: str, page: Optional[int] = 1, count: Optional[int] = 30, status: bool = None,
+                      last_id: Optional[int] = None):
+        """
+        按标题查询，传入上一页最后一条记录的ID时按ID翻页
+        """
+        query = db.query(TransferHistory)
         if status is not None:
-            return db.query(TransferHistory).filter(
-                TransferHistory.status == status
-            ).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            query = query.filter(TransferHistory.status == status)
+        else:
+            query = query.filter(*TransferHistory.__title_filters(db, title))
+        query = query.order_by(TransferHistory.id.desc())
+        if last_id:
+            query = query.filter(TransferHistory.id < last_id)
         else:
-            return db.query(TransferHistory).filter(or_(
-                TransferHistory.title.like(f'%{title}%'),
-                TransferHistory.src.like(f'%{title}%'),
-                TransferHistory.dest.like(f'%{title}%'),
-            )).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            query = query.offset((page - 1) * count)
+        return query.limit(count).all()
 
     @staticmethod
     @db_query
-    def list_by_page(db: Session, page: Optional[int] = 1, count: Optional[int] = 30, status: bool = None):
+    def list_by_page(db: Session, page: Optional[int] = 1, count: Optional[int] = 30, status: bool = None,
+                     last_id: Optional[int] = None):
+        """
+        分页查询，传入上一页最后一条记录的ID时按ID翻页
+        """
+        query = db.query(TransferHistory)
         if status is not None:
-            return db.query(TransferHistory).filter(
-                TransferHistory.status == status
-            ).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            query = query.filter(TransferHistory.status == status)
+        query = query.order_by(TransferHistory.id.desc())
+        if last_id:
+            query = query.filter(TransferHistory.id < last_id)
         else:
-            return db.query(TransferHistory).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            query = query.offset((page - 1) * count)
+        return query.limit(count).all()
 
     @staticmethod
     @db_query
@@ -141,11 +160,9 @@ class TransferHistory(Base):
         if status is not None:
             return db.query(func.count(TransferHistory.id)).filter(TransferHistory.status == status).first()[0]
         else:
-            return db.query(func.count(TransferHistory.id)).filter(or_(
-                TransferHistory.title.like(f'%{title}%'),
-                TransferHistory.src.like(f'%{title}%'),
-                TransferHistory.dest.like(f'%{title}%')
-            )).first()[0]
+            return db.query(func.count(TransferHistory.id)).filter(
+                *TransferHistory.__title_filters(db, title)
+            ).first()[0]
 
     @staticmethod
     @db_query
@@ -3,7 +3,7 @@ from typing import Any, List, Optional
 
 from app.core.context import MediaInfo
 from app.core.meta import MetaBase
-from app.db import DbOper
+from app.db import DbOper, db_transaction
 from app.db.models.transferhistory import TransferHistory
 from app.schemas import TransferInfo, FileItem
 
@@ -103,15 +103,16 @@ class TransferHistoryOper(DbOper):
         """
         新增转移历史，相同源目录的记录会被删除
         """
-        if kwargs.get("src"):
-            transferhistory = TransferHistory.get_by_src(self._db, kwargs.get("src"))
-            if transferhistory:
-                transferhistory.delete(self._db, transferhistory.id)
-        kwargs.update({
-            "date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        })
-        TransferHistory(**kwargs).create(self._db)
-        return TransferHistory.get_by_src(self._db, kwargs.get("src"))
+        with db_transaction(self._db):
+            if kwargs.get("src"):
+                transferhistory = TransferHistory.get_by_src(self._db, kwargs.get("src"))
+                if transferhistory:
+                    transferhistory.delete(self._db, transferhistory.id)
+            kwargs.update({
+                "date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+            })
+            TransferHistory(**kwargs).create(self._db)
+            return TransferHistory.get_by_src(self._db, kwargs.get("src"))
 
     def update_download_hash(self, historyid, download_hash):
         """
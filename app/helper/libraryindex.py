@@ -0,0 +1,278 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import regex as re
+
+from app.core.context import MediaInfo
+from app.core.event import eventmanager, Event
+from app.db.models.mediaserver import MediaServerItem
+from app.helper.service import ServiceConfigHelper
+from app.log import logger
+from app.schemas import ExistMediaInfo, WebhookEventInfo
+from app.schemas.types import EventType, MediaType
+from app.utils.singleton import Singleton
+
+# 索引条目键，(服务器名称, 条目ID)
+_EntryKey = Tuple[str, str]
+
+
+class LibraryIndexHelper(metaclass=Singleton):
+    """
+    媒体库索引，由同步到本地的媒体服务器条目构建，按 TMDBID、IMDBID、TVDBID 和标题年份在内存中查找媒体是否存在，
+    同步、整理完成和媒体服务器入库通知时增量更新
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        # (服务器名称, 条目ID) -> 条目
+        self._entries: Dict[_EntryKey, dict] = {}
+        # (类型, 索引类型, 值) -> 条目键
+        self._keys: Dict[Tuple[str, str, str], Set[_EntryKey]] = {}
+
+    @eventmanager.register(EventType.TransferComplete)
+    def handle_transfer_complete(self, event: Event):
+        """
+        整理完成后媒体库中的季集可能发生变化，移除对应媒体的索引，下次查询时从媒体服务器获取
+        """
+        if not event or not event.event_data:
+            return
+        mediainfo: MediaInfo = event.event_data.get("mediainfo")
+        if mediainfo and mediainfo.tmdb_id:
+            self.invalidate(tmdbid=mediainfo.tmdb_id)
+
+    @eventmanager.register(EventType.WebhookMessage)
+    def handle_webhook_message(self, event: Event):
+        """
+        媒体服务器入库或删除通知时移除对应媒体的索引
+        """
+        if not event or not event.event_data:
+            return
+        event_info: WebhookEventInfo = event.event_data
+        if not event_info.tmdb_id or not event_info.event:
+            return
+        if not any(word in event_info.event.lower() for word in ("new", "add", "delete", "remove")):
+            return
+        try:
+            self.invalidate(tmdbid=int(event_info.tmdb_id))
+        except ValueError:
+            return
+
+    @staticmethod
+    def __normalize_title(title: Optional[str]) -> str:
+        """
+        标准化标题，去除空白和标点并转为小写
+        """
+        return re.sub(r"[\W_]+", "", title or "").lower()
+
+    def __index_keys(self, entry: dict) -> List[Tuple[str, str, str]]:
+        """
+        条目的所有索引键
+        """
+        mtype = entry.get("item_type")
+        keys = [(mtype, "item", str(entry.get("item_id")))]
+        if entry.get("tmdbid"):
+            keys.append((mtype, "tmdb", str(entry.get("tmdbid"))))
+        if entry.get("imdbid"):
+            keys.append((mtype, "imdb", str(entry.get("imdbid"))))
+        if entry.get("tvdbid"):
+            keys.append((mtype, "tvdb", str(entry.get("tvdbid"))))
+        title = self.__normalize_title(entry.get("title"))
+        if title:
+            keys.append((mtype, "title", f"{title}|{entry.get('year') or ''}"))
+        return keys
+
+    def __add(self, entry: dict):
+        """
+        添加或替换条目，需持有锁
+        """
+        key = (entry.get("server"), str(entry.get("item_id")))
+        self.__remove(key)
+        self._entries[key] = entry
+        for index_key in self.__index_keys(entry):
+            self._keys.setdefault(index_key, set()).add(key)
+
+    def __remove(self, key: _EntryKey):
+        """
+        移除条目，需持有锁
+        """
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        for index_key in self.__index_keys(entry):
+            keys = self._keys.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._keys.pop(index_key, None)
+
+    def __load(self):
+        """
+        首次查询时从数据库加载全部条目
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            count = 0
+            for item in MediaServerItem.list():
+                self.__add(self.__to_entry(item.to_dict()))
+                count += 1
+            self._loaded = True
+            logger.info(f"媒体库索引加载完成，共 {count} 个条目")
+
+    @staticmethod
+    def __to_entry(item: dict) -> dict:
+        """
+        将媒体服务器条目转换为索引条目，季号转为整数
+        """
+        seasoninfo = {}
+        for season, episodes in (item.get("seasoninfo") or {}).items():
+            try:
+                seasoninfo[int(season)] = list(episodes or [])
+            except (TypeError, ValueError):
+                continue
+        return {
+            "server": item.get("server"),
+            "item_id": str(item.get("item_id")),
+            "item_type": item.get("item_type"),
+            "title": item.get("title"),
+            "year": str(item.get("year")) if item.get("year") else None,
+            "tmdbid": item.get("tmdbid"),
+            "imdbid": item.get("imdbid"),
+            "tvdbid": item.get("tvdbid"),
+            "seasoninfo": seasoninfo,
+            "lst_mod_date": item.get("lst_mod_date")
+        }
+
+    def update(self, items: Iterable[dict]):
+        """
+        同步写入数据库后更新索引，索引尚未加载时忽略
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            for item in items:
+                self.__add(self.__to_entry(item))
+
+    def remove_stale(self, server: str, before: str):
+        """
+        移除服务器中同步时间早于指定时间的条目
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.get("server") == server and (entry.get("lst_mod_date") or "") < before:
+                    self.__remove(key)
+
+    def retain_servers(self, servers: List[str]):
+        """
+        只保留指定服务器的条目
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] not in servers]:
+                self.__remove(key)
+
+    def invalidate(self, tmdbid: int):
+        """
+        移除指定TMDBID的所有条目
+        """
+        with self._lock:
+            for key in list(self._keys.get((MediaType.MOVIE.value, "tmdb", str(tmdbid)), set())) \
+                    + list(self._keys.get((MediaType.TV.value, "tmdb", str(tmdbid)), set())):
+                self.__remove(key)
+
+    def clear(self):
+        """
+        清空索引，下次查询时重新加载
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._loaded = False
+
+    def __find(self, mediainfo: MediaInfo, itemid: Optional[str] = None,
+               server: Optional[str] = None) -> Optional[dict]:
+        """
+        查找媒体对应的条目
+        """
+        mtype = mediainfo.type.value
+        index_keys = []
+        if itemid:
+            index_keys.append((mtype, "item", str(itemid)))
+        if mediainfo.tmdb_id:
+            index_keys.append((mtype, "tmdb", str(mediainfo.tmdb_id)))
+        if mediainfo.imdb_id:
+            index_keys.append((mtype, "imdb", str(mediainfo.imdb_id)))
+        if mediainfo.tvdb_id:
+            index_keys.append((mtype, "tvdb", str(mediainfo.tvdb_id)))
+        # 与媒体服务器查询一致，有TMDBID时不按标题年份匹配，避免同名同年份的其它媒体
+        title = self.__normalize_title(mediainfo.title)
+        if title and not mediainfo.tmdb_id:
+            index_keys.append((mtype, "title", f"{title}|{mediainfo.year or ''}"))
+        for index_key in index_keys:
+            for key in sorted(self._keys.get(index_key) or []):
+                if server and key[0] != server:
+                    continue
+                entry = self._entries.get(key)
+                # TMDBID不一致的条目不是同一媒体
+                if mediainfo.tmdb_id and entry.get("tmdbid") \
+                        and str(entry.get("tmdbid")) != str(mediainfo.tmdb_id):
+                    continue
+                return entry
+        return None
+
+    def exists(self, mediainfo: MediaInfo, itemid: Optional[str] = None,
+               server: Optional[str] = None) -> Optional[ExistMediaInfo]:
+        """
+        在索引中查找媒体是否存在
+        :param mediainfo: 识别的媒体信息
+        :param itemid: 媒体服务器ItemID
+        :param server: 媒体服务器名称
+        :return: 未找到时返回None，找到时返回存在信息
+        """
+        if not mediainfo or mediainfo.type not in (MediaType.MOVIE, MediaType.TV):
+            return None
+        self.__load()
+        with self._lock:
+            entry = self.__find(mediainfo, itemid=itemid, server=server)
+            if not entry:
+                return None
+            if mediainfo.type == MediaType.TV and not entry.get("seasoninfo"):
+                return None
+            seasons = {season: list(episodes) for season, episodes in entry.get("seasoninfo").items()} \
+                if mediainfo.type == MediaType.TV else {}
+        server_conf = next((conf for conf in ServiceConfigHelper.get_mediaserver_configs()
+                            if conf.name == entry.get("server")), None)
+        if not server_conf or not server_conf.enabled:
+            return None
+        logger.debug(f"媒体库索引中找到了 {mediainfo.title_year}：{entry.get('server')} - {entry.get('item_id')}")
+        return ExistMediaInfo(
+            type=mediainfo.type,
+            seasons=seasons,
+            server_type=server_conf.type,
+            server=entry.get("server"),
+            itemid=entry.get("item_id")
+        )
+
+    def put(self, mediainfo: MediaInfo, exists: ExistMediaInfo):
+        """
+        媒体服务器实时查询到媒体后写入索引，索引尚未加载时忽略
+        """
+        if not exists or not exists.server or not exists.itemid \
+                or mediainfo.type not in (MediaType.MOVIE, MediaType.TV):
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            self.__add({
+                "server": exists.server,
+                "item_id": str(exists.itemid),
+                "item_type": mediainfo.type.value,
+                "title": mediainfo.title,
+                "year": mediainfo.year,
+                "tmdbid": mediainfo.tmdb_id,
+                "imdbid": mediainfo.imdb_id,
+                "tvdbid": mediainfo.tvdb_id,
+                "seasoninfo": {int(season): list(episodes or [])
+                               for season, episodes in (exists.seasons or {}).items()},
+                "lst_mod_date": None
+            })
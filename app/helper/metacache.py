@@ -0,0 +1,137 @@
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from app.core.config import settings
+from app.log import logger
+from app.utils.singleton import Singleton
+
+
+class MetaCacheHelper(metaclass=Singleton):
+    """
+    媒体识别缓存存储，TMDB、豆瓣等识别缓存按命名空间逐条保存，支持按键读取、批量写入和按过期时间清理
+    """
+
+    _db_file = "__meta_cache__.db"
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self._db_path = db_path or settings.TEMP_PATH / self._db_file
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self._db_path, timeout=settings.DB_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                media_id TEXT,
+                expire INTEGER,
+                data BLOB NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_meta_cache_media_id ON meta_cache (namespace, media_id)")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        """
+        读取单条缓存
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM meta_cache WHERE namespace = ? AND key = ?",
+                                     (namespace, key)).fetchone()
+        if not row:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as err:
+            logger.error(f"加载识别缓存 {namespace} - {key} 出错：{str(err)}")
+            return None
+
+    def count(self, namespace: str) -> int:
+        """
+        统计缓存数量
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(1) FROM meta_cache WHERE namespace = ?",
+                                     (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def upsert(self, namespace: str, items: Dict[str, dict], expire_key: Optional[str] = None):
+        """
+        批量新增或更新缓存
+        :param namespace: 命名空间
+        :param items: 缓存键值
+        :param expire_key: 缓存内容中过期时间戳的键名
+        """
+        if not items:
+            return
+        rows = [(namespace, key, str(info.get("id")) if info.get("id") is not None else None,
+                 info.get(expire_key) if expire_key else None,
+                 pickle.dumps(info, protocol=pickle.HIGHEST_PROTOCOL))
+                for key, info in items.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO meta_cache (namespace, key, media_id, expire, data) "
+                                       "VALUES (?, ?, ?, ?, ?)", rows)
+
+    def delete(self, namespace: str, keys: List[str]):
+        """
+        批量删除缓存
+        """
+        if not keys:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM meta_cache WHERE namespace = ? AND key = ?",
+                                       [(namespace, key) for key in keys])
+
+    def delete_by_media_id(self, namespace: str, media_id: Any) -> int:
+        """
+        删除对应媒体ID的所有缓存
+        :return: 删除的数量
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM meta_cache WHERE namespace = ? AND media_id = ?",
+                                            (namespace, str(media_id)))
+        return cursor.rowcount
+
+    def delete_expired(self, namespace: str) -> int:
+        """
+        删除已过期的缓存
+        :return: 删除的数量
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM meta_cache WHERE namespace = ? "
+                                            "AND expire IS NOT NULL AND expire <= ?",
+                                            (namespace, int(time.time())))
+        return cursor.rowcount
+
+    def clear(self, namespace: str):
+        """
+        清空命名空间下的所有缓存
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM meta_cache WHERE namespace = ?", (namespace,))
+
+    def import_legacy(self, namespace: str, path: Path, expire_key: Optional[str] = None):
+        """
+        导入旧版整文件缓存并删除旧文件
+        """
+        if not path.exists():
+            return
+        try:
+            with open(path, 'rb') as f:
+                data: dict = pickle.load(f)
+            self.upsert(namespace, {key: info for key, info in (data or {}).items() if info and info.get("id")},
+                        expire_key=expire_key)
+            logger.info(f"已导入旧版识别缓存 {path.name}，共 {len(data or {})} 条")
+        except Exception as err:
+            logger.error(f"导入旧版识别缓存 {path.name} 失败：{str(err)}")
+        path.unlink(missing_ok=True)
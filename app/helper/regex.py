@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import regex as re
+
+from app.core.event import eventmanager, Event
+from app.log import logger
+from app.schemas import ConfigChangeEventData
+from app.schemas.types import EventType, SystemConfigKey
+from app.utils.singleton import Singleton
+
+
+class RegexHelper(metaclass=Singleton):
+    """
+    进程内共享的正则编译缓存，按表达式和标志缓存编译结果，超过容量时淘汰最久未使用的项
+    """
+
+    # 最大缓存数量
+    _maxsize = 2048
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patterns: OrderedDict[Tuple[str, int], re.Pattern] = OrderedDict()
+
+    @eventmanager.register(EventType.ConfigChanged)
+    def handle_config_changed(self, event: Event):
+        """
+        处理配置变更事件，自定义识别词、制作组、占位符变化时清空缓存
+        :param event: 事件对象
+        """
+        if not event:
+            return
+        event_data: ConfigChangeEventData = event.event_data
+        if event_data.key not in [SystemConfigKey.CustomIdentifiers.value,
+                                  SystemConfigKey.CustomReleaseGroups.value,
+                                  SystemConfigKey.Customization.value]:
+            return
+        logger.info("配置变更，清空正则编译缓存...")
+        self.clear()
+
+    def compile(self, pattern: str, flags: int = 0) -> re.Pattern:
+        """
+        编译正则表达式，已编译过的直接返回缓存
+        :param pattern: 正则表达式
+        :param flags: 正则标志
+        """
+        key = (pattern, flags)
+        with self._lock:
+            compiled = self._patterns.get(key)
+            if compiled is not None:
+                self._patterns.move_to_end(key)
+                return compiled
+        # 编译放在锁外，出错时直接抛出
+        compiled = re.compile(pattern, flags)
+        with self._lock:
+            self._patterns[key] = compiled
+            self._patterns.move_to_end(key)
+            while len(self._patterns) > self._maxsize:
+                self._patterns.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._patterns.clear()
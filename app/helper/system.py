@@ -29,7 +29,7 @@ class SystemHelper:
         if not event:
             return
         event_data: ConfigChangeEventData = event.event_data
-        if event_data.key not in ['DEBUG', 'LOG_LEVEL', 'LOG_MAX_FILE_SIZE', 'LOG_BACKUP_COUNT',
+        if event_data.key not in ['DEBUG', 'LOG_LEVEL', 'LOG_MAX_FILE_SIZE', 'LOG_BACKUP_COUNT', 'LOG_BUFFER_LINES',
                                   'LOG_FILE_FORMAT', 'LOG_CONSOLE_FORMAT']:
             return
         logger.info("配置变更，更新日志设置...")
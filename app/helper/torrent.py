@@ -404,6 +404,58 @@ class TorrentHelper(metaclass=WeakSingleton):
         if not filter_params:
             return True
 
+        return TorrentHelper.__match_filter(torrent_info, TorrentHelper.__compile_filter(filter_params))
+
+    @staticmethod
+    def filter_torrents(torrent_list: List[TorrentInfo],
+                        filter_params: Dict[str, str]) -> List[TorrentInfo]:
+        """
+        批量检查种子是否匹配订阅过滤规则，规则只编译一次，先按大小过滤再匹配正则
+        """
+
+        if not filter_params or not torrent_list:
+            return torrent_list
+
+        compiled = TorrentHelper.__compile_filter(filter_params)
+        # 大小
+        size_bounds = compiled.get("size")
+        if size_bounds:
+            torrent_list = [torrent_info for torrent_info in torrent_list
+                            if size_bounds[0] <= torrent_info.size <= size_bounds[1]]
+        return [torrent_info for torrent_info in torrent_list
+                if TorrentHelper.__match_filter(torrent_info, compiled)]
+
+    @staticmethod
+    def __compile_filter(filter_params: Dict[str, str]) -> dict:
+        """
+        编译订阅过滤规则，正则忽略大小写，大小转换为字节数上下限
+        """
+        compiled = {}
+        for key in ["include", "exclude", "quality", "resolution", "effect"]:
+            value = filter_params.get(key)
+            if value:
+                compiled[key] = (value, re.compile(r"%s" % value, re.I))
+        # 大小
+        size_range = filter_params.get("size")
+        if size_range:
+            if size_range.find("-") != -1:
+                # 区间
+                size_min, size_max = size_range.split("-")
+                compiled["size"] = (float(size_min.strip()) * 1024 * 1024,
+                                    float(size_max.strip()) * 1024 * 1024)
+            elif size_range.startswith(">"):
+                # 大于
+                compiled["size"] = (float(size_range[1:].strip()) * 1024 * 1024, float("inf"))
+            elif size_range.startswith("<"):
+                # 小于
+                compiled["size"] = (float("-inf"), float(size_range[1:].strip()) * 1024 * 1024)
+        return compiled
+
+    @staticmethod
+    def __match_filter(torrent_info: TorrentInfo, compiled: dict) -> bool:
+        """
+        检查种子是否匹配已编译的订阅过滤规则
+        """
         # 匹配内容
         content = (f"{torrent_info.title} "
                    f"{torrent_info.description} "
@@ -411,56 +463,41 @@ class TorrentHelper(metaclass=WeakSingleton):
                    f"{torrent_info.volume_factor}")
 
         # 包含
-        include = filter_params.get("include")
-        if include:
-            if not re.search(r"%s" % include, content, re.I):
+        if "include" in compiled:
+            include, pattern = compiled["include"]
+            if not pattern.search(content):
                 logger.info(f"{content} 不匹配包含规则 {include}")
                 return False
         # 排除
-        exclude = filter_params.get("exclude")
-        if exclude:
-            if re.search(r"%s" % exclude, content, re.I):
+        if "exclude" in compiled:
+            exclude, pattern = compiled["exclude"]
+            if pattern.search(content):
                 logger.info(f"{content} 匹配排除规则 {exclude}")
                 return False
         # 质量
-        quality = filter_params.get("quality")
-        if quality:
-            if not re.search(r"%s" % quality, torrent_info.title, re.I):
+        if "quality" in compiled:
+            quality, pattern = compiled["quality"]
+            if not pattern.search(torrent_info.title):
                 logger.info(f"{torrent_info.title} 不匹配质量规则 {quality}")
                 return False
         # 分辨率
-        resolution = filter_params.get("resolution")
-        if resolution:
-            if not re.search(r"%s" % resolution, torrent_info.title, re.I):
+        if "resolution" in compiled:
+            resolution, pattern = compiled["resolution"]
+            if not pattern.search(torrent_info.title):
                 logger.info(f"{torrent_info.title} 不匹配分辨率规则 {resolution}")
                 return False
         # 特效
-        effect = filter_params.get("effect")
-        if effect:
-            if not re.search(r"%s" % effect, torrent_info.title, re.I):
+        if "effect" in compiled:
+            effect, pattern = compiled["effect"]
+            if not pattern.search(torrent_info.title):
                 logger.info(f"{torrent_info.title} 不匹配特效规则 {effect}")
                 return False
 
         # 大小
-        size_range = filter_params.get("size")
-        if size_range:
-            if size_range.find("-") != -1:
-                # 区间
-                size_min, size_max = size_range.split("-")
-                size_min = float(size_min.strip()) * 1024 * 1024
-                size_max = float(size_max.strip()) * 1024 * 1024
-                if torrent_info.size < size_min or torrent_info.size > size_max:
-                    return False
-            elif size_range.startswith(">"):
-                # 大于
-                size_min = float(size_range[1:].strip()) * 1024 * 1024
-                if torrent_info.size < size_min:
-                    return False
-            elif size_range.startswith("<"):
-                # 小于
-                size_max = float(size_range[1:].strip()) * 1024 * 1024
-                if torrent_info.size > size_max:
-                    return False
+        size_bounds = compiled.get("size")
+        if size_bounds:
+            if torrent_info.size < size_bounds[0] or torrent_info.size > size_bounds[1]:
+                return False
 
         return True
 
@@ -498,3 +535,146 @@ class TorrentHelper(metaclass=WeakSingleton):
                              f"集 {torrent_episodes} 没有需要的集：{need_episodes}")
                 return False
         return True
+
+
+class TorrentMatchIndex:
+    """
+    订阅匹配索引，按媒体ID、标题分词和站点对预识别后的种子建立倒排索引，
+    使每个订阅只需比较可能匹配的种子，候选结果为逐个比较时匹配结果的超集
+    """
+
+    def __init__(self, torrents: Dict[str, List[Context]]):
+        """
+        :param torrents: 按站点域名分组的种子上下文
+        """
+        # 所有种子，按原始顺序编号
+        self._contexts: List[Tuple[str, Context]] = []
+        # 已识别种子：TMDBID -> 序号
+        self._tmdb_index: Dict[int, List[int]] = {}
+        # 已识别种子（无TMDBID）：豆瓣ID -> 序号
+        self._douban_index: Dict[str, List[int]] = {}
+        # 未识别种子：标题分词/词表指定ID -> 序号
+        self._token_index: Dict[str, List[int]] = {}
+        # 站点ID -> 序号
+        self._site_index: Dict[int, set] = {}
+        # 实际比较次数
+        self.compared = 0
+        # 通过索引跳过的比较次数
+        self.skipped = 0
+        for domain, contexts in torrents.items():
+            for context in contexts:
+                self.__add(domain, context)
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def __add(self, domain: str, context: Context):
+        seq = len(self._contexts)
+        self._contexts.append((domain, context))
+        self._site_index.setdefault(context.torrent_info.site, set()).add(seq)
+        mediainfo = context.media_info
+        if mediainfo and (mediainfo.tmdb_id or mediainfo.douban_id):
+            if mediainfo.tmdb_id:
+                self._tmdb_index.setdefault(mediainfo.tmdb_id, []).append(seq)
+            else:
+                self._douban_index.setdefault(mediainfo.douban_id, []).append(seq)
+        else:
+            for token in self.__torrent_tokens(context.meta_info, context.torrent_info):
+                self._token_index.setdefault(token, []).append(seq)
+
+    @staticmethod
+    def __torrent_tokens(torrent_meta: MetaBase, torrent: TorrentInfo) -> set:
+        """
+        种子用于标题匹配的所有分词，与 TorrentHelper.match_torrent 的比较口径一致
+        """
+        tokens = set()
+        if torrent_meta.tmdbid:
+            tokens.add(f"tmdb:{torrent_meta.tmdbid}")
+        if torrent_meta.doubanid:
+            tokens.add(f"douban:{torrent_meta.doubanid}")
+        tokens.update({
+            StringUtils.clear_upper(torrent_meta.cn_name),
+            StringUtils.clear_upper(torrent_meta.en_name)
+        } - {""})
+        if torrent_meta.org_string:
+            tokens.update(StringUtils.clear_upper(t) for t in re.split(
+                r'[\s/【】.\[\]\-]+',
+                torrent_meta.org_string
+            ) if not StringUtils.is_english_word(t))
+        if torrent.description:
+            tokens.update(StringUtils.clear_upper(t) for t in re.split(
+                r'[\s/【】|]+',
+                torrent.description) if not StringUtils.is_english_word(t))
+        return tokens
+
+    @staticmethod
+    def __media_tokens(mediainfo: MediaInfo) -> set:
+        """
+        媒体信息用于标题匹配的所有分词
+        """
+        tokens = {
+                     StringUtils.clear_upper(mediainfo.title),
+                     StringUtils.clear_upper(mediainfo.original_title)
+                 } - {""}
+        tokens.update(StringUtils.clear_upper(name) for name in mediainfo.names if name)
+        if mediainfo.tmdb_id:
+            tokens.add(f"tmdb:{mediainfo.tmdb_id}")
+        if mediainfo.douban_id:
+            tokens.add(f"douban:{mediainfo.douban_id}")
+        return tokens
+
+    def all(self, domains: Optional[List[str]] = None,
+            sites: Optional[List[int]] = None) -> List[Tuple[str, Context]]:
+        """
+        返回站点范围内的所有种子，用于无法通过索引缩小范围的场景
+        """
+        return self.__select(range(len(self._contexts)), domains=domains, sites=sites)
+
+    def candidates(self, mediainfo: MediaInfo, domains: Optional[List[str]] = None,
+                   sites: Optional[List[int]] = None) -> List[Tuple[str, Context]]:
+        """
+        返回站点范围内可能匹配媒体信息的种子，保持原始顺序
+        :param mediainfo: 订阅的媒体信息
+        :param domains: 订阅的站点域名，为空则不限制
+        :param sites: 订阅的站点ID，为空则不限制
+        """
+        seqs = set()
+        if mediainfo.tmdb_id:
+            seqs.update(self._tmdb_index.get(mediainfo.tmdb_id) or [])
+        if mediainfo.douban_id:
+            seqs.update(self._douban_index.get(mediainfo.douban_id) or [])
+        for token in self.__media_tokens(mediainfo):
+            seqs.update(self._token_index.get(token) or [])
+        return self.__select(sorted(seqs), domains=domains, sites=sites)
+
+    def __in_scope(self, seq: int, domains: Optional[List[str]], site_seqs: Optional[set]) -> bool:
+        """
+        种子是否在订阅的站点范围内
+        """
+        if domains and self._contexts[seq][0] not in domains:
+            return False
+        if site_seqs is not None and seq not in site_seqs:
+            return False
+        return True
+
+    def __select(self, seqs, domains: Optional[List[str]] = None,
+                 sites: Optional[List[int]] = None) -> List[Tuple[str, Context]]:
+        """
+        按站点范围筛选种子，并统计比较和跳过的次数
+        """
+        site_seqs = None
+        if sites:
+            site_seqs = set()
+            for site in sites:
+                site_seqs.update(self._site_index.get(site) or [])
+        selected = [self._contexts[seq] for seq in seqs if self.__in_scope(seq, domains, site_seqs)]
+        # 站点范围内的种子总数
+        if site_seqs is not None:
+            total = sum(1 for seq in site_seqs if self.__in_scope(seq, domains, None))
+        elif domains:
+            total = sum(1 for domain, _ in self._contexts if domain in domains)
+        else:
+            total = len(self._contexts)
+        self.compared += len(selected)
+        self.skipped += total - len(selected)
+        return selected
@@ -0,0 +1,189 @@
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Callable
+
+from app.core.config import settings
+from app.core.context import Context
+from app.log import logger
+from app.utils.singleton import Singleton
+
+
+class TorrentCacheHelper(metaclass=Singleton):
+    """
+    站点种子缓存存储，按站点域名和种子签名逐条保存，支持增量追加、按站点裁剪和按站点懒加载
+    """
+
+    _db_file = "__torrents_cache__.db"
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self._db_path = db_path or settings.TEMP_PATH / self._db_file
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self._db_path, timeout=settings.DB_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS torrents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stype TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                enclosure TEXT,
+                data BLOB NOT NULL,
+                UNIQUE (stype, domain, signature)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_torrents_domain ON torrents (stype, domain, id)")
+        self._conn.commit()
+
+    @staticmethod
+    def signature(context: Context) -> str:
+        """
+        种子签名，用于判断种子是否已处理过
+        """
+        return f'{context.torrent_info.title}{context.torrent_info.description}'
+
+    def domains(self, stype: str) -> List[str]:
+        """
+        获取有缓存数据的站点域名
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT domain FROM torrents WHERE stype = ?", (stype,)).fetchall()
+        return [row[0] for row in rows]
+
+    def signatures(self, stype: str, domain: str) -> Set[str]:
+        """
+        获取站点已缓存种子的签名，不反序列化种子数据
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT signature FROM torrents WHERE stype = ? AND domain = ?",
+                                      (stype, domain)).fetchall()
+        return {row[0] for row in rows}
+
+    def count(self, stype: str) -> Dict[str, int]:
+        """
+        统计各站点缓存的种子数量
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT domain, COUNT(1) FROM torrents WHERE stype = ? GROUP BY domain",
+                                      (stype,)).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def get(self, stype: str, domain: str) -> List[Context]:
+        """
+        按写入顺序加载单个站点的缓存种子
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM torrents WHERE stype = ? AND domain = ? ORDER BY id",
+                                      (stype, domain)).fetchall()
+        contexts = []
+        for row in rows:
+            try:
+                contexts.append(pickle.loads(row[0]))
+            except Exception as err:
+                logger.error(f"加载种子缓存 {domain} 出错：{str(err)}")
+        return contexts
+
+    def get_all(self, stype: str, domains: Optional[List[str]] = None) -> Dict[str, List[Context]]:
+        """
+        加载多个站点的缓存种子
+        :param stype: 缓存类型，spider:爬虫缓存，rss:rss缓存
+        :param domains: 站点域名列表，为空则加载所有站点
+        """
+        if domains is None:
+            domains = self.domains(stype)
+        result = {}
+        for domain in domains:
+            contexts = self.get(stype, domain)
+            if contexts:
+                result[domain] = contexts
+        return result
+
+    def append(self, stype: str, domain: str, contexts: List[Context], limit: Optional[int] = None):
+        """
+        追加站点种子，已存在相同签名的种子会被覆盖
+        :param stype: 缓存类型
+        :param domain: 站点域名
+        :param contexts: 种子上下文列表
+        :param limit: 站点最多保留的种子数量，超过时移除最早写入的种子
+        """
+        if not contexts:
+            return
+        rows = [(stype, domain, self.signature(context), context.torrent_info.enclosure,
+                 pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL))
+                for context in contexts]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO torrents (stype, domain, signature, enclosure, data) "
+                                       "VALUES (?, ?, ?, ?, ?)", rows)
+                if limit:
+                    self.__trim(stype, domain, limit)
+
+    def update(self, stype: str, domain: str, context: Context):
+        """
+        更新单个种子的缓存数据
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE torrents SET data = ? WHERE stype = ? AND domain = ? AND signature = ?",
+                                   (pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL),
+                                    stype, domain, self.signature(context)))
+
+    def trim(self, stype: str, domain: str, limit: int):
+        """
+        裁剪站点种子，只保留最后写入的limit条
+        """
+        with self._lock:
+            with self._conn:
+                self.__trim(stype, domain, limit)
+
+    def __trim(self, stype: str, domain: str, limit: int):
+        self._conn.execute("DELETE FROM torrents WHERE stype = ? AND domain = ? AND id NOT IN "
+                           "(SELECT id FROM torrents WHERE stype = ? AND domain = ? ORDER BY id DESC LIMIT ?)",
+                           (stype, domain, stype, domain, limit))
+
+    def delete(self, stype: str, domain: str, signature: str) -> bool:
+        """
+        删除单个种子
+        :return: 是否有种子被删除
+        """
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute("DELETE FROM torrents WHERE stype = ? AND domain = ? AND signature = ?",
+                                            (stype, domain, signature))
+        return cursor.rowcount > 0
+
+    def delete_invalid(self, stype: str, is_invalid: Callable[[str], bool]) -> int:
+        """
+        删除无效种子
+        :param stype: 缓存类型
+        :param is_invalid: 根据种子链接判断是否无效的方法
+        :return: 删除的种子数量
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, enclosure FROM torrents WHERE stype = ?", (stype,)).fetchall()
+            ids = [(row[0],) for row in rows if row[1] and is_invalid(row[1])]
+            if ids:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM torrents WHERE id = ?", ids)
+        return len(ids)
+
+    def clear(self, stype: Optional[str] = None):
+        """
+        清空缓存
+        :param stype: 缓存类型，为空则清空所有类型
+        """
+        with self._lock:
+            with self._conn:
+                if stype:
+                    self._conn.execute("DELETE FROM torrents WHERE stype = ?", (stype,))
+                else:
+                    self._conn.execute("DELETE FROM torrents")
+
+    def import_legacy(self, stype: str, cache: Dict[str, List[Context]]):
+        """
+        导入旧版整文件缓存数据
+        """
+        for domain, contexts in (cache or {}).items():
+            self.append(stype, domain, contexts, limit=settings.CONF.torrents)
@@ -1,9 +1,14 @@
+import asyncio
+import atexit
 import logging
+import os
 import sys
 import threading
-from logging.handlers import RotatingFileHandler
+from collections import deque
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Any, Optional
+from queue import SimpleQueue
+from typing import Dict, Any, Optional, Generator, List, Tuple, Union
 
 import click
 from pydantic import BaseSettings, BaseModel
@@ -29,6 +34,8 @@ class LogConfigModel(BaseModel):
     LOG_MAX_FILE_SIZE: int = 5
     # 备份的日志文件数量
     LOG_BACKUP_COUNT: int = 10
+    # 每个日志文件在内存中保留的最近日志行数
+    LOG_BUFFER_LINES: int = 1000
     # 控制台日志格式
     LOG_CONSOLE_FORMAT: str = "%(leveltext)s[%(name)s] %(asctime)s %(message)s"
     # 文件日志格式
@@ -64,6 +71,15 @@ class LogSettings(BaseSettings, LogConfigModel):
         env_file_encoding = "utf-8"
 
 
+# 日志方法对应的日志级别
+method_levels = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
 # 日志级别颜色映射
 level_name_colors = {
     logging.DEBUG: lambda level_name: click.style(str(level_name), fg="cyan"),
@@ -88,12 +104,97 @@ class CustomFormatter(logging.Formatter):
         return super().format(record)
 
 
+class LogBufferHandler(logging.Handler):
+    """
+    日志环形缓冲，在内存中保留最近的日志行，并将新日志分发给所有订阅者
+    """
+
+    def __init__(self, maxlen: int, log_path: Path):
+        super().__init__()
+        self._lines = deque(maxlen=maxlen)
+        self._log_path = log_path
+        # 已缓冲的日志写入文件后的文件大小
+        self._file_size: Optional[int] = None
+        # 订阅者队列 -> 所属事件循环
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+    @staticmethod
+    def __put(queue: asyncio.Queue, lines: List[str]):
+        """
+        在订阅者的事件循环中写入队列，队列已满时丢弃
+        """
+        for line in lines:
+            try:
+                queue.put_nowait(line)
+            except asyncio.QueueFull:
+                return
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            lines = self.format(record).splitlines()
+        except Exception:  # noqa
+            self.handleError(record)
+            return
+        # emit 已持有 handler 锁
+        self._lines.extend(lines)
+        # 文件日志先于缓冲输出，此时文件中已包含本条日志
+        self._file_size = self.__get_file_size()
+        for queue, loop in list(self._subscribers.items()):
+            try:
+                loop.call_soon_threadsafe(self.__put, queue, lines)
+            except RuntimeError:
+                # 事件循环已关闭
+                self._subscribers.pop(queue, None)
+
+    def resize(self, maxlen: int):
+        """
+        调整缓冲行数
+        """
+        with self.lock:
+            if self._lines.maxlen != maxlen:
+                self._lines = deque(self._lines, maxlen=maxlen)
+
+    def __get_file_size(self) -> Optional[int]:
+        """
+        获取日志文件大小
+        """
+        try:
+            return os.path.getsize(self._log_path)
+        except OSError:
+            return None
+
+    def subscribe(self, maxsize: int = 1000) -> Tuple[List[str], asyncio.Queue, Optional[int]]:
+        """
+        订阅新日志，需在事件循环中调用
+        :param maxsize: 订阅队列的最大长度
+        :return: 当前缓冲的日志行，新日志队列，订阅时已缓冲日志对应的文件大小，之后的日志只通过队列推送
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        with self.lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            file_size = self._file_size if self._file_size is not None else self.__get_file_size()
+            return list(self._lines), queue, file_size
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """
+        取消订阅
+        """
+        with self.lock:
+            self._subscribers.pop(queue, None)
+
+
 class LoggerManager:
     """
     日志管理
     """
     # 管理所有的 Logger
     _loggers: Dict[str, Any] = {}
+    # 每个日志文件的环形缓冲
+    _buffers: Dict[str, LogBufferHandler] = {}
+    # 每个 Logger 的后台写入线程
+    _listeners: Dict[str, QueueListener] = {}
+    # 调用者文件信息缓存，文件路径 -> (文件名称, 插件名称, 是否停止遍历)
+    _caller_cache: Dict[str, Tuple[str, Optional[str], bool]] = {}
     # 默认日志文件名称
     _default_log_file = "moviepilot.log"
     # 线程锁
@@ -117,6 +218,40 @@ class LoggerManager:
                 self._loggers[logfile] = _logger
         return _logger
 
+    @staticmethod
+    def __get_file_info(filename: str) -> Tuple[str, Optional[str], bool]:
+        """
+        解析调用帧所在文件的名称、所属插件以及是否停止向上遍历，结果按文件路径缓存
+        """
+        info = LoggerManager._caller_cache.get(filename)
+        if info:
+            return info
+        parts = Path(filename).parts or (filename,)
+        # 调用者文件名称
+        if parts[-1] == "__init__.py" and len(parts) >= 2:
+            caller_name = parts[-2]
+        else:
+            caller_name = parts[-1]
+        # 调用者插件名称
+        plugin_name = None
+        stop = False
+        if "app" in parts:
+            if "plugins" in parts:
+                plugins_index = parts.index("plugins")
+                if plugins_index + 1 < len(parts):
+                    plugin_candidate = parts[plugins_index + 1]
+                    plugin_name = "plugin" if plugin_candidate == "__init__.py" else plugin_candidate
+                    stop = True
+            if "main.py" in parts:
+                # 已经到达程序的入口，停止遍历
+                stop = True
+        elif len(parts) != 1:
+            # 已经超出程序范围，停止遍历
+            stop = True
+        info = (caller_name, plugin_name, stop)
+        LoggerManager._caller_cache[filename] = info
+        return info
+
     @staticmethod
     def __get_caller():
         """
@@ -135,41 +270,86 @@ class LoggerManager:
             return "log.py", None
 
         while frame:
-            filepath = Path(frame.f_code.co_filename)
-            parts = filepath.parts
+            file_name, file_plugin, stop = LoggerManager.__get_file_info(frame.f_code.co_filename)
             # 设定调用者文件名称
             if not caller_name:
-                if parts[-1] == "__init__.py" and len(parts) >= 2:
-                    caller_name = parts[-2]
-                else:
-                    caller_name = parts[-1]
+                caller_name = file_name
             # 设定调用者插件名称
-            if "app" in parts:
-                if not plugin_name and "plugins" in parts:
-                    try:
-                        plugins_index = parts.index("plugins")
-                        if plugins_index + 1 < len(parts):
-                            plugin_candidate = parts[plugins_index + 1]
-                            if plugin_candidate == "__init__.py":
-                                plugin_name = "plugin"
-                            else:
-                                plugin_name = plugin_candidate
-                            break
-                    except ValueError:
-                        pass
-                if "main.py" in parts:
-                    # 已经到达程序的入口，停止遍历
-                    break
-            elif len(parts) != 1:
-                # 已经超出程序范围，停止遍历
+            if file_plugin:
+                plugin_name = file_plugin
                 break
-            # 获取上一个帧
-            try:
-                frame = frame.f_back
-            except AttributeError:
+            if stop:
                 break
+            # 获取上一个帧
+            frame = frame.f_back
         return caller_name or "log.py", plugin_name
 
+    @staticmethod
+    def __get_buffer(log_file: Union[str, Path]) -> LogBufferHandler:
+        """
+        获取日志文件的环形缓冲，不存在时创建
+        """
+        key = Path(log_file).as_posix()
+        buffer = LoggerManager._buffers.get(key)
+        if not buffer:
+            buffer = LogBufferHandler(maxlen=log_settings.LOG_BUFFER_LINES, log_path=log_settings.LOG_PATH / key)
+            buffer.setFormatter(CustomFormatter(log_settings.LOG_FILE_FORMAT))
+            LoggerManager._buffers[key] = buffer
+        return buffer
+
+    def get_buffer(self, log_file: Union[str, Path]) -> LogBufferHandler:
+        """
+        获取日志文件的环形缓冲，用于读取最近日志和订阅新日志
+        :param log_file: 日志文件相对路径
+        """
+        with LoggerManager._lock:
+            return self.__get_buffer(log_file)
+
+    @staticmethod
+    def iter_lines_reverse(log_path: Path, end: Optional[int] = None,
+                           block_size: int = 64 * 1024) -> Generator[str, None, None]:
+        """
+        从文件末尾按块向前读取，倒序逐行返回，内存占用与文件大小无关
+        :param log_path: 日志文件路径
+        :param end: 读取的结束位置，默认为文件末尾
+        :param block_size: 每次读取的块大小
+        """
+        with open(log_path, "rb") as f:
+            position = f.seek(0, os.SEEK_END) if end is None else min(end, f.seek(0, os.SEEK_END))
+            remainder = b""
+            # 忽略文件末尾的换行
+            skip_empty = True
+            while position > 0:
+                size = min(block_size, position)
+                position -= size
+                f.seek(position)
+                chunk = f.read(size) + remainder
+                lines = chunk.split(b"\n")
+                # 第一行可能不完整，留到下一块拼接
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if skip_empty and not line:
+                        continue
+                    skip_empty = False
+                    yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+            if remainder:
+                yield remainder.rstrip(b"\r").decode("utf-8", errors="replace")
+
+    def tail(self, log_path: Path, lines: int, end: Optional[int] = None) -> List[str]:
+        """
+        读取文件最后若干行，按文件中的顺序返回
+        :param log_path: 日志文件路径
+        :param lines: 行数
+        :param end: 读取的结束位置，默认为文件末尾
+        """
+        result = []
+        for line in self.iter_lines_reverse(log_path, end=end):
+            if len(result) >= lines:
+                break
+            result.append(line)
+        result.reverse()
+        return result
+
     @staticmethod
     def __setup_logger(log_file: str):
         """
@@ -186,14 +366,13 @@ class LoggerManager:
         _logger.setLevel(LoggerManager.__get_log_level())
 
         # 移除已有的 handler，避免重复添加
-        for handler in _logger.handlers:
+        for handler in list(_logger.handlers):
             _logger.removeHandler(handler)
 
         # 终端日志
         console_handler = logging.StreamHandler()
         console_formatter = CustomFormatter(log_settings.LOG_CONSOLE_FORMAT)
         console_handler.setFormatter(console_formatter)
-        _logger.addHandler(console_handler)
 
         # 文件日志
         file_handler = RotatingFileHandler(
@@ -205,7 +384,18 @@ class LoggerManager:
         )
         file_formatter = CustomFormatter(log_settings.LOG_FILE_FORMAT)
         file_handler.setFormatter(file_formatter)
-        _logger.addHandler(file_handler)
+
+        # 日志先写入队列，由后台线程依次输出到终端、文件和内存缓冲，不阻塞调用方
+        queue = SimpleQueue()
+        _logger.addHandler(QueueHandler(queue))
+        listener = QueueListener(queue, console_handler, file_handler, LoggerManager.__get_buffer(log_file),
+                                 respect_handler_level=True)
+        # 停止同名 Logger 的旧写入线程
+        old_listener = LoggerManager._listeners.pop(_logger.name, None)
+        if old_listener:
+            old_listener.stop()
+        listener.start()
+        LoggerManager._listeners[_logger.name] = listener
 
         # 禁止向父级log传递
         _logger.propagate = False
@@ -226,8 +416,10 @@ class LoggerManager:
         更新 Logger 的 handler 配置
         :param _logger: 需要更新的 Logger 实例
         """
-        # 更新现有 handler
-        for handler in _logger.handlers:
+        # 更新现有 handler，包括后台写入线程中的 handler
+        listener = LoggerManager._listeners.get(_logger.name)
+        handlers = list(listener.handlers) if listener else list(_logger.handlers)
+        for handler in handlers:
             try:
                 if isinstance(handler, RotatingFileHandler):
                     # 更新最大文件大小和备份数量
@@ -236,6 +428,10 @@ class LoggerManager:
                     # 更新日志文件输出格式
                     file_formatter = CustomFormatter(log_settings.LOG_FILE_FORMAT)
                     handler.setFormatter(file_formatter)
+                elif isinstance(handler, LogBufferHandler):
+                    # 更新缓冲行数和输出格式
+                    handler.resize(log_settings.LOG_BUFFER_LINES)
+                    handler.setFormatter(CustomFormatter(log_settings.LOG_FILE_FORMAT))
                 elif isinstance(handler, logging.StreamHandler):
                     # 更新控制台输出格式
                     console_formatter = CustomFormatter(log_settings.LOG_CONSOLE_FORMAT)
@@ -258,6 +454,10 @@ class LoggerManager:
         :param method: 日志方法
         :param msg: 日志信息
         """
+        # 低于当前日志级别时直接返回，无需获取调用者
+        level = method_levels.get(method)
+        if level is not None and level < self.__get_log_level():
+            return
         # 获取调用者文件名和插件名
         caller_name, plugin_name = self.__get_caller()
         # 区分插件日志
@@ -278,6 +478,15 @@ class LoggerManager:
             log_method = getattr(_logger, method)
             log_method(f"{caller_name} - {msg}", *args, **kwargs)
 
+    def stop(self):
+        """
+        停止后台写入线程，输出队列中剩余的日志
+        """
+        with LoggerManager._lock:
+            for listener in self._listeners.values():
+                listener.stop()
+            self._listeners.clear()
+
     def info(self, msg: str, *args, **kwargs):
         """
         输出信息级别日志
@@ -320,3 +529,6 @@ log_settings = LogSettings()
 
 # 初始化日志管理
 logger = LoggerManager()
+
+# 退出时输出队列中剩余的日志
+atexit.register(logger.stop)
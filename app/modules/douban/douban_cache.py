@@ -1,15 +1,11 @@
-import pickle
-import random
 import time
-import traceback
-from pathlib import Path
 from threading import RLock
-from typing import Optional
+from typing import Optional, Set
 
 from app.core.config import settings
 from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
-from app.log import logger
+from app.helper.metacache import MetaCacheHelper
 from app.utils.singleton import WeakSingleton
 from app.schemas.types import MediaType
 
@@ -32,9 +28,21 @@ class DoubanCache(metaclass=WeakSingleton):
     # TMDB缓存过期
     _tmdb_cache_expire: bool = True
 
+    # 缓存命名空间
+    _namespace: str = "douban"
+
     def __init__(self):
-        self._meta_path = settings.TEMP_PATH / "__douban_cache__"
-        self._meta_data = self.__load(self._meta_path)
+        self._store = MetaCacheHelper()
+        # 导入旧版整文件缓存
+        self._store.import_legacy(self._namespace, settings.TEMP_PATH / "__douban_cache__",
+                                  expire_key=CACHE_EXPIRE_TIMESTAMP_STR)
+        # 已读取的缓存，按需从磁盘加载
+        self._meta_data: dict = {}
+        # 磁盘中不存在的KEY
+        self._absent: Set[str] = set()
+        # 待写入和待删除的KEY
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
 
     def clear(self):
         """
@@ -42,6 +50,10 @@ class DoubanCache(metaclass=WeakSingleton):
         """
         with lock:
             self._meta_data = {}
+            self._absent.clear()
+            self._dirty.clear()
+            self._deleted.clear()
+            self._store.clear(self._namespace)
 
     @staticmethod
     def __get_key(meta: MetaBase) -> str:
@@ -51,18 +63,43 @@ class DoubanCache(metaclass=WeakSingleton):
         return f"[{meta.type.value if meta.type else '未知'}]" \
                f"{meta.doubanid or meta.name}-{meta.year}-{meta.begin_season}"
 
+    def __get_info(self, key: str) -> Optional[dict]:
+        """
+        获取缓存内容，内存中没有时从磁盘加载
+        """
+        with lock:
+            info = self._meta_data.get(key)
+            if info is not None or key in self._absent or key in self._deleted:
+                return info
+            info = self._store.get(self._namespace, key)
+            if info is None:
+                self._absent.add(key)
+            else:
+                self._meta_data[key] = info
+            return info
+
+    def __set_info(self, key: str, info: dict):
+        """
+        设置缓存内容并标记待写入
+        """
+        with lock:
+            self._meta_data[key] = info
+            self._absent.discard(key)
+            self._deleted.discard(key)
+            self._dirty.add(key)
+
     def get(self, meta: MetaBase):
         """
         根据KEY值获取缓存值
         """
         key = self.__get_key(meta)
         with lock:
-            info: dict = self._meta_data.get(key)
+            info: dict = self.__get_info(key)
             if info:
                 expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
                 if not expire or int(time.time()) < expire:
                     info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = info
+                    self.__set_info(key, info)
                 elif expire and self._tmdb_cache_expire:
                     self.delete(key)
             return info or {}
@@ -74,25 +111,33 @@ class DoubanCache(metaclass=WeakSingleton):
         @return: 被删除的缓存内容
         """
         with lock:
-            return self._meta_data.pop(key, {})
+            info = self.__get_info(key)
+            self._meta_data.pop(key, None)
+            self._dirty.discard(key)
+            self._deleted.add(key)
+            return info or {}
 
     def delete_by_doubanid(self, doubanid: str) -> None:
         """
         清空对应豆瓣ID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if self._meta_data.get(key, {}).get("id") == doubanid:
-                with lock:
+        with lock:
+            for key in list(self._meta_data):
+                if self._meta_data.get(key, {}).get("id") == doubanid:
                     self._meta_data.pop(key)
+                    self._dirty.discard(key)
+            self._absent.clear()
+            self._store.delete_by_media_id(self._namespace, doubanid)
 
     def delete_unknown(self) -> None:
         """
-        清除未识别的缓存记录，以便重新搜索TMDB
+        清除未识别的缓存记录，以便重新搜索TMDB，未识别的记录不会写入磁盘
         """
-        for key in list(self._meta_data):
-            if self._meta_data.get(key, {}).get("id") == "0":
-                with lock:
+        with lock:
+            for key in list(self._meta_data):
+                if self._meta_data.get(key, {}).get("id") == "0":
                     self._meta_data.pop(key)
+                    self._dirty.discard(key)
 
     def modify(self, key: str, title: str) -> dict:
         """
@@ -102,25 +147,12 @@ class DoubanCache(metaclass=WeakSingleton):
         @return: 被修改后缓存内容
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
-
-    @staticmethod
-    def __load(path: Path) -> dict:
-        """
-        从文件中加载缓存
-        """
-        try:
-            if path.exists():
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            logger.error(f"加载缓存失败: {str(e)} - {traceback.format_exc()}")
-            return {}
+            info = self.__get_info(key)
+            if info:
+                info['title'] = title
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self.__set_info(key, info)
+            return info
 
     def update(self, meta: MetaBase, info: dict) -> None:
         """
@@ -150,74 +182,38 @@ class DoubanCache(metaclass=WeakSingleton):
                 if not poster_path and info.get("cover"):
                     poster_path = info.get("cover").get("url")
 
-                self._meta_data[self.__get_key(meta)] = {
+                self.__set_info(self.__get_key(meta), {
                         "id": info.get("id"),
                         "type": mtype,
                         "year": cache_year,
                         "title": cache_title,
                         "poster_path": poster_path,
                         CACHE_EXPIRE_TIMESTAMP_STR: int(time.time()) + EXPIRE_TIMESTAMP
-                    }
+                    })
             elif info is not None:
                 # None时不缓存，此时代表网络错误，允许重复请求
-                self._meta_data[self.__get_key(meta)] = {'id': "0"}
+                self.__set_info(self.__get_key(meta), {'id': "0"})
 
     def save(self, force: Optional[bool] = False) -> None:
         """
-        保存缓存数据到文件
-        """
-
-        meta_data = self.__load(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if v.get("id")}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL) # noqa
-
-    def _random_sample(self, new_meta_data: dict) -> bool:
-        """
-        采样分析是否需要保存
+        将变化的缓存条目写入磁盘，未识别的记录不写入
         """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(sorted(new_meta_data.keys()), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            dirty = {key: dict(self._meta_data[key]) for key in self._dirty
+                     if self._meta_data.get(key, {}).get("id")}
+            deleted = list(self._deleted) + [key for key in self._dirty if key not in dirty]
+            self._dirty.clear()
+            self._deleted.clear()
+        self._store.upsert(self._namespace, dirty, expire_key=CACHE_EXPIRE_TIMESTAMP_STR)
+        self._store.delete(self._namespace, deleted)
+        if self._tmdb_cache_expire:
+            self._store.delete_expired(self._namespace)
 
     def get_title(self, key: str) -> Optional[str]:
         """
         获取缓存的标题
         """
-        cache_media_info = self._meta_data.get(key)
+        cache_media_info = self.__get_info(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -226,10 +222,12 @@ class DoubanCache(metaclass=WeakSingleton):
         """
         重新设置缓存标题
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            cache_media_info = self.__get_info(key)
+            if not cache_media_info:
+                return
+            cache_media_info['title'] = cn_title
+            self.__set_info(key, cache_media_info)
 
     def __del__(self):
         self.save()
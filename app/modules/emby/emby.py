@@ -1,7 +1,7 @@
 import json
 import re
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional, Union, Dict, Generator, Tuple, Any
 
@@ -709,6 +709,50 @@ class Emby:
         except Exception as e:
             logger.error(f"连接Users/Items出错：" + str(e))
 
+    def get_changed_items(self, parent: Union[str, int],
+                          since: datetime) -> Optional[List[schemas.MediaServerItem]]:
+        """
+        获取媒体库中指定时间后有变化的电影和电视剧，季或集有变化时返回所属的电视剧
+
+        :param parent: 媒体库ID
+        :param since: 起始时间
+        :return: 有变化的项目列表，查询失败时返回 None
+        """
+        if not parent or not self._host or not self._apikey:
+            return None
+        url = f"{self._host}emby/Users/{self.user}/Items"
+        params = {
+            "ParentId": parent,
+            "api_key": self._apikey,
+            "Recursive": "true",
+            "IncludeItemTypes": "Movie,Series,Season,Episode",
+            "MinDateLastSaved": since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "Fields": "ProviderIds,OriginalTitle,ProductionYear,Path,UserDataPlayCount,UserDataLastPlayedDate,ParentId,SeriesId",
+        }
+        try:
+            res = RequestUtils().get_res(url, params)
+            if not res or res.status_code != 200:
+                return None
+            changed_items = []
+            # 季或集有变化的电视剧
+            series_ids = set()
+            for item in res.json().get("Items") or []:
+                if not item:
+                    continue
+                if item.get("Type") in ["Movie", "Series"]:
+                    changed_items.append(self.__format_item_info(item))
+                elif item.get("SeriesId"):
+                    series_ids.add(item.get("SeriesId"))
+            series_ids -= {item.item_id for item in changed_items if item}
+            for series_id in series_ids:
+                iteminfo = self.get_iteminfo(series_id)
+                if iteminfo:
+                    changed_items.append(iteminfo)
+            return [item for item in changed_items if item]
+        except Exception as e:
+            logger.error(f"连接Users/Items出错：" + str(e))
+        return None
+
     def get_webhook_message(self, form: any, args: dict) -> Optional[schemas.WebhookEventInfo]:
         """
         解析Emby Webhook报文
@@ -1,13 +1,16 @@
 import re
-from typing import List, Tuple, Union, Dict, Optional
+import threading
+from typing import List, Tuple, Union, Dict, Optional, Any
 
+from app import schemas
 from app.core.context import TorrentInfo, MediaInfo
+from app.core.event import eventmanager, Event
 from app.core.metainfo import MetaInfo
 from app.helper.rule import RuleHelper
 from app.log import logger
 from app.modules import _ModuleBase
 from app.modules.filter.RuleParser import RuleParser
-from app.schemas.types import ModuleType, OtherModulesType
+from app.schemas.types import ModuleType, OtherModulesType, EventType, SystemConfigKey
 from app.utils.string import StringUtils
 
 
@@ -142,19 +145,218 @@ class FilterModule(_ModuleBase):
     def __init__(self):
         super().__init__()
         self.rulehelper = RuleHelper()
+        self._lock = threading.Lock()
+        # 编译规则时的用户自定义规则
+        self._custom_rules: Optional[List[schemas.CustomRule]] = None
+        # 编译后的规则项
+        self._compiled_rules: Dict[str, dict] = {}
+        # 规则组字符串解析后的多级规则树
+        self._parsed_groups: Dict[str, List[Any]] = {}
 
     def init_module(self) -> None:
         self.parser = RuleParser()
         self.__init_custom_rules()
 
-    def __init_custom_rules(self):
+    @eventmanager.register(EventType.ConfigChanged)
+    def handle_config_changed(self, event: Event):
         """
-        加载用户自定义规则，如跟内置规则冲突，以用户自定义规则为准
+        处理配置变更事件，规则配置变化时重新编译规则
+        :param event: 事件对象
         """
-        custom_rules = self.rulehelper.get_custom_rules()
+        if not event:
+            return
+        event_data: schemas.ConfigChangeEventData = event.event_data
+        if event_data.key not in [SystemConfigKey.CustomFilterRules.value,
+                                  SystemConfigKey.UserFilterRuleGroups.value]:
+            return
+        logger.info("配置变更，重新加载过滤规则...")
+        self.__init_custom_rules()
+
+    def __init_custom_rules(self, custom_rules: List[schemas.CustomRule] = None):
+        """
+        加载用户自定义规则，如跟内置规则冲突，以用户自定义规则为准，并编译所有规则
+        :param custom_rules: 已读取的用户自定义规则，为空时从系统配置读取
+        """
+        rule_set = dict(self.rule_set)
+        if custom_rules is None:
+            custom_rules = self.rulehelper.get_custom_rules()
         for rule in custom_rules:
             logger.info(f"加载自定义规则 {rule.id} - {rule.name}")
-            self.rule_set[rule.id] = rule.dict()
+            rule_set[rule.id] = rule.dict()
+        compiled_rules = {rule_id: self.__compile_rule(rule_id, rule)
+                          for rule_id, rule in rule_set.items() if rule}
+        with self._lock:
+            self._custom_rules = custom_rules
+            self._compiled_rules = compiled_rules
+            self._parsed_groups = {}
+
+    @staticmethod
+    def __compile_patterns(rule_id: str, patterns: Union[list, str, None]) -> List[re.Pattern]:
+        """
+        将包含/排除规则项编译为不区分大小写的正则，能合并时合并为一个正则
+        """
+        if not patterns:
+            return []
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        patterns = [str(pattern) for pattern in patterns]
+        # 去掉开头的忽略大小写标记，统一以 IGNORECASE 编译
+        sources = [pattern[4:] if pattern.startswith("(?i)") else pattern for pattern in patterns]
+        # 含有全局标记或反向引用的正则无法安全合并
+        if not any(re.search(r"\(\?[aiLmsux-]+\)|\\[1-9]|\(\?P=", source) for source in sources):
+            try:
+                return [re.compile("|".join(f"(?:{source})" for source in sources), re.IGNORECASE)]
+            except re.error:
+                pass
+        compiled = []
+        for pattern in patterns:
+            try:
+                compiled.append(re.compile(pattern, re.IGNORECASE))
+            except re.error as err:
+                logger.error(f"规则 {rule_id} 的正则 {pattern} 无效：{str(err)}")
+        return compiled
+
+    def __compile_rule(self, rule_id: str, rule: dict) -> dict:
+        """
+        编译规则项
+        """
+        size_range: str = rule.get("size_range")
+        size_bounds = None
+        if size_range:
+            try:
+                size_bounds = self.__parse_size_range(size_range)
+            except ValueError:
+                logger.error(f"规则 {rule_id} 的大小范围 {size_range} 无效")
+        pubdate: str = rule.get("publish_time")
+        pub_times = None
+        if pubdate:
+            try:
+                pub_times = [float(t) for t in pubdate.split("-")]
+            except ValueError:
+                logger.error(f"规则 {rule_id} 的发布时间 {pubdate} 无效")
+        return {
+            # TMDB规则
+            "tmdb": rule.get("tmdb"),
+            # 只匹配指定关键字
+            "match": rule.get("match") or [],
+            # 包含规则项
+            "include": self.__compile_patterns(rule_id, rule.get("include")),
+            # 排除规则项
+            "exclude": self.__compile_patterns(rule_id, rule.get("exclude")),
+            # 大小范围规则项
+            "size_range": size_range,
+            "size_bounds": size_bounds,
+            # 做种人数规则项
+            "seeders": rule.get("seeders"),
+            # FREE规则
+            "downloadvolumefactor": rule.get("downloadvolumefactor"),
+            # 发布时间规则
+            "publish_time": pubdate,
+            "pub_times": pub_times
+        }
+
+    def __compile_group(self, rule_group: Union[list, str]) -> Optional[tuple]:
+        """
+        将解析结果转换为可直接求值的规则树
+        """
+        if not isinstance(rule_group, list):
+            # 不是列表，说明是规则名称
+            return "rule", rule_group
+        elif len(rule_group) == 1:
+            # 只有一个规则项
+            return self.__compile_group(rule_group[0])
+        elif rule_group[0] == "not":
+            # 非操作
+            return "not", self.__compile_group(rule_group[1:])
+        elif rule_group[1] in ["and", "or"]:
+            # 与、或操作
+            return rule_group[1], self.__compile_group(rule_group[0]), self.__compile_group(rule_group[2:])
+        return None
+
+    def __get_rule_levels(self, rule_str: str) -> List[Optional[tuple]]:
+        """
+        获取规则组字符串对应的多级规则树，解析结果会被缓存
+        """
+        levels = self._parsed_groups.get(rule_str)
+        if levels is None:
+            levels = [self.__compile_group(self.parser.parse(rule_group.strip()).as_list()[0])
+                      for rule_group in rule_str.split('>')]
+            with self._lock:
+                self._parsed_groups[rule_str] = levels
+        return levels
+
+    def __get_rule_names(self, rule_tree: Optional[tuple], rule_names: set):
+        """
+        收集规则树中引用的所有规则项名称
+        """
+        if not rule_tree:
+            return
+        if rule_tree[0] == "rule":
+            rule_names.add(rule_tree[1])
+        else:
+            for child in rule_tree[1:]:
+                self.__get_rule_names(child, rule_names)
+
+    def __batch_rule_results(self, rule_str: str, torrent_list: List[TorrentInfo]) -> List[Dict[str, bool]]:
+        """
+        对整批种子按列计算含大小、做种数、促销、发布时间等数值条件的规则项，返回每个种子已确定的规则结果
+        """
+        results: List[Dict[str, bool]] = [{} for _ in torrent_list]
+        rule_names = set()
+        for rule_tree in self.__get_rule_levels(rule_str):
+            self.__get_rule_names(rule_tree, rule_names)
+        # 按需计算的数值列，只计算仍需判断的种子
+        columns: Dict[str, list] = {}
+
+        def __column(name: str, getter, mask: List[bool]) -> list:
+            column = columns.setdefault(name, [None] * len(torrent_list))
+            for i, torrent in enumerate(torrent_list):
+                if mask[i] and column[i] is None:
+                    column[i] = getter(torrent)
+            return column
+
+        for rule_name in rule_names:
+            rule = self._compiled_rules.get(rule_name)
+            if not rule:
+                continue
+            size_range = rule.get("size_range")
+            seeders = rule.get("seeders")
+            downloadvolumefactor = rule.get("downloadvolumefactor")
+            pub_times = rule.get("publish_time") and rule.get("pub_times")
+            if not size_range and not seeders and downloadvolumefactor is None and not pub_times:
+                continue
+            # 符合TMDB规则的直接返回True，与种子无关
+            tmdb = rule.get("tmdb")
+            if tmdb and self.__match_tmdb(tmdb):
+                for result in results:
+                    result[rule_name] = True
+                continue
+            # 先按数值列过滤，正则的包含、排除项只匹配剩余的种子
+            mask = [True] * len(torrent_list)
+            if seeders:
+                min_seeders = int(seeders)
+                column = __column("seeders", lambda t: t.seeders, mask)
+                mask = [m and column[i] >= min_seeders for i, m in enumerate(mask)]
+            if downloadvolumefactor is not None:
+                column = __column("downloadvolumefactor", lambda t: t.downloadvolumefactor, mask)
+                mask = [m and column[i] == downloadvolumefactor for i, m in enumerate(mask)]
+            if pub_times:
+                column = __column("pub_minutes", lambda t: t.pub_minutes(), mask)
+                if len(pub_times) == 1:
+                    mask = [m and column[i] >= pub_times[0] for i, m in enumerate(mask)]
+                else:
+                    mask = [m and pub_times[0] <= column[i] <= pub_times[1] for i, m in enumerate(mask)]
+            if rule.get("include") or rule.get("exclude"):
+                mask = [m and self.__match_content(torrent, rule_name, rule)
+                        for m, torrent in zip(mask, torrent_list)]
+            if size_range:
+                # 每集大小需要识别集数，放在最后只计算其它条件已满足的种子
+                size_bounds = rule.get("size_bounds")
+                column = __column("episode_size", self.__episode_size, mask)
+                mask = [m and self.__match_size_bounds(column[i], size_bounds) for i, m in enumerate(mask)]
+            for result, passed in zip(results, mask):
+                result[rule_name] = passed
+        return results
 
     @staticmethod
     def get_name() -> str:
@@ -202,9 +404,11 @@ class FilterModule(_ModuleBase):
         """
         if not rule_groups:
             return torrent_list
+        # 自定义规则与编译时不一致时重新编译，保存配置后即时生效
+        custom_rules = self.rulehelper.get_custom_rules()
+        if custom_rules != self._custom_rules:
+            self.__init_custom_rules(custom_rules)
         self.media = mediainfo
-        # 重新加载自定义规则
-        self.__init_custom_rules()
         # 查询规则表详情
         groups = self.rulehelper.get_rule_group_by_media(media=mediainfo, group_names=rule_groups)
         if groups:
@@ -224,9 +428,11 @@ class FilterModule(_ModuleBase):
         """
         # 返回种子列表
         ret_torrents = []
-        for torrent in torrent_list:
+        # 批量计算数值规则项
+        batch_results = self.__batch_rule_results(rule_string, torrent_list)
+        for torrent, rule_results in zip(torrent_list, batch_results):
             # 能命中优先级的才返回
-            if not self.__get_order(torrent, rule_string):
+            if not self.__get_order(torrent, rule_string, rule_results):
                 logger.debug(f"种子 {torrent.site_name} - {torrent.title} {torrent.description} "
                              f"不匹配 {rule_name} 过滤规则")
                 continue
@@ -234,21 +440,21 @@ class FilterModule(_ModuleBase):
 
         return ret_torrents
 
-    def __get_order(self, torrent: TorrentInfo, rule_str: str) -> Optional[TorrentInfo]:
+    def __get_order(self, torrent: TorrentInfo, rule_str: str,
+                    rule_results: Optional[Dict[str, bool]] = None) -> Optional[TorrentInfo]:
         """
         获取种子匹配的规则优先级，值越大越优先，未匹配时返回None
+        :param rule_results: 已确定的规则项结果，同一种子在多级规则中重复出现的规则项只匹配一次
         """
-        # 多级规则
-        rule_groups = rule_str.split('>')
         # 优先级
         res_order = 100
         # 是否匹配
         matched = False
+        if rule_results is None:
+            rule_results = {}
 
-        for rule_group in rule_groups:
-            # 解析规则组
-            parsed_group = self.parser.parse(rule_group.strip())
-            if self.__match_group(torrent, parsed_group.as_list()[0]):
+        for rule_tree in self.__get_rule_levels(rule_str):
+            if self.__match_group(torrent, rule_tree, rule_results):
                 # 出现匹配时中断
                 matched = True
                 logger.debug(f"种子 {torrent.site_name} - {torrent.title} 优先级为 {100 - res_order + 1}")
@@ -259,85 +465,57 @@ class FilterModule(_ModuleBase):
 
         return None if not matched else torrent
 
-    def __match_group(self, torrent: TorrentInfo, rule_group: Union[list, str]) -> Optional[bool]:
+    def __match_group(self, torrent: TorrentInfo, rule_tree: Optional[tuple],
+                      rule_results: Dict[str, bool]) -> Optional[bool]:
         """
-        判断种子是否匹配规则组
+        判断种子是否匹配规则树
         """
-        if not isinstance(rule_group, list):
-            # 不是列表，说明是规则名称
-            return self.__match_rule(torrent, rule_group)
-        elif isinstance(rule_group, list) and len(rule_group) == 1:
-            # 只有一个规则项
-            return self.__match_group(torrent, rule_group[0])
-        elif rule_group[0] == "not":
-            # 非操作
-            return not self.__match_group(torrent, rule_group[1:])
-        elif rule_group[1] == "and":
-            # 与操作
-            return self.__match_group(torrent, rule_group[0]) and self.__match_group(torrent, rule_group[2:])
-        elif rule_group[1] == "or":
-            # 或操作
-            return self.__match_group(torrent, rule_group[0]) or self.__match_group(torrent, rule_group[2:])
+        if not rule_tree:
+            return None
+        operator = rule_tree[0]
+        if operator == "rule":
+            rule_name = rule_tree[1]
+            if rule_name not in rule_results:
+                rule_results[rule_name] = self.__match_rule(torrent, rule_name)
+            return rule_results[rule_name]
+        elif operator == "not":
+            return not self.__match_group(torrent, rule_tree[1], rule_results)
+        elif operator == "and":
+            return self.__match_group(torrent, rule_tree[1], rule_results) \
+                and self.__match_group(torrent, rule_tree[2], rule_results)
+        elif operator == "or":
+            return self.__match_group(torrent, rule_tree[1], rule_results) \
+                or self.__match_group(torrent, rule_tree[2], rule_results)
+        return None
 
     def __match_rule(self, torrent: TorrentInfo, rule_name: str) -> bool:
         """
         判断种子是否匹配规则项
         """
-        if not self.rule_set.get(rule_name):
+        rule = self._compiled_rules.get(rule_name)
+        if not rule:
             # 规则不存在
             logger.debug(f"规则 {rule_name} 不存在")
             return False
         # TMDB规则
-        tmdb = self.rule_set[rule_name].get("tmdb")
+        tmdb = rule.get("tmdb")
         # 符合TMDB规则的直接返回True，即不过滤
         if tmdb and self.__match_tmdb(tmdb):
             logger.debug(f"种子 {torrent.site_name} - {torrent.title} 符合 {rule_name} 的TMDB规则，匹配成功")
             return True
-        # 匹配项：标题、副标题、标签
-        content = f"{torrent.title} {torrent.description} {' '.join(torrent.labels or [])}"
-        # 只匹配指定关键字
-        match_content = []
-        matchs = self.rule_set[rule_name].get("match") or []
-        if matchs:
-            for match in matchs:
-                if not hasattr(torrent, match):
-                    continue
-                match_value = getattr(torrent, match)
-                if not match_value:
-                    continue
-                if isinstance(match_value, list):
-                    match_content.extend(match_value)
-                else:
-                    match_content.append(match_value)
-        if match_content:
-            content = " ".join(match_content)
-        # 包含规则项
-        includes = self.rule_set[rule_name].get("include") or []
-        if not isinstance(includes, list):
-            includes = [includes]
-        # 排除规则项
-        excludes = self.rule_set[rule_name].get("exclude") or []
-        if not isinstance(excludes, list):
-            excludes = [excludes]
+        if not self.__match_content(torrent, rule_name, rule):
+            return False
         # 大小范围规则项
-        size_range = self.rule_set[rule_name].get("size_range")
+        size_range = rule.get("size_range")
         # 做种人数规则项
-        seeders = self.rule_set[rule_name].get("seeders")
+        seeders = rule.get("seeders")
         # FREE规则
-        downloadvolumefactor = self.rule_set[rule_name].get("downloadvolumefactor")
+        downloadvolumefactor = rule.get("downloadvolumefactor")
         # 发布时间规则
-        pubdate: str = self.rule_set[rule_name].get("publish_time")
-        if includes and not any(re.search(r"%s" % include, content, re.IGNORECASE) for include in includes):
-            # 未发现任何包含项
-            logger.debug(f"种子 {torrent.site_name} - {torrent.title} 不包含任何项 {includes}")
-            return False
-        for exclude in excludes:
-            if re.search(r"%s" % exclude, content, re.IGNORECASE):
-                # 发现排除项
-                logger.debug(f"种子 {torrent.site_name} - {torrent.title} 包含 {exclude}")
-                return False
+        pubdate: str = rule.get("publish_time")
+        pub_times: Optional[List[float]] = rule.get("pub_times")
         if size_range:
-            if not self.__match_size(torrent, size_range):
+            if not self.__match_size_bounds(self.__episode_size(torrent), rule.get("size_bounds")):
                 # 大小范围不匹配
                 logger.debug(f"种子 {torrent.site_name} - {torrent.title} 大小 "
                              f"{StringUtils.str_filesize(torrent.size)} 不在范围 {size_range}MB")
@@ -353,11 +531,9 @@ class FilterModule(_ModuleBase):
                 logger.debug(
                     f"种子 {torrent.site_name} - {torrent.title} FREE值 {torrent.downloadvolumefactor} 不是 {downloadvolumefactor}")
                 return False
-        if pubdate:
+        if pubdate and pub_times:
             # 种子发布时间
             pub_minutes = torrent.pub_minutes()
-            # 发布时间规则
-            pub_times = [float(t) for t in pubdate.split("-")]
             if len(pub_times) == 1:
                 # 发布时间小于规则
                 if pub_minutes < pub_times[0]:
@@ -371,6 +547,46 @@ class FilterModule(_ModuleBase):
 
         return True
 
+    @staticmethod
+    def __match_content(torrent: TorrentInfo, rule_name: str, rule: dict) -> bool:
+        """
+        判断种子标题、副标题、标签等内容是否匹配规则项的包含、排除项
+        """
+        # 匹配项：标题、副标题、标签
+        content = f"{torrent.title} {torrent.description} {' '.join(torrent.labels or [])}"
+        # 只匹配指定关键字
+        match_content = []
+        matchs = rule.get("match")
+        if matchs:
+            for match in matchs:
+                if not hasattr(torrent, match):
+                    continue
+                match_value = getattr(torrent, match)
+                if not match_value:
+                    continue
+                if isinstance(match_value, list):
+                    match_content.extend(match_value)
+                else:
+                    match_content.append(match_value)
+        if match_content:
+            content = " ".join(match_content)
+        # 包含规则项
+        includes = rule.get("include")
+        # 排除规则项
+        excludes = rule.get("exclude")
+        if includes and not any(include.search(content) for include in includes):
+            # 未发现任何包含项
+            logger.debug(f"种子 {torrent.site_name} - {torrent.title} 不包含 {rule_name} 的任何项")
+            return False
+        for exclude in excludes:
+            exclude_match = exclude.search(content)
+            if exclude_match:
+                # 发现排除项
+                logger.debug(f"种子 {torrent.site_name} - {torrent.title} 包含 {rule_name} 的排除项 "
+                             f"{exclude_match.group(0)}")
+                return False
+        return True
+
     def __match_tmdb(self, tmdb: dict) -> bool:
         """
         判断种子是否匹配TMDB规则
@@ -414,34 +630,38 @@ class FilterModule(_ModuleBase):
         return True
 
     @staticmethod
-    def __match_size(torrent: TorrentInfo, size_range: str) -> bool:
+    def __episode_size(torrent: TorrentInfo) -> float:
         """
-        判断种子是否匹配大小范围（MB），剧集拆分为每集大小
+        种子每集大小，剧集拆分为每集大小
         """
-        if not size_range:
-            return True
         # 集数
         meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
         episode_count = meta.total_episode or 1
-        # 每集大小
-        torrent_size = torrent.size / episode_count
-        # 大小范围
+        return torrent.size / episode_count
+
+    @staticmethod
+    def __parse_size_range(size_range: str) -> Optional[Tuple[float, float]]:
+        """
+        解析大小范围（MB），返回字节数上下限，格式无法识别时返回None
+        """
         size_range = size_range.strip()
         if size_range.find("-") != -1:
             # 区间
             size_min, size_max = size_range.split("-")
-            size_min = float(size_min.strip()) * 1024 * 1024
-            size_max = float(size_max.strip()) * 1024 * 1024
-            if size_min <= torrent_size <= size_max:
-                return True
+            return float(size_min.strip()) * 1024 * 1024, float(size_max.strip()) * 1024 * 1024
         elif size_range.startswith(">"):
             # 大于
-            size_min = float(size_range[1:].strip()) * 1024 * 1024
-            if torrent_size >= size_min:
-                return True
+            return float(size_range[1:].strip()) * 1024 * 1024, float("inf")
         elif size_range.startswith("<"):
             # 小于
-            size_max = float(size_range[1:].strip()) * 1024 * 1024
-            if torrent_size <= size_max:
-                return True
-        return False
+            return float("-inf"), float(size_range[1:].strip()) * 1024 * 1024
+        return None
+
+    @staticmethod
+    def __match_size_bounds(torrent_size: float, size_bounds: Optional[Tuple[float, float]]) -> bool:
+        """
+        判断大小是否在范围内
+        """
+        if not size_bounds:
+            return False
+        return size_bounds[0] <= torrent_size <= size_bounds[1]
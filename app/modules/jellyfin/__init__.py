@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Any, Generator, List, Optional, Tuple, Union
 
 from app import schemas
@@ -256,6 +257,21 @@ class JellyfinModule(_ModuleBase, _MediaServerBase[Jellyfin]):
             return server_obj.get_items(library_id, start_index, limit)
         return None
 
+    def mediaserver_changed_items(self, server: str, library_id: Union[str, int],
+                                  since: datetime) -> Optional[List[schemas.MediaServerItem]]:
+        """
+        获取媒体库中指定时间后有变化的项目，用于增量同步
+
+        :param server: 媒体服务器名称
+        :param library_id: 媒体库ID
+        :param since: 起始时间
+        :return: 有变化的项目列表，查询失败时返回 None
+        """
+        server_obj: Jellyfin = self.get_instance(server)
+        if server_obj:
+            return server_obj.get_changed_items(library_id, since)
+        return None
+
     def mediaserver_iteminfo(self, server: str, item_id: str) -> Optional[schemas.MediaServerItem]:
         """
         媒体库项目详情
@@ -1,4 +1,5 @@
 import json
+from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple, Generator, Any, Union
 from urllib.parse import quote_plus
@@ -542,6 +543,38 @@ class Plex:
         except Exception as err:
             logger.error(f"获取媒体库列表出错：{str(err)}")
 
+    def get_changed_items(self, parent: Union[str, int],
+                          since: datetime) -> Optional[List[schemas.MediaServerItem]]:
+        """
+        获取媒体库中指定时间后有变化的电影和电视剧，集有变化时返回所属的电视剧
+
+        :param parent: 媒体库ID
+        :param since: 起始时间
+        :return: 有变化的项目列表，查询失败时返回 None
+        """
+        if not parent or not self._plex:
+            return None
+        try:
+            section = self._plex.library.sectionByID(int(parent))
+            if not section:
+                return None
+            changed = {item.ratingKey: item for item in section.search(filters={"updatedAt>>": since})}
+            if section.type == "show":
+                # 集有变化的电视剧
+                for episode in section.search(libtype="episode", filters={"updatedAt>>": since}):
+                    if episode.grandparentRatingKey not in changed:
+                        changed[episode.grandparentRatingKey] = self.__fetch_item(episode.grandparentRatingKey)
+            changed_items = []
+            for item in changed.values():
+                try:
+                    changed_items.append(self.__build_media_server_item(item))
+                except Exception as e:
+                    logger.error(f"处理媒体项目时出错：{str(e)}, 跳过此项目")
+            return [item for item in changed_items if item]
+        except Exception as err:
+            logger.error(f"获取媒体库变化项目出错：{str(err)}")
+        return None
+
     def get_webhook_message(self, form: any) -> Optional[schemas.WebhookEventInfo]:
         """
         解析Plex报文
@@ -95,6 +95,9 @@ class Scheduler(metaclass=Singleton):
                     "name": "同步媒体服务器",
                     "func": MediaServerChain().sync,
                     "running": False,
+                    "kwargs": {
+                        "incremental": True
+                    }
                 },
                 "subscribe_tmdb": {
                     "name": "订阅元数据更新",
@@ -161,6 +161,8 @@ class SystemConfigKey(Enum):
     NotificationTemplates = "NotificationTemplates"
     # 刮削开关设置
     ScrapingSwitchs = "ScrapingSwitchs"
+    # 媒体服务器同步状态
+    MediaServerSyncState = "MediaServerSyncState"
 
 
 # 处理进度Key字典
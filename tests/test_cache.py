@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from typing import List, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+import app.core.cache
+from app.core.cache import CacheToolsBackend, cached
+
+
+class CachedTest(TestCase):
+    """
+    缓存装饰器，使用独立的进程内缓存后端
+    """
+
+    def setUp(self) -> None:
+        patcher = patch.object(app.core.cache, "cache_backend", CacheToolsBackend(maxsize=64, ttl=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 函数开始执行和允许结束的信号
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __blocking(self, result=None, error: Exception = None):
+        """
+        执行后等待放行的函数，记录执行次数，未指定结果时返回第几次执行
+        """
+        self.calls += 1
+        call = self.calls
+        self.started.set()
+        self.assertTrue(self.release.wait(5))
+        if error:
+            raise error
+        return result if result is not None else call
+
+    @staticmethod
+    def __run_threads(func, count: int) -> Tuple[List[threading.Thread], list]:
+        """
+        在多个线程中调用函数，返回各线程的结果或异常
+        """
+        results = [None] * count
+
+        def run(index: int):
+            try:
+                results[index] = func()
+            except Exception as err:
+                results[index] = err
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_followers_share_leader_result(self):
+        @cached(region="test_single_flight", ttl=60)
+        def load(name: str):
+            return self.__blocking(result={"name": name})
+
+        leader, leader_results = self.__run_threads(lambda: load("a"), 1)
+        self.assertTrue(self.started.wait(5))
+        followers, results = self.__run_threads(lambda: load("a"), 5)
+        # 等待方均进入等待后放行
+        time.sleep(0.2)
+        self.release.set()
+        for thread in leader + followers:
+            thread.join(5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(leader_results + results, [{"name": "a"}] * 6)
+        # 结果已写入缓存
+        self.assertEqual(load("a"), {"name": "a"})
+        self.assertEqual(self.calls, 1)
+
+    def test_followers_receive_leader_error(self):
+        @cached(region="test_single_flight_error", ttl=60)
+        def load(name: str):
+            return self.__blocking(error=ValueError(name))
+
+        leader, leader_results = self.__run_threads(lambda: load("a"), 1)
+        self.assertTrue(self.started.wait(5))
+        followers, results = self.__run_threads(lambda: load("a"), 3)
+        time.sleep(0.2)
+        self.release.set()
+        for thread in leader + followers:
+            thread.join(5)
+        self.assertEqual(self.calls, 1)
+        for result in leader_results + results:
+            self.assertIsInstance(result, ValueError)
+        # 异常不缓存，再次调用重新执行
+        with self.assertRaises(ValueError):
+            load("a")
+        self.assertEqual(self.calls, 2)
+
+    def test_flight_timeout_fallback(self):
+        @cached(region="test_single_flight_timeout", ttl=60, flight_timeout=1)
+        def load(name: str):
+            return self.__blocking()
+
+        leader, leader_results = self.__run_threads(lambda: load("a"), 1)
+        self.assertTrue(self.started.wait(5))
+        # 等待超时后自行执行，此时放行以免阻塞
+        threading.Timer(1.5, self.release.set).start()
+        start = time.monotonic()
+        self.assertEqual(load("a"), 2)
+        self.assertGreaterEqual(time.monotonic() - start, 1)
+        leader[0].join(5)
+        self.assertEqual(leader_results, [1])
+        self.assertEqual(self.calls, 2)
+
+    def test_same_thread_recursion(self):
+        depth = []
+
+        @cached(region="test_single_flight_recursion", ttl=60, flight_timeout=5)
+        def load(name: str):
+            depth.append(name)
+            if len(depth) == 1:
+                # 同一缓存键的递归调用不等待自己
+                return load(name) + 1
+            return 1
+
+        start = time.monotonic()
+        self.assertEqual(load("a"), 2)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(len(depth), 2)
+
+    def test_stale_value_refreshed_in_background(self):
+        @cached(region="test_stale_refresh", ttl=1, stale_ttl=60)
+        def load(name: str):
+            self.calls += 1
+            return self.calls
+
+        self.assertEqual(load("a"), 1)
+        time.sleep(1.1)
+        # 软过期后立即返回旧值，并在后台刷新
+        self.assertEqual(load("a"), 1)
+        deadline = time.monotonic() + 5
+        while load("a") != 2:
+            self.assertLess(time.monotonic(), deadline, "后台刷新未完成")
+            time.sleep(0.05)
+        self.assertEqual(self.calls, 2)
+
+    def test_async_followers_share_leader_result(self):
+        @cached(region="test_async_single_flight", ttl=60)
+        async def load(name: str):
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            return {"name": name}
+
+        async def run():
+            return await asyncio.gather(*[load("a") for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), [{"name": "a"}] * 5)
+        self.assertEqual(self.calls, 1)
+        # 缓存的是协程执行后的结果
+        self.assertEqual(asyncio.run(load("a")), {"name": "a"})
+        self.assertEqual(self.calls, 1)
+
+    def test_async_followers_receive_leader_error(self):
+        @cached(region="test_async_single_flight_error", ttl=60)
+        async def load(name: str):
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            raise ValueError(name)
+
+        async def run():
+            return await asyncio.gather(*[load("a") for _ in range(3)], return_exceptions=True)
+
+        for result in asyncio.run(run()):
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(self.calls, 1)
+
+    def test_async_flight_timeout_fallback(self):
+        @cached(region="test_async_single_flight_timeout", ttl=60, flight_timeout=1)
+        async def load(name: str):
+            self.calls += 1
+            call = self.calls
+            # 第一次执行超过等待时间
+            await asyncio.sleep(2 if call == 1 else 0)
+            return call
+
+        async def run():
+            leader = asyncio.create_task(load("a"))
+            await asyncio.sleep(0.1)
+            start = time.monotonic()
+            follower = await load("a")
+            self.assertGreaterEqual(time.monotonic() - start, 1)
+            return await leader, follower
+
+        self.assertEqual(asyncio.run(run()), (1, 2))
+        self.assertEqual(self.calls, 2)
+
+    def test_async_same_task_recursion(self):
+        depth = []
+
+        @cached(region="test_async_single_flight_recursion", ttl=60, flight_timeout=5)
+        async def load(name: str):
+            depth.append(name)
+            if len(depth) == 1:
+                # 同一协程内的递归调用不等待自己
+                return await load(name) + 1
+            return 1
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(load("a")), 2)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(len(depth), 2)
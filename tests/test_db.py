@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy import Column, Integer, QueuePool, Sequence, String, create_engine, event
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+import app.db
+from app.db import Base, DbWriter, db_query, db_transaction, db_update
+
+
+class DbWriterTestItem(Base):
+    """
+    单线程写入测试表
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    name = Column(String, index=True)
+    value = Column(Integer, default=0)
+
+    @staticmethod
+    @db_query
+    def get_by_name(db: Session, name: str):
+        return db.query(DbWriterTestItem).filter(DbWriterTestItem.name == name).first()
+
+    @staticmethod
+    @db_update
+    def increase(db: Session, name: str):
+        db.query(DbWriterTestItem).filter(DbWriterTestItem.name == name).update(
+            {DbWriterTestItem.value: DbWriterTestItem.value + 1})
+
+    @staticmethod
+    @db_update
+    def create_and_fail(db: Session, name: str):
+        db.add(DbWriterTestItem(name=name))
+        db.flush()
+        raise ValueError(name)
+
+
+class DbWriterTest(TestCase):
+    """
+    单线程写入模式，写入会话、只读会话与 app.db 中的配置一致，使用临时数据库
+    """
+
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = Path(tmpdir.name) / "user.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        write_engine = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=1, max_overflow=1,
+                                     connect_args={"timeout": 5, "check_same_thread": False})
+
+        @event.listens_for(write_engine, "connect")
+        def _write_connect(dbapi_connection, _):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(write_engine, "begin")
+        def _write_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        read_engine = create_engine(f"sqlite:///file:{path.as_posix()}?mode=ro&uri=true",
+                                    connect_args={"timeout": 5, "check_same_thread": False})
+        Base.metadata.create_all(write_engine, tables=[DbWriterTestItem.__table__])
+        self.addCleanup(write_engine.dispose)
+        self.addCleanup(read_engine.dispose)
+
+        self.writer = DbWriter()
+        scoped = scoped_session(sessionmaker(bind=read_engine))
+        for name, value in {
+            "db_writer": self.writer,
+            "SessionFactory": sessionmaker(bind=read_engine),
+            "WriteSessionFactory": sessionmaker(bind=write_engine, expire_on_commit=False),
+            "ScopedSession": scoped,
+        }.items():
+            patcher = patch.object(app.db, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # 不对配置目录中的数据库执行 checkpoint
+        patcher = patch.object(app.db, "perform_checkpoint")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(scoped.remove)
+        self.addCleanup(self.writer.stop)
+
+    def __wait_queued(self, count: int):
+        """
+        等待写入队列中积压指定数量的请求
+        """
+        deadline = time.time() + 5
+        while self.writer._queue.qsize() < count:
+            self.assertLess(time.time(), deadline, "写入请求未进入队列")
+            time.sleep(0.01)
+
+    def test_concurrent_db_update(self):
+        DbWriterTestItem(name="counter").create(None)
+        errors = []
+
+        def worker(index: int):
+            try:
+                DbWriterTestItem(name=f"item{index}", value=index).create(None)
+                for _ in range(10):
+                    DbWriterTestItem.increase(None, "counter")
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(DbWriterTestItem.get_by_name(None, "counter").value, 200)
+        for i in range(20):
+            self.assertEqual(DbWriterTestItem.get_by_name(None, f"item{i}").value, i)
+
+    def test_failed_job_does_not_rollback_batch(self):
+        results = {}
+
+        def submit(name: str, func):
+            try:
+                func()
+                results[name] = None
+            except Exception as err:
+                results[name] = err
+
+        threads = [
+            threading.Thread(target=submit, args=("before", lambda: DbWriterTestItem(name="before").create(None))),
+            threading.Thread(target=submit, args=("failed", lambda: DbWriterTestItem.create_and_fail(None, "failed"))),
+            threading.Thread(target=submit, args=("after", lambda: DbWriterTestItem(name="after").create(None))),
+        ]
+        # 暂停写入线程，使三个写入请求合并为同一批提交
+        with self.writer.lease():
+            for count, thread in enumerate(threads, start=1):
+                thread.start()
+                self.__wait_queued(count)
+        for thread in threads:
+            thread.join()
+        self.assertIsNone(results["before"])
+        self.assertIsInstance(results["failed"], ValueError)
+        self.assertIsNone(results["after"])
+        self.assertIsNotNone(DbWriterTestItem.get_by_name(None, "before"))
+        self.assertIsNone(DbWriterTestItem.get_by_name(None, "failed"))
+        self.assertIsNotNone(DbWriterTestItem.get_by_name(None, "after"))
+
+    def test_transaction_rollback_while_writer_paused(self):
+        queued = threading.Thread(target=lambda: DbWriterTestItem(name="queued").create(None))
+        with self.assertRaises(ValueError):
+            with db_transaction():
+                DbWriterTestItem(name="rollback").create(None)
+                # 事务中读取到未提交的数据
+                self.assertIsNotNone(DbWriterTestItem.get_by_name(None, "rollback"))
+                # 独占写入期间其它线程的写入排队等待
+                queued.start()
+                self.__wait_queued(1)
+                self.assertTrue(queued.is_alive())
+                raise ValueError("rollback")
+        queued.join(timeout=5)
+        self.assertFalse(queued.is_alive())
+        self.assertIsNone(DbWriterTestItem.get_by_name(None, "rollback"))
+        self.assertIsNotNone(DbWriterTestItem.get_by_name(None, "queued"))
+
+    def test_update_object_from_read_session(self):
+        DbWriterTestItem(name="readonly", value=1).create(None)
+        db = app.db.SessionFactory()
+        self.addCleanup(db.close)
+        # 对象仍属于只读会话，写入时移到写入会话
+        item = DbWriterTestItem.get_by_name(db, "readonly")
+        item.update(db, {"value": 2})
+        self.assertEqual(item.value, 2)
+        self.assertEqual(DbWriterTestItem.get_by_name(None, "readonly").value, 2)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.core.context import MediaInfo
+from app.helper.libraryindex import LibraryIndexHelper
+from app.schemas import MediaServerConf
+from app.schemas.types import MediaType
+
+
+class LibraryIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.index = LibraryIndexHelper()
+        self.index.clear()
+        # 不从数据库加载，直接写入测试条目
+        self.index._loaded = True
+        self.index.update([
+            {"server": "emby", "item_id": "1", "item_type": MediaType.MOVIE.value, "title": "Heat",
+             "year": "1995", "tmdbid": 949, "seasoninfo": {}},
+            {"server": "emby", "item_id": "2", "item_type": MediaType.MOVIE.value, "title": "Heat",
+             "year": "1995", "tmdbid": 12345, "seasoninfo": {}},
+        ])
+        patcher = patch("app.helper.libraryindex.ServiceConfigHelper.get_mediaserver_configs",
+                        return_value=[MediaServerConf(name="emby", type="emby", enabled=True)])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.index.clear)
+
+    @staticmethod
+    def __movie(tmdb_id=None) -> MediaInfo:
+        mediainfo = MediaInfo()
+        mediainfo.type = MediaType.MOVIE
+        mediainfo.title = "Heat"
+        mediainfo.year = "1995"
+        mediainfo.tmdb_id = tmdb_id
+        return mediainfo
+
+    def test_same_title_year_different_tmdbid(self):
+        exists = self.index.exists(self.__movie(tmdb_id=949))
+        self.assertIsNotNone(exists)
+        self.assertEqual(exists.itemid, "1")
+        exists = self.index.exists(self.__movie(tmdb_id=12345))
+        self.assertIsNotNone(exists)
+        self.assertEqual(exists.itemid, "2")
+        # 同名同年份但TMDBID不在媒体库中
+        self.assertIsNone(self.index.exists(self.__movie(tmdb_id=777)))
+
+    def test_title_year_without_tmdbid(self):
+        exists = self.index.exists(self.__movie())
+        self.assertIsNotNone(exists)
+        self.assertEqual(exists.server, "emby")